@@ -0,0 +1,34 @@
+"""keyset pagination indexes on (created_at, id)
+
+Revision ID: 3b9d2e7f4a61
+Revises: 068164f80753
+Create Date: 2026-10-18 09:12:40.118205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9d2e7f4a61'
+down_revision = '068164f80753'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_events_created_at_id', 'events', ['created_at', 'id'], unique=False)
+    op.create_index('ix_event_reviews_event_id_created_at_id', 'event_reviews', ['event_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_event_review_comments_review_id_created_at_id', 'event_review_comments', ['review_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_app_notifications_recipient_id_created_at_id', 'app_notifications', ['recipient_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_event_bookmarks_user_id_created_at_id', 'event_bookmarks', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_brands_created_at_id', 'brands', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_brands_created_at_id', table_name='brands')
+    op.drop_index('ix_event_bookmarks_user_id_created_at_id', table_name='event_bookmarks')
+    op.drop_index('ix_app_notifications_recipient_id_created_at_id', table_name='app_notifications')
+    op.drop_index('ix_event_review_comments_review_id_created_at_id', table_name='event_review_comments')
+    op.drop_index('ix_event_reviews_event_id_created_at_id', table_name='event_reviews')
+    op.drop_index('ix_events_created_at_id', table_name='events')
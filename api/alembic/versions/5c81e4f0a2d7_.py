@@ -0,0 +1,59 @@
+"""event_attendees projection replacing event_attendees_view
+
+Revision ID: 5c81e4f0a2d7
+Revises: d27f0b8c61e3
+Create Date: 2026-10-18 13:04:51.730264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c81e4f0a2d7'
+down_revision = 'd27f0b8c61e3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('event_attendees', sa.Column('created_at', sa.DateTime(), nullable=True))
+
+    # attendee rows go away with their event, user or order instead of blocking the delete
+    for column, referred_table in (('attendee_id', 'users'), ('event_id', 'events'), ('sale_order_id', 'ticket_sales')):
+        constraint = 'event_attendees_{column}_fkey'.format(column=column)
+        op.drop_constraint(constraint, 'event_attendees', type_='foreignkey')
+        op.create_foreign_key(constraint, 'event_attendees', referred_table, [column], ['id'],
+                              onupdate='CASCADE', ondelete='CASCADE')
+
+    # the table was never written to; fill it from the tickets and assignments the view was reading
+    op.execute("DELETE FROM event_attendees")
+    op.execute("""
+        INSERT INTO event_attendees (id, event_id, attendee_id, created_at, ownership_by_purchase, ownership_by_assignment)
+        SELECT CAST(gen_random_uuid() AS VARCHAR), event_id, user_id, min(created_at), bool_or(by_purchase), bool_or(by_assignment)
+        FROM (
+            SELECT event_tickets.event_id, event_tickets.owner_id AS user_id, event_tickets.created_at,
+                   true AS by_purchase, false AS by_assignment
+            FROM event_tickets
+            WHERE NOT EXISTS (SELECT 1 FROM event_ticket_assignments WHERE event_ticket_assignments.ticket_id = event_tickets.id)
+            UNION ALL
+            SELECT event_id, assigned_to_user_id, created_at, false, true
+            FROM event_ticket_assignments
+        ) AS attendance_sources
+        WHERE event_id IS NOT NULL AND user_id IS NOT NULL
+        GROUP BY event_id, user_id
+    """)
+
+    op.create_index('ix_event_attendees_event_id_attendee_id', 'event_attendees', ['event_id', 'attendee_id'], unique=True)
+    op.create_index('ix_event_attendees_event_id_created_at_attendee_id', 'event_attendees',
+                    ['event_id', 'created_at', 'attendee_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_event_attendees_event_id_created_at_attendee_id', table_name='event_attendees')
+    op.drop_index('ix_event_attendees_event_id_attendee_id', table_name='event_attendees')
+    for column, referred_table in (('attendee_id', 'users'), ('event_id', 'events'), ('sale_order_id', 'ticket_sales')):
+        constraint = 'event_attendees_{column}_fkey'.format(column=column)
+        op.drop_constraint(constraint, 'event_attendees', type_='foreignkey')
+        op.create_foreign_key(constraint, 'event_attendees', referred_table, [column], ['id'], onupdate='CASCADE')
+    op.drop_column('event_attendees', 'created_at')
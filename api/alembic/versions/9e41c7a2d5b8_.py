@@ -0,0 +1,36 @@
+"""ticket type inventory counters
+
+Revision ID: 9e41c7a2d5b8
+Revises: 3b9d2e7f4a61
+Create Date: 2026-10-18 10:02:17.530941
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e41c7a2d5b8'
+down_revision = '3b9d2e7f4a61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('event_ticket_types', sa.Column('sold_qty', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('event_ticket_types', sa.Column('reserved_qty', sa.Integer(), server_default='0', nullable=False))
+    op.execute("""
+        UPDATE event_ticket_types
+        SET sold_qty = COALESCE((SELECT SUM(ticket_qty) FROM ticket_sale_lines
+                                 WHERE ticket_sale_lines.ticket_type_id = event_ticket_types.id), 0),
+            reserved_qty = COALESCE((SELECT SUM(ticket_reservation_lines.ticket_qty) FROM ticket_reservation_lines
+                                     JOIN ticket_reservations
+                                       ON ticket_reservations.id = ticket_reservation_lines.reservation_id
+                                     WHERE ticket_reservation_lines.ticket_type_id = event_ticket_types.id
+                                       AND ticket_reservations.expires_at > now()), 0)
+    """)
+
+
+def downgrade():
+    op.drop_column('event_ticket_types', 'reserved_qty')
+    op.drop_column('event_ticket_types', 'sold_qty')
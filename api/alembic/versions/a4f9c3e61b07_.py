@@ -0,0 +1,40 @@
+"""per-user notification counters
+
+Revision ID: a4f9c3e61b07
+Revises: 5c81e4f0a2d7
+Create Date: 2026-10-18 14:21:09.664102
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4f9c3e61b07'
+down_revision = '5c81e4f0a2d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_notification_counters',
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('total_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('unread_count', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], onupdate='CASCADE', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.execute("""
+        INSERT INTO user_notification_counters (user_id, total_count, unread_count)
+        SELECT recipient_id, count(id), count(id) FILTER (WHERE NOT is_read)
+        FROM app_notifications
+        WHERE recipient_id IS NOT NULL
+        GROUP BY recipient_id
+    """)
+    op.create_index('ix_app_notifications_unread_recipient_id_created_at_id', 'app_notifications',
+                    ['recipient_id', 'created_at', 'id'], unique=False, postgresql_where=sa.text('NOT is_read'))
+
+
+def downgrade():
+    op.drop_index('ix_app_notifications_unread_recipient_id_created_at_id', table_name='app_notifications')
+    op.drop_table('user_notification_counters')
@@ -0,0 +1,25 @@
+"""event stream posts index for live stream replay
+
+Revision ID: a8d4e2f6c3b1
+Revises: f7a3c9e5d1b2
+Create Date: 2026-10-18 20:11:05.926417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8d4e2f6c3b1'
+down_revision = 'f7a3c9e5d1b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_event_streams_event_id_published_at_id', 'event_streams',
+                    ['event_id', 'published_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_event_streams_event_id_published_at_id', table_name='event_streams')
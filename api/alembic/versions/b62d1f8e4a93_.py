@@ -0,0 +1,24 @@
+"""index events on (is_published, start_datetime) for period filters
+
+Revision ID: b62d1f8e4a93
+Revises: e3b07d9a5c14
+Create Date: 2026-10-18 16:10:37.905216
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b62d1f8e4a93'
+down_revision = 'e3b07d9a5c14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_events_is_published_start_datetime', 'events', ['is_published', 'start_datetime'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_events_is_published_start_datetime', table_name='events')
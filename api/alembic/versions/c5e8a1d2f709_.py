@@ -0,0 +1,67 @@
+"""vote and reply counters on reviews, review comments and comment responses
+
+Revision ID: c5e8a1d2f709
+Revises: b62d1f8e4a93
+Create Date: 2026-10-18 17:24:51.308164
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e8a1d2f709'
+down_revision = 'b62d1f8e4a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('event_reviews', sa.Column('comments_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('event_reviews', sa.Column('downvotes_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('event_reviews', sa.Column('upvotes_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('event_review_comments', sa.Column('downvotes_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('event_review_comments', sa.Column('responses_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('event_review_comments', sa.Column('upvotes_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('event_review_comment_responses',
+                  sa.Column('downvotes_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('event_review_comment_responses',
+                  sa.Column('upvotes_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute("""
+        UPDATE event_reviews
+        SET upvotes_count = (SELECT COUNT(*) FROM event_review_upvotes
+                             WHERE event_review_upvotes.review_id = event_reviews.id),
+            downvotes_count = (SELECT COUNT(*) FROM event_review_downvotes
+                               WHERE event_review_downvotes.review_id = event_reviews.id),
+            comments_count = (SELECT COUNT(*) FROM event_review_comments
+                              WHERE event_review_comments.review_id = event_reviews.id)
+    """)
+    op.execute("""
+        UPDATE event_review_comments
+        SET upvotes_count = (SELECT COUNT(*) FROM event_review_comment_upvotes
+                             WHERE event_review_comment_upvotes.comment_id = event_review_comments.id),
+            downvotes_count = (SELECT COUNT(*) FROM event_review_comment_downvotes
+                               WHERE event_review_comment_downvotes.comment_id = event_review_comments.id),
+            responses_count = (SELECT COUNT(*) FROM event_review_comment_responses
+                               WHERE event_review_comment_responses.comment_id = event_review_comments.id)
+    """)
+    op.execute("""
+        UPDATE event_review_comment_responses
+        SET upvotes_count = (SELECT COUNT(*) FROM event_review_comment_response_upvotes
+                             WHERE event_review_comment_response_upvotes.response_id
+                                   = event_review_comment_responses.id),
+            downvotes_count = (SELECT COUNT(*) FROM event_review_comment_response_downvotes
+                               WHERE event_review_comment_response_downvotes.response_id
+                                     = event_review_comment_responses.id)
+    """)
+
+
+def downgrade():
+    op.drop_column('event_review_comment_responses', 'upvotes_count')
+    op.drop_column('event_review_comment_responses', 'downvotes_count')
+    op.drop_column('event_review_comments', 'upvotes_count')
+    op.drop_column('event_review_comments', 'responses_count')
+    op.drop_column('event_review_comments', 'downvotes_count')
+    op.drop_column('event_reviews', 'upvotes_count')
+    op.drop_column('event_reviews', 'downvotes_count')
+    op.drop_column('event_reviews', 'comments_count')
@@ -0,0 +1,85 @@
+"""full-text search for events and brands
+
+Revision ID: d27f0b8c61e3
+Revises: 9e41c7a2d5b8
+Create Date: 2026-10-18 11:26:03.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'd27f0b8c61e3'
+down_revision = '9e41c7a2d5b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # events.search_vector includes the category name, which a generated column cannot read from another
+    # table, so it is kept up to date by triggers on events and event_categories instead
+    op.add_column('events', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.execute("""
+        CREATE FUNCTION events_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(
+                    (SELECT name FROM event_categories WHERE id = NEW.category_id), '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(NEW.venue, '')), 'C') ||
+                setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'D');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER events_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF name, description, venue, category_id ON events
+        FOR EACH ROW EXECUTE PROCEDURE events_search_vector_update()
+    """)
+    op.execute("""
+        CREATE FUNCTION event_categories_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            UPDATE events SET category_id = category_id WHERE category_id = NEW.id;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER event_categories_search_vector_trigger
+        AFTER UPDATE OF name ON event_categories
+        FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+        EXECUTE PROCEDURE event_categories_search_vector_update()
+    """)
+    op.execute("UPDATE events SET category_id = category_id")
+    op.create_index('ix_events_search_vector', 'events', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_events_name_trgm', 'events', ['name'], unique=False, postgresql_using='gin',
+                    postgresql_ops={'name': 'gin_trgm_ops'})
+
+    op.execute("""
+        ALTER TABLE brands ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+        ) STORED
+    """)
+    op.create_index('ix_brands_search_vector', 'brands', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_brands_name_trgm', 'brands', ['name'], unique=False, postgresql_using='gin',
+                    postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_brands_name_trgm', table_name='brands')
+    op.drop_index('ix_brands_search_vector', table_name='brands')
+    op.drop_column('brands', 'search_vector')
+
+    op.drop_index('ix_events_name_trgm', table_name='events')
+    op.drop_index('ix_events_search_vector', table_name='events')
+    op.execute("DROP TRIGGER event_categories_search_vector_trigger ON event_categories")
+    op.execute("DROP FUNCTION event_categories_search_vector_update()")
+    op.execute("DROP TRIGGER events_search_vector_trigger ON events")
+    op.execute("DROP FUNCTION events_search_vector_update()")
+    op.drop_column('events', 'search_vector')
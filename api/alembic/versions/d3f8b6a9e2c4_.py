@@ -0,0 +1,33 @@
+"""vote counters on event stream posts
+
+Revision ID: d3f8b6a9e2c4
+Revises: a8d4e2f6c3b1
+Create Date: 2026-10-19 10:42:18.503196
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3f8b6a9e2c4'
+down_revision = 'a8d4e2f6c3b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('event_streams', sa.Column('downvotes_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('event_streams', sa.Column('upvotes_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute("""
+        UPDATE event_streams
+        SET upvotes_count = (SELECT COUNT(*) FROM event_stream_upvotes
+                             WHERE event_stream_upvotes.stream_id = event_streams.id),
+            downvotes_count = (SELECT COUNT(*) FROM event_stream_downvotes
+                               WHERE event_stream_downvotes.stream_id = event_streams.id)
+    """)
+
+
+def downgrade():
+    op.drop_column('event_streams', 'upvotes_count')
+    op.drop_column('event_streams', 'downvotes_count')
@@ -0,0 +1,46 @@
+"""notification outbox
+
+Revision ID: e3b07d9a5c14
+Revises: a4f9c3e61b07
+Create Date: 2026-10-18 15:02:44.318570
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b07d9a5c14'
+down_revision = 'a4f9c3e61b07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notification_outbox',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('notification_type', sa.String(), nullable=True),
+    sa.Column('recipient_ids', postgresql.ARRAY(sa.String()), nullable=True),
+    sa.Column('actor_id', sa.String(), nullable=True),
+    sa.Column('event_id', sa.String(), nullable=True),
+    sa.Column('brand_id', sa.String(), nullable=True),
+    sa.Column('ticket_id', sa.String(), nullable=True),
+    sa.Column('status', sa.String(), server_default='pending', nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('available_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['actor_id'], ['users.id'], onupdate='CASCADE', ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['brand_id'], ['brands.id'], onupdate='CASCADE', ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['event_id'], ['events.id'], onupdate='CASCADE', ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['ticket_id'], ['event_tickets.id'], onupdate='CASCADE', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_notification_outbox_status_available_at', 'notification_outbox', ['status', 'available_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_notification_outbox_status_available_at', table_name='notification_outbox')
+    op.drop_table('notification_outbox')
@@ -0,0 +1,40 @@
+"""brand endorsement and category brand counters, endorsement listing index
+
+Revision ID: f7a3c9e5d1b2
+Revises: c5e8a1d2f709
+Create Date: 2026-10-18 19:02:37.415829
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7a3c9e5d1b2'
+down_revision = 'c5e8a1d2f709'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('brands', sa.Column('endorsement_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('brand_categories', sa.Column('brands_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute("""
+        UPDATE brands
+        SET endorsement_count = (SELECT COUNT(*) FROM brand_validations
+                                 WHERE brand_validations.brand_id = brands.id)
+    """)
+    op.execute("""
+        UPDATE brand_categories
+        SET brands_count = (SELECT COUNT(*) FROM brands WHERE brands.category_id = brand_categories.id)
+    """)
+
+    op.create_index('ix_brand_validations_brand_id_created_at_id', 'brand_validations',
+                    ['brand_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_brand_validations_brand_id_created_at_id', table_name='brand_validations')
+
+    op.drop_column('brand_categories', 'brands_count')
+    op.drop_column('brands', 'endorsement_count')
@@ -18,6 +18,9 @@ from api.views.places_autocomplete import PlacesAutocompleteView
 from api.models.event import db
 from api import db_config
 from api import utils
+from api.commands import register_commands
+from api.workers.reservation_sweeper import start_reservation_sweeper
+from api.workers.notification_dispatcher import start_notification_dispatcher
 
 ALLOWED_EXTENSIONS = set(['txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif'])
 
@@ -26,10 +29,13 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(db_config)
     db.init_app(app)
+    register_commands(app)
     return app
 
 
 app = create_app()
+start_reservation_sweeper(app)
+start_notification_dispatcher(app)
 
 cors = CORS(app, resources={r"/*": {"origins": "*"}})
 app.config['UPLOAD_FOLDER'] = utils.MEDIA_DIR
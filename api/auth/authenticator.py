@@ -1,6 +1,11 @@
+import threading
+
+from flask import g, has_app_context
+
 from api.auth.data_encryptor import DataEncryptor
 from api import utils
 from api.models import event as models
+from api.cache import session_token_cache
 from api.repositories.exceptions import NotAuthUser
 
 data_encryptor = DataEncryptor
@@ -10,13 +15,21 @@ class UserAuthFail(Exception):
 
 
 class Authenticator:
+	"""
+		Authenticates requests from their bearer token.
+
+		There is one instance per process, but the authenticated user is kept on
+		`flask.g`, so concurrent requests on threaded or gevent workers each see
+		their own user and a request never inherits the previous one's.
+		Outside an app context (scripts, seeders) it falls back to a thread-local.
+	"""
 	inst = None
 
 	def __init__(self):
 		if Authenticator.inst:
 			raise Exception("Use Authenticator.get_instance() method")
 
-		self.auth_user = None
+		self._local = threading.local()
 
 	@classmethod
 	def get_instance(cls):
@@ -24,22 +37,44 @@ class Authenticator:
 			cls.inst = Authenticator()
 		return cls.inst
 
+	@property
+	def auth_user(self):
+		if has_app_context():
+			return g.get('auth_user')
+		return getattr(self._local, 'auth_user', None)
+
 	def authenticate(self, request):
+		self.set_auth_user(None)
 		token = ""
 		if 'Authorization' in request.headers and request.headers['Authorization'] is not None:
 			token = self.strip_bearer(request.headers['Authorization'])
+		if not token:
+			return
+
+		cached = session_token_cache.get(token)
+		if cached:
+			user_id, is_valid = cached
+			user = models.User.get_user(user_id) if is_valid else None
+			if not user:
+				raise UserAuthFail()
+			self.set_auth_user(user)
+			return True
+
 		claims = data_encryptor.decrypt(token, key=utils.ENCRYPTION_KEY)
 		if claims:
-			user = models.User.get_user(claims['id'])
-			user_login_session = user.get_login_session()
-			if not user_login_session or user_login_session.session_token != token:
+			user = models.User.get_user_by_login_session(claims['id'], token)
+			session_token_cache.set(token, claims['id'], user is not None)
+			if not user:
 				raise UserAuthFail()
 			self.set_auth_user(user)
 			return True
 		# raise UserAuthFail()
 
 	def set_auth_user(self, auth_user):
-		self.auth_user = auth_user
+		if has_app_context():
+			g.auth_user = auth_user
+		else:
+			self._local.auth_user = auth_user
 
 	def get_auth_user(self):
 		if not self.auth_user:
@@ -7,22 +7,31 @@ class DataEncryptor:
 
         A simple wrapper around the jwcrpto JOSE library
     """
-    @staticmethod
-    def encrypt(data=None, key=None):
+    # parsed keys by their encoded value, so each key is built once per process
+    keys = {}
+
+    @classmethod
+    def get_key(cls, key):
+        if key not in cls.keys:
+            cls.keys[key] = jwk.JWK(k=key, kty="oct")
+        return cls.keys[key]
+
+    @classmethod
+    def encrypt(cls, data=None, key=None):
         if key is None:
             raise Exception("A key is needed to encrypt data")
 
         if data is None:
             raise Exception("Data of null value can not be encrypted")
 
-        key = jwk.JWK(k=key, kty="oct")
+        key = cls.get_key(key)
         etoken = jwt.JWT(header={"alg": "A256KW", "enc": "A256CBC-HS512"}, claims=data)
         etoken.make_encrypted_token(key)
 
         return etoken.serialize()
 
-    @staticmethod
-    def decrypt(cipher_text=None, key=None):
+    @classmethod
+    def decrypt(cls, cipher_text=None, key=None):
 
         if cipher_text is None:
             raise Exception("Token with value not None is needed.")
@@ -30,7 +39,7 @@ class DataEncryptor:
         if key is None:
             raise Exception("Decryption key is required. None given")
 
-        key = jwk.JWK(k=key, kty="oct")
+        key = cls.get_key(key)
 
         try:
             decoded_token = jwt.JWT(key=key, jwt=cipher_text)
@@ -0,0 +1,119 @@
+import threading
+
+from sqlalchemy import event as sqlalchemy_event, func
+from sqlalchemy.engine import Engine
+
+from api import serializers
+from api.serializers.brand import BrandListSchema
+from api.models.event import db, Event, EventReview, Brand
+from api.models.pagination_cursor import PaginationCursor
+
+
+class QueryCounter(object):
+    """Records every statement the current thread sends to the database while the block runs.
+
+    Each entry is (statement, rows), where rows is the cursor's row count, so a
+    joined fan-out shows up as a page query returning far more rows than the page holds.
+    """
+
+    def __init__(self):
+        self.statements = []
+        self._thread_id = None
+
+    def __enter__(self):
+        self._thread_id = threading.get_ident()
+        sqlalchemy_event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        return self
+
+    def __exit__(self, *exc_info):
+        sqlalchemy_event.remove(Engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self._thread_id:
+            self.statements.append((statement, cursor.rowcount))
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+class ListingBenchmark(object):
+    """One paginated listing, the schema its view dumps it with and its query budget per page.
+
+    `fetch(cursor)` returns one page; the first statement it issues must be the
+    page query itself, whose row count may not exceed the page size plus the
+    look-ahead row.
+    """
+
+    def __init__(self, name, fetch, schema, max_queries):
+        self.name = name
+        self.fetch = fetch
+        self.schema = schema
+        self.max_queries = max_queries
+
+    def run(self, pages, limit):
+        """:return: one dict per page fetched, with its query and row counts and any budget overrun"""
+        results = []
+        cursor = PaginationCursor(cursor_limit=limit)
+        for page in range(pages):
+            with QueryCounter() as counter:
+                rows = self.fetch(cursor)
+                self.schema.dump(rows, many=True)
+
+            page_rows = counter.statements[0][1] if counter.statements else 0
+            errors = []
+            if counter.count > self.max_queries:
+                errors.append('{count} queries, budget is {budget}'.format(count=counter.count,
+                                                                          budget=self.max_queries))
+            if page_rows > limit + 1:
+                errors.append('page query returned {rows} rows for {limit} items'.format(rows=page_rows,
+                                                                                         limit=limit))
+            results.append({
+                'listing': self.name,
+                'page': page + 1,
+                'items': len(rows),
+                'queries': counter.count,
+                'page_rows': page_rows,
+                'errors': errors
+            })
+
+            if not cursor.has_more:
+                break
+            cursor = PaginationCursor(cursor_after=cursor.after, cursor_limit=limit)
+        return results
+
+
+def most_reviewed_event():
+    row = db.session.query(EventReview.event_id, func.count(EventReview.id).label('reviews')) \
+        .group_by(EventReview.event_id) \
+        .order_by(func.count(EventReview.id).desc()) \
+        .first()
+    return Event.get_event_only(row.event_id) if row else None
+
+
+def create_listing_benchmarks():
+    benchmarks = [
+        # page, organizers, speakers, media, contact info, ticket types, discounts, sponsors
+        ListingBenchmark('events', lambda cursor: Event.get_events(cursor=cursor),
+                         serializers.event_anon_schema, max_queries=8),
+        # page, ticket types
+        ListingBenchmark('events summary', lambda cursor: Event.get_events_summary(cursor=cursor),
+                         serializers.event_summary_anon_schema, max_queries=2),
+        # page, with image and category joined
+        ListingBenchmark('brands', lambda cursor: Brand.get_brands(cursor=cursor),
+                         BrandListSchema(), max_queries=1)
+    ]
+
+    event = most_reviewed_event()
+    if event is not None:
+        # page, review media
+        benchmarks.append(ListingBenchmark('event reviews', lambda cursor: event.get_reviews(cursor),
+                                           serializers.event_review_schema, max_queries=2))
+    return benchmarks
+
+
+def run_listing_benchmarks(pages=3, limit=10):
+    results = []
+    for benchmark in create_listing_benchmarks():
+        results.extend(benchmark.run(pages, limit))
+    return results
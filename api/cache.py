@@ -0,0 +1,252 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import simplejson as json
+
+from api import db_config
+
+
+class LRUBackend(object):
+    """In-process cache holding at most `max_entries` values, evicting the least recently used.
+
+    Counters are kept apart from the entries so eviction can never reset them.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl if ttl else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+
+class NullBackend(object):
+    """Caches nothing; used where a process-local cache would be unsafe and no shared one is configured."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def incr(self, key):
+        return 0
+
+
+class InMemoryRedis(object):
+    """Local stand-in for a redis client, implementing only the commands `RedisBackend` uses."""
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._values[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._values[key] = (value.encode() if isinstance(value, str) else value,
+                                 time.time() + ex if ex else None)
+        return True
+
+    def incr(self, key):
+        with self._lock:
+            value, expires_at = self._values.get(key, (b'0', None))
+            value = int(value) + 1
+            self._values[key] = (str(value).encode(), expires_at)
+            return value
+
+
+class RedisBackend(object):
+    """Cache shared by every process through a redis (or redis-compatible) client."""
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url):
+        import redis  # optional dependency, only needed when a redis url is configured
+        return cls(redis.StrictRedis.from_url(url))
+
+    def get(self, key):
+        value = self.client.get(key)
+        if value is None:
+            return None
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, value, ex=ttl)
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+
+class ResponseCache(object):
+    """JSON payload cache for one `namespace`, invalidated as a whole by bumping its generation.
+
+    Every key embeds the namespace's current generation, so `invalidate` costs one
+    INCR regardless of how many entries are cached; stale generations simply age out.
+    """
+
+    def __init__(self, backend, namespace, ttl=60):
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(**params):
+        return '&'.join('{name}={value}'.format(name=name, value='' if value is None else value)
+                        for name, value in sorted(params.items()))
+
+    def _generation_key(self):
+        return '{namespace}:generation'.format(namespace=self.namespace)
+
+    def _entry_key(self, key):
+        generation = self.backend.get(self._generation_key()) or 0
+        return '{namespace}:{generation}:{key}'.format(namespace=self.namespace, generation=generation, key=key)
+
+    def fetch(self, key, build):
+        """Return the cached payload for `key`, or build, store and return it.
+
+        The generation is read before `build` runs, so a payload built while an
+        invalidation lands is stored under the old generation and never served.
+        """
+        entry_key = self._entry_key(key)
+        value = self.backend.get(entry_key)
+        with self._lock:
+            if value is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if value is not None:
+            return json.loads(value)
+
+        payload = build()
+        self.backend.set(entry_key, json.dumps(payload), ttl=self.ttl)
+        return payload
+
+    def invalidate(self):
+        self.backend.incr(self._generation_key())
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'namespace': self.namespace,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+class SessionTokenCache(object):
+    """Maps a session token's digest to the user it authenticates and whether its login session is live.
+
+    Only the sha256 digest of a token is used as key, so the cache never holds
+    a usable credential. Entries are stamped with the user's session
+    generation; `invalidate_user` bumps it on login and logout so every token
+    cached for that user is rejected at once, without tracking them.
+    """
+
+    def __init__(self, backend, namespace, ttl=300):
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+
+    @staticmethod
+    def digest(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _generation_key(self, user_id):
+        return '{namespace}:generation:{user_id}'.format(namespace=self.namespace, user_id=user_id)
+
+    def _token_key(self, token):
+        return '{namespace}:token:{digest}'.format(namespace=self.namespace, digest=self.digest(token))
+
+    def _generation(self, user_id):
+        return str(self.backend.get(self._generation_key(user_id)) or 0)
+
+    def get(self, token):
+        """Return (user id, is session valid) for `token`, or None when it has to be checked again."""
+        value = self.backend.get(self._token_key(token))
+        if value is None:
+            return None
+        user_id, generation, is_valid = value.split(':')
+        if generation != self._generation(user_id):
+            return None
+        return user_id, is_valid == '1'
+
+    def set(self, token, user_id, is_valid):
+        value = '{user_id}:{generation}:{is_valid}'.format(user_id=user_id, generation=self._generation(user_id),
+                                                           is_valid=1 if is_valid else 0)
+        self.backend.set(self._token_key(token), value, ttl=self.ttl)
+
+    def invalidate_user(self, user_id):
+        self.backend.incr(self._generation_key(user_id))
+
+
+def create_backend(max_entries=None, shared_only=False):
+    """The redis backend when RESPONSE_CACHE_REDIS_URL is set, otherwise an in-process LRU.
+
+    With `shared_only`, several worker processes and no redis get a NullBackend
+    instead: what one worker invalidates would stay cached in the others.
+    """
+    redis_url = getattr(db_config, 'RESPONSE_CACHE_REDIS_URL', None)
+    if redis_url:
+        return RedisBackend.from_url(redis_url)
+    if shared_only and getattr(db_config, 'WORKER_PROCESSES', 1) > 1:
+        return NullBackend()
+    return LRUBackend(max_entries=max_entries or getattr(db_config, 'RESPONSE_CACHE_MAX_ENTRIES', 1024))
+
+
+event_feed_cache = ResponseCache(create_backend(), 'event_feeds', ttl=getattr(db_config, 'RESPONSE_CACHE_TTL', 60))
+
+
+def invalidate_event_feeds():
+    event_feed_cache.invalidate()
+
+
+# a logout must revoke the token on every worker at once, so tokens are never cached per process next to others
+session_token_cache = SessionTokenCache(create_backend(getattr(db_config, 'AUTH_TOKEN_CACHE_MAX_ENTRIES', 10000),
+                                                       shared_only=True),
+                                        'session_tokens', ttl=getattr(db_config, 'AUTH_TOKEN_CACHE_TTL', 300))
+
+
+def invalidate_login_sessions(user_id):
+    session_token_cache.invalidate_user(user_id)
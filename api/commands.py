@@ -0,0 +1,93 @@
+import time
+
+import click
+
+from api.models.event import EventTicketType, EventAttendee, NotificationCounter, EventReview, EventReviewComment, \
+    EventReviewCommentResponse, EventStream, Brand, BrandCategory
+from api.benchmarks.listings import run_listing_benchmarks
+from api.workers.reservation_sweeper import sweep_expired_reservations
+from api.workers.notification_dispatcher import create_dispatcher
+
+
+def register_commands(app):
+    """Maintenance commands, run with `FLASK_APP=api.app flask <command>`."""
+
+    @app.cli.command('reconcile-ticket-inventory')
+    def reconcile_ticket_inventory():
+        """Rebuild ticket type sold/reserved counters from the sale and reservation lines."""
+        drifted_ids = EventTicketType.reconcile_inventory()
+        click.echo('Reconciled {count} ticket type(s)'.format(count=len(drifted_ids)))
+        for ticket_type_id in drifted_ids:
+            click.echo('  {ticket_type_id}'.format(ticket_type_id=ticket_type_id))
+
+    @app.cli.command('sweep-expired-reservations')
+    @click.option('--batch-size', default=500, show_default=True, help='Reservations deleted per transaction.')
+    @click.option('--max-batches', default=None, type=int, help='Stop after this many batches.')
+    def sweep_expired_reservations_command(batch_size, max_batches):
+        """Delete expired ticket reservations and release their tickets."""
+        reclaimed = sweep_expired_reservations(batch_size=batch_size, max_batches=max_batches)
+        click.echo('Reclaimed {tickets} ticket(s) from {reservations} expired reservation(s)'.format(**reclaimed))
+        for ticket_type_id, qty in reclaimed['ticket_types'].items():
+            click.echo('  {ticket_type_id}: {qty}'.format(ticket_type_id=ticket_type_id, qty=qty))
+
+    @app.cli.command('rebuild-event-attendees')
+    def rebuild_event_attendees():
+        """Rebuild the event_attendees projection from tickets and ticket assignments."""
+        count = EventAttendee.rebuild()
+        click.echo('Rebuilt {count} event attendee(s)'.format(count=count))
+
+    @app.cli.command('reconcile-notification-counters')
+    def reconcile_notification_counters():
+        """Recount every user's total and unread notifications."""
+        count = NotificationCounter.reconcile()
+        click.echo('Recounted notifications for {count} user(s)'.format(count=count))
+
+    @app.cli.command('reconcile-review-counters')
+    def reconcile_review_counters():
+        """Recount votes, comments and responses on reviews, review comments, comment responses and stream posts."""
+        for name, model in (('review', EventReview), ('comment', EventReviewComment),
+                            ('response', EventReviewCommentResponse), ('stream post', EventStream)):
+            drifted_ids = model.reconcile_counters()
+            click.echo('Reconciled {count} {name}(s)'.format(count=len(drifted_ids), name=name))
+            for row_id in drifted_ids:
+                click.echo('  {row_id}'.format(row_id=row_id))
+
+    @app.cli.command('reconcile-brand-counters')
+    def reconcile_brand_counters():
+        """Recount endorsements per brand and brands per brand category."""
+        for name, model in (('brand', Brand), ('brand category', BrandCategory)):
+            drifted_ids = model.reconcile_counters()
+            click.echo('Reconciled {count} {name}(s)'.format(count=len(drifted_ids), name=name))
+            for row_id in drifted_ids:
+                click.echo('  {row_id}'.format(row_id=row_id))
+
+    @app.cli.command('benchmark-listings')
+    @click.option('--pages', default=3, show_default=True, help='Pages fetched per listing.')
+    @click.option('--limit', default=10, show_default=True, help='Items per page.')
+    def benchmark_listings(pages, limit):
+        """Page through the event and review listings, checking queries and rows per page stay within budget."""
+        results = run_listing_benchmarks(pages=pages, limit=limit)
+        failures = 0
+        for result in results:
+            click.echo('{listing} page {page}: {items} item(s), {queries} queries, '
+                       '{page_rows} page row(s)'.format(**result))
+            for error in result['errors']:
+                failures += 1
+                click.echo('  ' + error)
+        if failures:
+            raise click.ClickException('{count} listing regression(s)'.format(count=failures))
+
+    @app.cli.command('dispatch-notifications')
+    @click.option('--interval', default=5, show_default=True, help='Seconds to wait when the outbox is drained.')
+    @click.option('--once', is_flag=True, help='Drain the outbox once and exit.')
+    def dispatch_notifications(interval, once):
+        """Expand queued notification intents and deliver them through the configured senders."""
+        dispatcher = create_dispatcher(app.config)
+        while True:
+            dispatcher.run_until_idle()
+            if once:
+                break
+            time.sleep(interval)
+        click.echo('{notifications_created} notification(s) from {intents_expanded} intent(s), '
+                   '{deliveries} delivered, {delivery_failures} failed, '
+                   '{notifications_per_second:.1f} notifications/s'.format(**dispatcher.stats.get_stats()))
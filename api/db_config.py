@@ -7,7 +7,54 @@
 # session = Session()
 
 
+import os
+
 SQLALCHEMY_DATABASE_URI = 'postgresql://postgres:123@db:5432/Eve2'
 #SQLALCHEMY_DATABASE_URI = 'postgresql://postgres@127.0.0.1:5432/Eve2'
 SQLALCHEMY_ECHO = True
-SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+SQLALCHEMY_TRACK_MODIFICATIONS = False
+# Seconds between in-process sweeps of expired ticket reservations; None leaves it to the
+# `flask sweep-expired-reservations` loop that startup.sh and the Procfile `sweeper` entry run every minute
+RESERVATION_SWEEPER_INTERVAL = None
+RESERVATION_SWEEPER_BATCH_SIZE = 500
+
+# Anonymous event feed cache; set RESPONSE_CACHE_REDIS_URL to share it between processes, which is required
+# with more than one worker so an invalidation reaches every worker's feeds
+RESPONSE_CACHE_REDIS_URL = os.environ.get('RESPONSE_CACHE_REDIS_URL')
+RESPONSE_CACHE_MAX_ENTRIES = 1024
+RESPONSE_CACHE_TTL = 60
+
+# Worker processes gunicorn_config.py starts; process-local caches are only safe with one
+WORKER_PROCESSES = int(os.environ.get('GUNICORN_WORKERS', 1))
+
+# Decrypted session tokens, keyed by digest; logins and logouts invalidate a user's entries. With more than one
+# worker they are only cached in RESPONSE_CACHE_REDIS_URL, otherwise every request checks the database
+AUTH_TOKEN_CACHE_MAX_ENTRIES = 10000
+AUTH_TOKEN_CACHE_TTL = 300
+
+# 'cloudinary' or 'local' (files under utils.MEDIA_DIR, served from MEDIA_BASE_URL)
+MEDIA_STORAGE_BACKEND = 'cloudinary'
+MEDIA_BASE_URL = '/media/'
+MEDIA_UPLOAD_MAX_WORKERS = 4
+
+# Notification outbox; drained by the `flask dispatch-notifications` process that startup.sh and the Procfile
+# `worker` entry start. Set an interval to also drain it in-process, e.g. when running without those scripts
+NOTIFICATION_DISPATCHER_INTERVAL = None
+NOTIFICATION_DISPATCHER_BATCH_SIZE = 100
+NOTIFICATION_DISPATCHER_MAX_ATTEMPTS = 5
+NOTIFICATION_DISPATCHER_RETRY_DELAY = 30
+# names from api.services.notification_senders.SENDERS, e.g. ('memory',)
+NOTIFICATION_SENDERS = ()
+
+# Users allowed to read the operational endpoints (/general/cache-stats, /general/query-stats)
+ADMIN_USER_IDS = ()
+
+# Baked hot-path queries and their compiled SQL kept per process; timings are served at /general/query-stats
+COMPILED_QUERY_CACHE_SIZE = 200
+
+# Live event streams (server-sent events), served by the gevent workers of gunicorn_config.py. Posts are relayed
+# through redis when LIVE_STREAM_REDIS_URL is set, which is required with more than one worker or server
+LIVE_STREAM_REDIS_URL = os.environ.get('LIVE_STREAM_REDIS_URL')
+LIVE_STREAM_BUFFER_SIZE = 100
+LIVE_STREAM_KEEPALIVE = 15
+LIVE_STREAM_REPLAY_LIMIT = 100
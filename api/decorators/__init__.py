@@ -1 +1,2 @@
 from .check_auth_user import  check_auth_user
+from .check_admin_user import check_admin_user
@@ -0,0 +1,32 @@
+from functools import wraps
+
+from flask import make_response, request
+import json
+
+from api import db_config
+from api.auth.authenticator import Authenticator, UserAuthFail
+
+
+def check_admin_user(func):
+    """Only let through users listed in db_config.ADMIN_USER_IDS; for operational endpoints."""
+    @wraps(func)
+    def decorator(*args, **kwargs):
+        authenticator = Authenticator.get_instance()
+        try:
+            authenticator.authenticate(request)
+        except UserAuthFail:
+            pass
+        user = authenticator.get_auth_user_without_auth_check()
+        if user is None:
+            return make_response(json.dumps({
+                "ok": False,
+                "code": "NOT_AUTH_USER"
+            }), 401)
+        if user.id not in getattr(db_config, 'ADMIN_USER_IDS', ()):
+            return make_response(json.dumps({
+                "ok": False,
+                "code": "NOT_ADMIN_USER"
+            }), 403)
+        return func(*args, **kwargs)
+
+    return decorator
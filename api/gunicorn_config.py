@@ -0,0 +1,14 @@
+import os
+
+# Live event streams keep their connection open for as long as the client watches, so workers are
+# gevent based: every request and open stream is a greenlet, and a worker serves thousands of them.
+worker_class = 'gevent'
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 2000))
+# more than one worker needs LIVE_STREAM_REDIS_URL, so a post reaches the streams held by every worker
+workers = int(os.environ.get('GUNICORN_WORKERS', 1))
+
+
+def post_fork(server, worker):
+    # psycopg2 waits on the database in C; make it yield to other greenlets instead of blocking the worker
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
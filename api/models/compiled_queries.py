@@ -0,0 +1,109 @@
+import threading
+import time
+
+from sqlalchemy import event as sqlalchemy_event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext import baked
+
+from api import db_config
+
+
+class QueryTimings(object):
+    """Accumulated timings of one named query.
+
+    `compile` covers everything before the statement reaches the DB cursor: the
+    bakery lookup and, on a cache miss, building the Query and compiling its SQL.
+    `execute` covers the round trip and loading the rows. Lookups answered from
+    the identity map never reach the cursor and count as compile time only.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.compile_seconds = 0.0
+        self.execute_seconds = 0.0
+
+    def add(self, compile_seconds, execute_seconds):
+        self.calls += 1
+        self.compile_seconds += compile_seconds
+        self.execute_seconds += execute_seconds
+
+    def get_stats(self):
+        calls = self.calls or 1
+        return {
+            'name': self.name,
+            'calls': self.calls,
+            'compile_ms': round(self.compile_seconds * 1000, 3),
+            'execute_ms': round(self.execute_seconds * 1000, 3),
+            'avg_compile_ms': round(self.compile_seconds * 1000 / calls, 3),
+            'avg_execute_ms': round(self.execute_seconds * 1000 / calls, 3)
+        }
+
+
+class CompiledQueryRegistry(object):
+    """Hot-path queries kept as SQLAlchemy baked queries, with per-query timings.
+
+    A baked query is built from lambdas whose code objects (plus any extra key
+    arguments) form its cache key, so the Query object and its compiled SQL are
+    made once per process and reused; values must be passed as `bindparam`s
+    through `params`. The bakery also serves as the statement's compiled cache.
+    """
+
+    def __init__(self, size=200):
+        self.bakery = baked.bakery(size=size)
+        self._timings = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        sqlalchemy_event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+
+    def bake(self, initial_fn, *args):
+        """Start (or fetch from the bakery) the baked query built by `initial_fn(session)`."""
+        return self.bakery(initial_fn, *args)
+
+    def get(self, model, session, entity_id):
+        """Primary-key lookup of `model`, answered from the identity map when possible."""
+        baked_query = self.bakery(lambda session: session.query(model), model)
+        return self._run(model.__name__ + '.get', lambda: baked_query(session).get(entity_id))
+
+    def all(self, name, baked_query, session, **params):
+        return self._run(name, lambda: baked_query(session).params(**params).all())
+
+    def first(self, name, baked_query, session, **params):
+        return self._run(name, lambda: baked_query(session).params(**params).first())
+
+    def scalar(self, name, baked_query, session, **params):
+        return self._run(name, lambda: baked_query(session).params(**params).scalar())
+
+    def _run(self, name, fetch):
+        self._local.timing = True
+        self._local.cursor_started_at = None
+        started_at = time.perf_counter()
+        try:
+            return fetch()
+        finally:
+            finished_at = time.perf_counter()
+            cursor_started_at = self._local.cursor_started_at or finished_at
+            self._local.timing = False
+            self._record(name, cursor_started_at - started_at, finished_at - cursor_started_at)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if getattr(self._local, 'timing', False) and self._local.cursor_started_at is None:
+            self._local.cursor_started_at = time.perf_counter()
+
+    def _record(self, name, compile_seconds, execute_seconds):
+        with self._lock:
+            timings = self._timings.get(name)
+            if timings is None:
+                timings = self._timings[name] = QueryTimings(name)
+            timings.add(compile_seconds, execute_seconds)
+
+    def get_stats(self):
+        with self._lock:
+            return [self._timings[name].get_stats() for name in sorted(self._timings)]
+
+    def reset_stats(self):
+        with self._lock:
+            self._timings = {}
+
+
+compiled_queries = CompiledQueryRegistry(size=getattr(db_config, 'COMPILED_QUERY_CACHE_SIZE', 200))
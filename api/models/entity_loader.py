@@ -0,0 +1,101 @@
+from flask import g, has_app_context
+from sqlalchemy import inspect
+
+from api.models.compiled_queries import compiled_queries
+
+
+class EntityLoader(object):
+    """Primary-key lookups memoised for the lifetime of one request.
+
+    `get` answers from the request cache first, then from the session's identity
+    map, and only then goes to the database, through a baked query when no
+    loader options are asked for. Misses are not
+    remembered, so a row created later in the same request is found once it
+    exists. `get_many` resolves whatever is not cached yet with a single `IN`
+    query. One instance lives on `flask.g` per request; outside an app context
+    every call gets a fresh, uncached loader.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self._entities = {}
+
+    @classmethod
+    def get_instance(cls, session):
+        if not has_app_context():
+            return cls(session)
+
+        loader = getattr(g, 'entity_loader', None)
+        if loader is None or loader.session is not session:
+            loader = cls(session)
+            g.entity_loader = loader
+        return loader
+
+    def _cached(self, model, entity_id):
+        entity = self._entities.get((model, entity_id))
+        if entity is None:
+            return None
+
+        state = inspect(entity)
+        if state.deleted or state.detached:
+            del self._entities[(model, entity_id)]
+            return None
+        return entity
+
+    def get(self, model, entity_id, not_found=None, owner=None, options=()):
+        """
+        :param model: mapped class to load
+        :param entity_id: its primary key
+        :param not_found: exception class raised on a miss; None returns None instead
+        :param owner: optional (attribute name, value) the row must carry, e.g. ('event_id', event.id),
+            so children of one parent can't be reached through another
+        :param options: loader options (e.g. `joinedload`) applied when the row has to be fetched
+        """
+        entity = self._cached(model, entity_id) if entity_id is not None else None
+        if entity is None and entity_id is not None:
+            if options:
+                entity = self.session.query(model).options(*options).get(entity_id)
+            else:
+                entity = compiled_queries.get(model, self.session, entity_id)
+            if entity is not None:
+                self._entities[(model, entity_id)] = entity
+
+        if entity is not None and owner is not None and getattr(entity, owner[0]) != owner[1]:
+            entity = None
+
+        if entity is None and not_found is not None:
+            raise not_found()
+        return entity
+
+    def get_many(self, model, entity_ids, not_found=None):
+        """Load `entity_ids` with one `IN` query for the ones not seen yet, in the order given.
+
+        Ids that do not exist are left out, or raise `not_found` when it is given.
+        """
+        entity_ids = [entity_id for entity_id in entity_ids if entity_id is not None]
+        pending = set(entity_id for entity_id in entity_ids if self._cached(model, entity_id) is None)
+
+        if pending:
+            primary_key = inspect(model).primary_key[0]
+            for entity in self.session.query(model).filter(primary_key.in_(pending)).all():
+                entity_id = getattr(entity, primary_key.key)
+                self._entities[(model, entity_id)] = entity
+
+        entities = []
+        for entity_id in entity_ids:
+            entity = self._entities.get((model, entity_id))
+            if entity is None:
+                if not_found is not None:
+                    raise not_found()
+                continue
+            entities.append(entity)
+        return entities
+
+    def add(self, entity):
+        """Remember an entity loaded some other way (e.g. the authenticated user)."""
+        primary_key = inspect(type(entity)).primary_key[0]
+        self._entities[(type(entity), getattr(entity, primary_key.key))] = entity
+        return entity
+
+    def forget(self, model, entity_id):
+        self._entities.pop((model, entity_id), None)
@@ -1,17 +1,24 @@
 import uuid, random
+from collections import OrderedDict
 from enum import Enum
-import copy
 from datetime import datetime, timedelta
 from sqlalchemy.orm import joinedload, relation
 from sqlalchemy import func, or_, and_, text
 from sqlalchemy.orm import relationship
 from sqlalchemy import Boolean, Column
-from sqlalchemy import cast, Numeric
-from sqlalchemy.orm import load_only
+from sqlalchemy.orm import load_only, deferred, selectinload
+from sqlalchemy.dialects.postgresql import TSVECTOR, ARRAY, insert as pg_insert
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import select, union_all, literal, exists, String, tuple_, bindparam
+from sqlalchemy import event as sqlalchemy_event
 
 from api import utils
 from api.models.event_periods import EventPeriods
-from api.models.pagination_cursor import PaginationCursor
+from api.models.pagination_cursor import PaginationCursor, BadCursorQuery, decode_cursor_key
+from api.models.entity_loader import EntityLoader
+from api.models.compiled_queries import compiled_queries
+from api.models.search import text_search
+from api.cache import invalidate_event_feeds, invalidate_login_sessions
 from api.models.domain.user_payment_info import PaymentTypes
 from api.exceptions import payments as payment_exceptions
 from api.repositories import exceptions
@@ -30,6 +37,56 @@ CASCADE = 'CASCADE'
 db = SQLAlchemy()
 
 
+def load_entity(model, entity_id, not_found=None, owner=None, options=()):
+    """Fetch one row by primary key through the request's `EntityLoader`."""
+    return EntityLoader.get_instance(db.session).get(model, entity_id, not_found, owner, options)
+
+
+def load_entities(model, entity_ids, not_found=None):
+    """Fetch several rows by primary key through the request's `EntityLoader`, with at most one `IN` query."""
+    return EntityLoader.get_instance(db.session).get_many(model, entity_ids, not_found)
+
+
+def adjust_counters(entity, **deltas):
+    """
+    Adds `deltas` to counter columns of `entity`'s row in one UPDATE (`column = column + delta`), so concurrent
+    writers never overwrite each other's counts, and refreshes those columns on the instance
+    """
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    table = type(entity).__table__
+    row = db.session.execute(
+        table.update()
+            .where(table.c.id == entity.id)
+            .values({name: table.c[name] + delta for name, delta in deltas.items()})
+            .returning(*[table.c[name] for name in deltas])
+    ).first()
+    if row is not None:
+        for name in deltas:
+            set_committed_value(entity, name, row[name])
+
+
+def reconcile_counters(model, counters):
+    """
+    Recounts counter columns of `model` from the rows they count
+    :param counters: {counter column name: foreign key column of the counted rows pointing at `model`}
+    :return: ids of the rows whose counters had drifted
+    """
+    table = model.__table__
+    recounted = {name: select([func.count()]).where(foreign_key == table.c.id).as_scalar()
+                 for name, foreign_key in counters.items()}
+
+    rows = db.session.execute(
+        table.update()
+            .where(or_(*[table.c[name] != count for name, count in recounted.items()]))
+            .values(recounted)
+            .returning(table.c.id)
+    ).fetchall()
+    db.session.commit()
+    return [row.id for row in rows]
+
+
 class Media(db.Model):
     __tablename__ = 'media'
 
@@ -96,7 +153,7 @@ class Country(db.Model):
 
     @classmethod
     def get_country(cls, country_id):
-        return db.session.query(Country).filter(Country.id == country_id).one()
+        return load_entity(Country, country_id, exceptions.CountryNotFound)
 
     @classmethod
     def get_country_by_code(cls, code):
@@ -144,9 +201,7 @@ class Job(db.Model):
 
     @classmethod
     def get_job(cls, job_id):
-        if not cls.has_job(job_id):
-            raise exceptions.JobNotFound()
-        return db.session.query(Job).filter(Job.id == job_id).first()
+        return load_entity(Job, job_id, exceptions.JobNotFound)
 
     @classmethod
     def get_jobs(cls):
@@ -255,9 +310,7 @@ class User(db.Model):
 
     @classmethod
     def get_user(cls, user_id):
-        # if not cls.has_user(user_id):
-        #     raise exceptions.user.UserNotFound()
-        return db.session.query(User).filter(User.id == user_id).first()
+        return load_entity(User, user_id)
 
     @staticmethod
     def get_users():
@@ -283,11 +336,27 @@ class User(db.Model):
             db.session.query(UserLoginSession).filter(UserLoginSession.user_id == self.id).exists()).scalar()
 
     def get_login_session(self):
-        return db.session.query(UserLoginSession).filter(UserLoginSession.user_id == self.id).first()
+        baked_query = compiled_queries.bake(lambda session: session.query(UserLoginSession)
+                                            .filter(UserLoginSession.user_id == bindparam('user_id')))
+        return compiled_queries.first('User.get_login_session', baked_query, db.session, user_id=self.id)
+
+    @staticmethod
+    def get_user_by_login_session(user_id, session_token):
+        """Load the user only if `session_token` is their live login session, in a single joined query."""
+        baked_query = compiled_queries.bake(lambda session: session.query(User)
+                                            .join(UserLoginSession, UserLoginSession.user_id == User.id)
+                                            .filter(User.id == bindparam('user_id'))
+                                            .filter(UserLoginSession.session_token == bindparam('session_token')))
+        user = compiled_queries.first('User.get_user_by_login_session', baked_query, db.session,
+                                      user_id=user_id, session_token=session_token)
+        if user is not None:
+            EntityLoader.get_instance(db.session).add(user)
+        return user
 
     def remove_login_session(self):
         db.session.query(UserLoginSession).filter(UserLoginSession.user_id == self.id).delete()
         db.session.commit()
+        invalidate_login_sessions(self.id)
 
     def am_following_user(self, user):
         if user:
@@ -355,24 +424,11 @@ class User(db.Model):
                         and_(EventTicket.assignment.any(EventTicketTypeAssignment.ticket_id == EventTicket.id),
                              EventTicket.assignment.any(EventTicketTypeAssignment.assigned_to_user_id == self.id))))
 
-        query = db.session.query(Event).filter(Event.id.in_(event_ids_query))
-
-        if cursor and cursor.after:
-            query = query.filter(func.round(cast(func.extract('EPOCH', Event.created_at), Numeric), 3) < func.round(cursor.get_after_as_float(), 3))
-
-        if cursor and cursor.before:
-            query = query.filter(func.round(cast(func.extract('EPOCH', Event.created_at), Numeric), 3) > func.round(cursor.get_before_as_float(), 3))
-
-        events = query.order_by(Event.created_at.desc()).limit(cursor.limit).all()
+        query = db.session.query(Event) \
+            .options(*LoadingStrategies.event_summaries()) \
+            .filter(Event.id.in_(event_ids_query))
 
-        if events:
-            cursor.set_before(events[0].created_at)
-            cursor.set_after(events[-1].created_at)
-        else:
-            cursor.set_before(None)
-            cursor.set_after(None)
-
-        return events
+        return cursor.paginate(query, Event.created_at)
 
     def get_attending_events_count(self):
         events_count = db.session.query(EventTicket.event_id.label("event_id")) \
@@ -385,6 +441,7 @@ class User(db.Model):
     def get_created_events(self, cursor, is_published=True, is_not_published=True):
 
         query = db.session.query(Event) \
+            .options(*LoadingStrategies.event_summaries()) \
             .filter(Event.user_id == self.id)
 
         if is_published and not is_not_published:
@@ -392,31 +449,7 @@ class User(db.Model):
         elif not is_published and is_not_published:
             query = query.filter(Event.is_published==False)
 
-        if cursor and cursor.after:
-            query = query.filter(func.round(cast(func.extract('EPOCH', Event.created_at), Numeric), 3)
-                                 < func.round(cursor.get_after_as_float(), 3))
-
-        if cursor and cursor.before:
-            query = query.filter(func.round(cast(func.extract('EPOCH', Event.created_at), Numeric), 3)
-                                 > func.round(cursor.get_before_as_float(), 3))
-
-        events = query.order_by(Event.created_at.desc()).limit(cursor.limit).all()
-
-        if events:
-            cursor.set_before(events[0].created_at)
-            cursor.set_after(events[-1].created_at)
-            cursor.set_has_more(self.has_more_created_events(cursor, is_published, is_not_published))
-        else:
-            cursor.set_before(None)
-            cursor.set_after(None)
-            cursor.set_has_more(False)
-
-        return events
-
-    def has_more_created_events(self, cursor, is_published=True, is_not_published=True):
-        has_more_cursor = copy.copy(cursor)
-        events = self.get_created_events(cursor, is_published=is_published, is_not_published=is_not_published)
-        return len(events) > 0
+        return cursor.paginate(query, Event.created_at)
 
     def get_created_events_count(self, is_published=True, is_not_published=True):
         query = db.session.query(Event) \
@@ -433,32 +466,17 @@ class User(db.Model):
             .options(load_only('id', 'event_id', 'created_at')) \
             .filter(EventBookmark.user_id == self.id)
 
-        if cursor and cursor.after:
-            query = query.filter(func.round(cast(func.extract('EPOCH', EventBookmark.created_at), Numeric), 3) < func.round(
-                cursor.get_after_as_float(), 3))
-
-        if cursor and cursor.before:
-            query = query.filter(func.round(cast(func.extract('EPOCH', Event.created_at), Numeric), 3) > func.round(
-                cursor.get_before_as_float(), 3))
-
-        bookmarks = query.order_by(EventBookmark.created_at.desc()).limit(cursor.limit).all()
-
-        if len(bookmarks):
-            cursor.set_before(bookmarks[0].created_at)
-            cursor.set_after(bookmarks[-1].created_at)
-            cursor.set_has_more(self.has_more_bookmarked_events(cursor))
-        else:
-            cursor.set_before(None)
-            cursor.set_after(None)
-            cursor.set_has_more(False)
-
-        events = db.session.query(Event).filter(Event.id.in_(list(map(lambda bookmark: bookmark.event_id, bookmarks)))).all()
-        return events
+        bookmarks = cursor.paginate(query, EventBookmark.created_at)
+        if not bookmarks:
+            return []
 
-    def has_more_bookmarked_events(self, cursor):
-        has_more_cursor = copy.copy(cursor)
-        events = self.get_bookmarked_events(cursor)
-        return len(events) > 0
+        event_ids = [bookmark.event_id for bookmark in bookmarks]
+        events = db.session.query(Event) \
+            .options(*LoadingStrategies.event_summaries()) \
+            .filter(Event.id.in_(event_ids)) \
+            .all()
+        events_by_id = {event.id: event for event in events}
+        return [events_by_id[event_id] for event_id in event_ids if event_id in events_by_id]
 
     def get_bookmarked_events_count(self):
         return db.session.query(EventBookmark) \
@@ -478,13 +496,8 @@ class User(db.Model):
 
     @classmethod
     def get_user_full(self, user_id):
-        if not self.has_user(user_id):
-            raise exceptions.user.UserNotFound()
-
-        return db.session.query(User).options(
-            joinedload(User.events),
-            joinedload(User.bookmarks)
-        ).filter(User.id == user_id).first()
+        return load_entity(User, user_id, exceptions.UserNotFound,
+                           options=(joinedload(User.events), joinedload(User.bookmarks)))
 
     def update(self):
         self.updated_at = datetime.now()
@@ -606,6 +619,12 @@ class UserLoginHistory(db.Model):
 
 class Event(db.Model):
     __tablename__ = 'events'
+    __table_args__ = (
+        db.Index('ix_events_created_at_id', 'created_at', 'id'),
+        db.Index('ix_events_is_published_start_datetime', 'is_published', 'start_datetime'),
+        db.Index('ix_events_search_vector', 'search_vector', postgresql_using='gin'),
+        db.Index('ix_events_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
 
     id = db.Column(db.String, primary_key=True, default=uuid.uuid4)
     name = db.Column(db.Text)
@@ -634,6 +653,8 @@ class Event(db.Model):
     reviews = relationship('EventReview', backref='events')
     sponsors = relationship('EventSponsor', backref='events')
     is_published = db.Column(db.Boolean, index=True)
+    # maintained by the events_search_vector_update trigger from name, category name, venue and description
+    search_vector = deferred(db.Column(TSVECTOR))
 
     def __init__(self, name=None, description=None, venue=None, start_datetime=None, end_datetime=None,
                  cover_image=None, is_published=False):
@@ -649,7 +670,9 @@ class Event(db.Model):
 
     @classmethod
     def has_event(cls, event_id):
-        return db.session.query(db.session.query(Event).filter(Event.id == event_id).exists()).scalar()
+        baked_query = compiled_queries.bake(lambda session: session.query(
+            exists().where(Event.id == bindparam('event_id'))))
+        return compiled_queries.scalar('Event.has_event', baked_query, db.session, event_id=event_id)
 
     @staticmethod
     def add_event(event):
@@ -664,64 +687,28 @@ class Event(db.Model):
             raise exceptions.EventNotFound()
         db.session.query(Event).filter(Event.id == event_id).delete()
         db.session.commit()
+        invalidate_event_feeds()
 
     @classmethod
     def get_event_only(cls, event_id):
-        if not cls.has_event(event_id):
-            raise exceptions.EventNotFound()
-        return db.session.query(Event).filter(Event.id == event_id).first()
+        return load_entity(Event, event_id, exceptions.EventNotFound)
 
     def user_has_tickets(self, user):
         return user.has_tickets_for_event(self)
         # return EventTicket.user_has_tickets_for_event(self, user)
 
-    def _update_attendee_pagination_cursor(self, cursor):
-        rs = db.engine.execute(self._attendees_view_query_created_at(cursor)).fetchall()
-        if rs:
-            cursor.set_before(rs[0][0])
-            cursor.set_after(rs[-1][0])
-        else:
-            cursor.set_before(None)
-            cursor.set_after(None)
-
-    def _attendees_view_query_user_id(self, cursor):
-        query_text = """
-            SELECT user_id FROM event_attendees_view
-            WHERE event_id = :event_id
-            AND CASE WHEN COALESCE(:cursor_after,0)!=0 THEN extract('epoch' FROM created_at) > :cursor_after ELSE TRUE END
-            AND CASE WHEN  COALESCE(:cursor_before,0)!=0 THEN extract('epoch' FROM created_at) < :cursor_before ELSE TRUE END
-            ORDER BY created_at ASC LIMIT :limit
-        """
-        return text(query_text).bindparams(
-            event_id=self.id,
-            limit=cursor.limit,
-            cursor_after=cursor.get_after_as_float(),
-            cursor_before=cursor.get_before_as_float()
-        )
-
-    def _attendees_view_query_created_at(self, cursor):
-        query_text = """
-               SELECT created_at FROM event_attendees_view
-               WHERE event_id = :event_id
-               AND CASE WHEN COALESCE(:cursor_after,0)!=0 THEN extract('epoch' FROM created_at) > :cursor_after ELSE TRUE END
-               AND CASE WHEN  COALESCE(:cursor_before,0)!=0 THEN extract('epoch' FROM created_at) < :cursor_before ELSE TRUE END
-               ORDER BY created_at ASC LIMIT :limit
-           """
-        return text(query_text).bindparams(
-            event_id=self.id,
-            limit=cursor.limit,
-            cursor_after=cursor.get_after_as_float(),
-            cursor_before=cursor.get_before_as_float()
-        )
-
     def get_attendees(self, cursor=None):
-        attendees = db.session.query(User).filter(User.id.in_(self._attendees_view_query_user_id(cursor))).all()
-        self._update_attendee_pagination_cursor(cursor)
-        return attendees
+        # attendees are listed in the order they joined, oldest first, as before the projection existed
+        rows = cursor.paginate(db.session.query(User, EventAttendee.created_at, EventAttendee.attendee_id)
+                               .join(EventAttendee, EventAttendee.attendee_id == User.id)
+                               .filter(EventAttendee.event_id == self.id),
+                               EventAttendee.created_at, EventAttendee.attendee_id, ascending=True)
+        return [row[0] for row in rows]
 
     def get_total_attendees(self):
-        return db.session.query(User).filter(
-            User.id.in_(self._attendees_view_query_user_id(cursor=PaginationCursor()))).count()
+        return db.session.query(func.count(EventAttendee.attendee_id)) \
+            .filter(EventAttendee.event_id == self.id) \
+            .scalar()
 
     def is_bookmarked_by(self, user):
         if not user:
@@ -732,12 +719,14 @@ class Event(db.Model):
                                 ).scalar()
 
     def bookmark(self, user):
+        """Adds the bookmark to the caller's transaction; the caller commits, with any notification intent."""
         if EventBookmark.user_already_bookmarked_event(self, user):
             raise exceptions.BookmarkAlreadyExist()
         bookmark = EventBookmark.create(self, user)
         return bookmark
 
     def unbookmark(self, user):
+        """Deletes the bookmark in the caller's transaction; the caller commits."""
         EventBookmark.delete_bookmark(self, user)
 
     @staticmethod
@@ -747,29 +736,9 @@ class Event(db.Model):
         if is_published:
             query= query.filter(Event.is_published==True)
 
-        if period and 'period' in period and 'value' in period:
-            period_type = period['period']
-            period_value = period['value']
-
-            if period_type == EventPeriods.TODAY:
-                query = query.filter(func.DATE(Event.start_datetime) == period_value)
-            elif period_type == EventPeriods.TOMORROW:
-                query = query.filter(func.DATE(Event.start_datetime) == period_value)
-            elif period_type == EventPeriods.THIS_WEEK:
-                start_date = period_value[0]
-                end_date = period_value[1]
-                query = query.filter(func.DATE(Event.start_datetime).between(start_date, end_date))
-            elif period_type == EventPeriods.THIS_MONTH:
-                start_date = period_value[0]
-                end_date = period_value[1]
-                query = query.filter(func.DATE(Event.start_datetime).between(start_date, end_date))
-            elif period_type == EventPeriods.NEXT_MONTH:
-                start_date = period_value[0]
-                query = query.filter(func.DATE(Event.start_datetime) >= start_date)
-            elif period_type == EventPeriods.THIS_YEAR:
-                start_date = period_value[0]
-                end_date = period_value[1]
-                query = query.filter(func.TIMESTAMP(Event.start_datetime).between(start_date, end_date))
+        period_filter = EventPeriods.predicate(Event.start_datetime, period)
+        if period_filter is not None:
+            query = query.filter(period_filter)
 
         if creator_id:
             query = query.filter(Event.user_id == creator_id)
@@ -779,151 +748,120 @@ class Event(db.Model):
 
         return query.count()
 
-    @staticmethod
-    def has_more_events(period=None, category_id=None, creator_id=None, cursor=None, is_published=True):
-        has_more_cursor = copy.copy(cursor)
-        more_events = Event.get_events(period, category_id, creator_id, has_more_cursor, is_published)
-        return len(more_events) > 0
-
     @staticmethod
     def get_events(period=None, category_id=None, creator_id=None, cursor=None, is_published=True):
-        query = db.session.query(Event).options(
-            joinedload(Event.recommendations),
-            joinedload(Event.organizers),
-            joinedload(Event.user),
-            joinedload(Event.category),
-            joinedload(Event.ticket_types),
-            joinedload(Event.contact_info),
-            joinedload(Event.speakers),
-            joinedload(Event.media),
-        )
+        baked_query = compiled_queries.bake(lambda session: session.query(Event)
+                                            .options(*LoadingStrategies.event_details()))
+        params = {}
 
         if is_published:
-            query = query.filter(Event.is_published==True)
+            baked_query += lambda query: query.filter(Event.is_published == True)
 
-        if period and 'period' in period and 'value' in period:
-            period_type = period['period']
-            period_value = period['value']
-
-            if period_type == EventPeriods.TODAY:
-                query = query.filter(func.DATE(Event.start_datetime) == period_value)
-            elif period_type == EventPeriods.TOMORROW:
-                query = query.filter(func.DATE(Event.start_datetime) == period_value)
-            elif period_type == EventPeriods.THIS_WEEK:
-                start_date = period_value[0]
-                end_date = period_value[1]
-                query = query.filter(func.DATE(Event.start_datetime).between(start_date, end_date))
-            elif period_type == EventPeriods.THIS_MONTH:
-                start_date = period_value[0]
-                end_date = period_value[1]
-                query = query.filter(func.DATE(Event.start_datetime).between(start_date, end_date))
-            elif period_type == EventPeriods.NEXT_MONTH:
-                start_date = period_value[0]
-                end_date = period_value[1]
-                query = query.filter(func.DATE(Event.start_datetime).between(start_date, end_date))
-            elif period_type == EventPeriods.THIS_YEAR:
-                start_date = period_value[0]
-                end_date = period_value[1]
-                query = query.filter(func.TIMESTAMP(Event.start_datetime).between(start_date, end_date))
+        period_range = EventPeriods.get_range(period)
+        if period_range:
+            baked_query += lambda query: query.filter(Event.start_datetime >= bindparam('period_start')) \
+                .filter(Event.start_datetime < bindparam('period_end'))
+            params['period_start'], params['period_end'] = period_range
 
         if creator_id:
-            query = query.filter(Event.user_id == creator_id)
+            baked_query += lambda query: query.filter(Event.user_id == bindparam('creator_id'))
+            params['creator_id'] = creator_id
 
         if category_id:
-            query = query.filter(Event.category_id == category_id)
-
-        if cursor and cursor.after:
-            query = query.filter(func.round(cast(func.extract('EPOCH', Event.created_at), Numeric), 3) < func.round(
-                cursor.get_after_as_float(), 3))
+            baked_query += lambda query: query.filter(Event.category_id == bindparam('category_id'))
+            params['category_id'] = category_id
 
-        elif cursor and cursor.before:
-            query = query.filter(func.round(cast(func.extract('EPOCH', Event.created_at), Numeric), 3) > func.round(
-                cursor.get_before_as_float(), 3))
-
-        events = query.order_by(Event.created_at.desc()).limit(cursor.limit).all()
-
-        if events:
-            cursor.set_before(events[0].created_at)
-            cursor.set_after(events[-1].created_at)
-            cursor.set_has_more(Event.has_more_events(period, category_id, creator_id, cursor, is_published))
-        else:
-            cursor.set_before(None)
-            cursor.set_after(None)
-            cursor.set_has_more(False)
-        return events
-
-    @staticmethod
-    def has_more_events_summary(category=None, period=None, cursor=None, is_published=True):
-        has_more_cursor = copy.copy(cursor)
-        more_events = Event.get_events_summary(category, period, has_more_cursor, is_published)
-        return len(more_events) > 0
+        return cursor.paginate_baked('Event.get_events', baked_query, db.session, Event.created_at, **params)
 
     @staticmethod
     def get_events_summary(category=None, period=None, cursor=None, is_published=True):
 
-        query = db.session.query(Event)
+        query = db.session.query(Event).options(*LoadingStrategies.event_summaries())
 
         if is_published:
             query = query.filter(Event.is_published==True)
 
-        if period and 'period' in period and 'value' in period:
-            period_type = period['period']
-            period_value = period['value']
-
-            if period_type == EventPeriods.TODAY:
-                query = query.filter(func.DATE(Event.start_datetime) == period_value)
-            elif period_type == EventPeriods.TOMORROW:
-                query = query.filter(func.DATE(Event.start_datetime) == period_value)
-            elif period_type == EventPeriods.THIS_WEEK:
-                [start_date, end_date] = period_value
-                query = query.filter(func.DATE(Event.start_datetime).between(start_date, end_date))
-            elif period_type == EventPeriods.THIS_MONTH:
-                [start_date, end_date] = period_value
-                query = query.filter(func.DATE(Event.start_datetime).between(start_date, end_date))
-            elif period_type == EventPeriods.NEXT_MONTH:
-                [start_date, end_date] = period_value
-                query = query.filter(func.DATE(Event.start_datetime).between(start_date, end_date))
-            elif period_type == EventPeriods.THIS_YEAR:
-                [start_date, end_date] = period_value
-                query = query.filter(func.DATE(Event.start_datetime).between(start_date, end_date))
+        period_filter = EventPeriods.predicate(Event.start_datetime, period)
+        if period_filter is not None:
+            query = query.filter(period_filter)
 
         if category:
             query = query.filter(Event.category_id == category.id)
 
-        if cursor and cursor.after:
-            query = query.filter(func.round(cast(func.extract('EPOCH', Event.created_at), Numeric), 3)
-                                 < func.round(cursor.get_after_as_float(), 3))
-
-        elif cursor and cursor.before:
-            query = query.filter(func.round(cast(func.extract('EPOCH', Event.created_at), Numeric), 3)
-                                 > func.round(cursor.get_before_as_float(), 3))
+        return cursor.paginate(query, Event.created_at)
 
-        events = query.order_by(Event.created_at.desc()).limit(cursor.limit).all()
-
-        if events:
-            cursor.set_before(events[0].created_at)
-            cursor.set_after(events[-1].created_at)
-            cursor.set_has_more(Event.has_more_events_summary(category, period, cursor, is_published))
-        else:
-            cursor.set_before(None)
-            cursor.set_after(None)
-            cursor.set_has_more(False)
+    @staticmethod
+    def get_home_feed(periods, cursors=None, limit=10, category_id=None, is_published=True):
+        """
+        Fetches the newest `limit` events of each period in one statement: the events of every period
+        are numbered with row_number() partitioned by period, and only the first limit + 1 of each
+        partition are loaded.
+        :param periods: period names (EventPeriods.PERIODS); unknown ones are ignored
+        :param cursors: {period: PaginationCursor}; a cursor's `after` position continues that period's
+            list, and every cursor is moved to the page returned for its period
+        :return: OrderedDict of period -> events, newest first
+        """
+        cursors = cursors if cursors is not None else {}
+        buckets = []
+        for period in periods:
+            period = EventPeriods.parse(period)
+            period_filter = EventPeriods.predicate(Event.start_datetime, period)
+            if period_filter is not None and period not in [bucket[0] for bucket in buckets]:
+                buckets.append((period, period_filter))
+        if not buckets:
+            return OrderedDict()
+
+        bucket_queries = []
+        for period, period_filter in buckets:
+            cursor = cursors.setdefault(period, PaginationCursor(cursor_limit=limit))
+            query = select([Event.id.label('event_id'),
+                            Event.created_at.label('created_at'),
+                            literal(period).label('period'),
+                            literal(cursor.limit + 1).label('max_position')]) \
+                .where(period_filter)
+            if is_published:
+                query = query.where(Event.is_published == True)
+            if category_id:
+                query = query.where(Event.category_id == category_id)
+            if cursor.after_key:
+                query = query.where(PaginationCursor._keyset_filter(Event.created_at, Event.id, cursor.after_key,
+                                                                    older=True))
+            bucket_queries.append(query)
+
+        matches = union_all(*bucket_queries).alias('feed_matches')
+        ranked = select([matches.c.event_id,
+                         matches.c.period,
+                         matches.c.max_position,
+                         func.row_number().over(partition_by=matches.c.period,
+                                                order_by=(matches.c.created_at.desc(), matches.c.event_id.desc()))
+                             .label('position')]) \
+            .alias('feed')
+        rows = db.session.query(Event, ranked.c.period) \
+            .options(*LoadingStrategies.event_summaries()) \
+            .join(ranked, ranked.c.event_id == Event.id) \
+            .filter(ranked.c.position <= ranked.c.max_position) \
+            .order_by(ranked.c.period, ranked.c.position) \
+            .all()
 
-        return events
+        feed = OrderedDict((period, []) for period, _ in buckets)
+        for event, period in rows:
+            feed[period].append(event)
+
+        for period, events in feed.items():
+            cursor = cursors[period]
+            cursor.set_has_more(len(events) > cursor.limit)
+            del events[cursor.limit:]
+            if events:
+                cursor.set_before(events[0].created_at, events[0].id)
+                cursor.set_after(events[-1].created_at, events[-1].id)
+            else:
+                cursor.set_before(None)
+                cursor.set_after(None)
+        return feed
 
     @staticmethod
     def get_event(event_id):
-        return db.session.query(Event).options(
-            joinedload(Event.recommendations),
-            joinedload(Event.organizers),
-            joinedload(Event.user),
-            joinedload(Event.category),
-            joinedload(Event.ticket_types),
-            joinedload(Event.contact_info),
-            joinedload(Event.speakers),
-            joinedload(Event.media),
-            joinedload(Event.ticket_types)
-        ).filter(Event.id == event_id).first()
+        return load_entity(Event, event_id, options=LoadingStrategies.event_details())
 
     def add_organizer(self, organizer):
         self.organizers += [organizer]
@@ -944,19 +882,24 @@ class Event(db.Model):
 
     def has_organizer(self, user):
         return db.session.query(
-            db.session.query(EventOrganizer).filter(EventOrganizer.user_id == user.id).exists()).scalar()
+            db.session.query(EventOrganizer)
+                .filter(EventOrganizer.event_id == self.id)
+                .filter(EventOrganizer.user_id == user.id).exists()).scalar()
 
     def clear_organizers(self):
         db.session.query(EventOrganizer).filter(EventOrganizer.event_id == self.id).delete()
         db.session.commit()
+        invalidate_event_feeds()
 
     def clear_sponsors(self):
         db.session.query(EventSponsor).filter(EventSponsor.event_id == self.id).delete()
         db.session.commit()
+        invalidate_event_feeds()
 
     def clear_contact_infos(self):
         db.session.query(EventContactInfo).filter(EventContactInfo.event_id == self.id).delete()
         db.session.commit()
+        invalidate_event_feeds()
 
     def clear_categories(self):
         self.category_id = None
@@ -988,13 +931,8 @@ class Event(db.Model):
         db.session.commit()
 
     def get_speaker(self, speaker_id):
-        if not self.has_speaker(speaker_id):
-            raise exceptions.EventSpeakerNotFound()
-
-        return db.session.query(EventSpeaker) \
-            .options(joinedload(EventSpeaker.social_account), joinedload(EventSpeaker.profession)) \
-            .filter(EventSpeaker.id == speaker_id) \
-            .first()
+        return load_entity(EventSpeaker, speaker_id, exceptions.EventSpeakerNotFound, owner=('event_id', self.id),
+                           options=(joinedload(EventSpeaker.social_account), joinedload(EventSpeaker.profession)))
 
     def get_speakers(self):
         return db.session.query(EventSpeaker).filter(EventSpeaker.event_id == self.id).all()
@@ -1051,11 +989,7 @@ class Event(db.Model):
         return db.session.query(EventSponsor).filter(EventSponsor.event_id == self.id).all()
 
     def get_sponsor(self, sponsor_id):
-        if not self.has_sponsor(sponsor_id):
-            raise exceptions.EventSponsorNotFound()
-
-        return db.session.query(EventSponsor).filter(EventSponsor.event_id == self.id).filter(
-            EventSponsor.id == sponsor_id).first()
+        return load_entity(EventSponsor, sponsor_id, exceptions.EventSponsorNotFound, owner=('event_id', self.id))
 
     def has_sponsor(self, sponsor_id=None):
         return db.session.query(db.session.query(EventSponsor).filter(EventSponsor.event_id == self.id).filter(
@@ -1123,152 +1057,78 @@ class Event(db.Model):
         return db.session.query(EventReview).filter(EventReview.event_id == self.id).count()
 
     def get_review_only(self, review_id):
-        if not self.has_review(review_id):
-            raise exceptions.EventReviewNotFound()
-
-        return db.session.query(EventReview) \
-            .filter(EventReview.id == review_id) \
-            .first()
+        return load_entity(EventReview, review_id, exceptions.EventReviewNotFound, owner=('event_id', self.id))
 
     def get_review(self, review_id):
-        if not self.has_review(review_id):
-            raise exceptions.EventReviewNotFound()
+        return load_entity(EventReview, review_id, exceptions.EventReviewNotFound, owner=('event_id', self.id),
+                           options=(joinedload(EventReview.author),
+                                    joinedload(EventReview.media)))
 
-        return db.session.query(EventReview).options(
-            joinedload(EventReview.author),
-            joinedload(EventReview.media),
-            joinedload(EventReview.upvotes),
-            joinedload(EventReview.downvotes)
-        ).filter(EventReview.id == review_id).first()
+    def get_reviews(self, cursor):
+        query = db.session.query(EventReview) \
+            .options(*LoadingStrategies.reviews()) \
+            .filter(EventReview.event_id == self.id)
 
-    def has_more_reviews(self, cursor):
-        _cursor = copy.copy(cursor)
-        more_reviews = self.get_reviews(_cursor)
-        print("has_more_reviews##", more_reviews)
-        return len(more_reviews) > 0
+        return cursor.paginate(query, EventReview.created_at)
 
-    def get_reviews(self, cursor):
-        query = db.session.query(EventReview).options(
-            joinedload(EventReview.author),
-            joinedload(EventReview.media),
-            joinedload(EventReview.upvotes),
-            joinedload(EventReview.downvotes),
-            joinedload(EventReview.comments),
-            joinedload(EventReview.event),
-        ).filter(EventReview.event_id == self.id)
-
-        if cursor and cursor.after:
-            query = query.filter(
-                func.round(cast(func.extract('EPOCH', EventReview.created_at), Numeric), 3) < func.round(
-                    cursor.get_after_as_float(), 3))
+    def add_stream_post(self, post):
+        post.event_id = self.id
+        db.session.add(post)
+        db.session.commit()
+        return post
 
-        elif cursor and cursor.before:
-            query = query.filter(
-                func.round(cast(func.extract('EPOCH', EventReview.created_at), Numeric), 3) > func.round(
-                    cursor.get_before_as_float(), 3))
+    def get_stream_posts(self, cursor):
+        query = db.session.query(EventStream) \
+            .options(*LoadingStrategies.stream_posts()) \
+            .filter(EventStream.event_id == self.id)
 
-        reviews = query.order_by(EventReview.created_at.desc()).limit(cursor.limit).all()
+        return cursor.paginate(query, EventStream.published_at)
+
+    def get_stream_posts_after(self, key, limit):
+        """
+        Posts published after the keyset position `key`, oldest first, to replay what a live stream client missed
+        :param key: (published_at, id) of the last post the client saw, as decoded from its `Last-Event-ID`
+        """
+        published_at, post_id = key
+        query = db.session.query(EventStream) \
+            .options(*LoadingStrategies.stream_posts()) \
+            .filter(EventStream.event_id == self.id)
 
-        if reviews:
-            cursor.set_before(reviews[0].created_at)
-            cursor.set_after(reviews[-1].created_at)
-            cursor.set_has_more(self.has_more_reviews(cursor))
+        if post_id is None:
+            query = query.filter(EventStream.published_at > published_at)
         else:
-            cursor.set_before(None)
-            cursor.set_after(None)
-            cursor.set_has_more(False)
+            query = query.filter(tuple_(EventStream.published_at, EventStream.id) > tuple_(published_at, post_id))
 
-        return reviews
+        return query.order_by(EventStream.published_at.asc(), EventStream.id.asc()).limit(limit).all()
 
     @staticmethod
-    def search_for_events(searchterm=None, category=None, period=None, country=None, cursor=None, is_published=True):
-        # @todo use a more advance db.Text search tool
-        query = db.session.query(Event).filter(Event.is_published==is_published).filter(Event.name.ilike('%' + searchterm + '%'))
+    def _search_query(searchterm, category=None, period=None, country=None, is_published=True):
+        match, rank = text_search(Event.search_vector, Event.name, searchterm)
+        query = db.session.query(Event).filter(Event.is_published == is_published).filter(match)
 
         if category and category != 'all':
             query = query.filter(Event.category_id == category.id)
 
-        if period and period != 'any':
-            period_value = EventPeriods.get_date(period)['value']
-
-            if period == EventPeriods.TODAY:
-                query = query.filter(func.DATE(Event.start_datetime) == period_value)
-            elif period == EventPeriods.TOMORROW:
-                query = query.filter(func.DATE(Event.start_datetime) == period_value)
-            elif period == EventPeriods.THIS_WEEK:
-                [start_date, end_date] = period_value
-                query = query.filter(func.DATE(Event.start_datetime).between(start_date, end_date))
-            elif period == EventPeriods.THIS_MONTH:
-                [start_date, end_date] = period_value
-                query = query.filter(func.DATE(Event.start_datetime).between(start_date, end_date))
-            elif period == EventPeriods.NEXT_MONTH:
-                start_date = period_value[0]
-                query = query.filter(func.DATE(Event.start_datetime) >= start_date)
-            elif period == EventPeriods.THIS_YEAR:
-                [start_date, end_date] = period_value
-                query = query.filter(func.DATE(Event.start_datetime).between(start_date, end_date))
-            elif period == EventPeriods.NEXT_YEAR:
-                [start_date, end_date] = period_value
-                query = query.filter(func.DATE(Event.start_datetime).between(start_date, end_date))
+        period_filter = EventPeriods.predicate(Event.start_datetime, period)
+        if period_filter is not None:
+            query = query.filter(period_filter)
 
         if country:
-            query = query.filter(Event.name.ilike('%' + country + '%'))
-
-        if cursor and cursor.after:
-            query = query.filter(func.round(cast(func.extract('EPOCH', Event.created_at), Numeric), 3)
-                                 < func.round( cursor.get_after_as_float(), 3))
-
-        elif cursor and cursor.before:
-            query = query.filter(func.round(cast(func.extract('EPOCH', Event.created_at), Numeric), 3)
-                                 > func.round(cursor.get_before_as_float(), 3))
-
-        if cursor and cursor.limit:
-            query = query.order_by(Event.created_at.desc()).limit(cursor.limit)
-
-        events = query.all()
-
-        if events:
-            cursor.set_before(events[0].created_at)
-            cursor.set_after(events[-1].created_at)
-        else:
-            cursor.set_before(None)
-            cursor.set_after(None)
+            # events have no country column; the venue address carries it, given either by name or by code
+            known_country = Country.get_country_by_code(country)
+            country_name = known_country.name if known_country else country
+            query = query.filter(Event.venue.ilike('%' + country_name + '%'))
 
-        return events
-
-    def search_for_events_total(searchterm=None, category=None, period=None, country=None):
-        # @todo use a more advance db.Text search tool
-        query = db.session.query(Event).filter(Event.name.ilike('%' + searchterm + '%'))
-        if category and category != 'all':
-            query = query.filter(Event.category_id == category.id)
+        return query, rank
 
-        if period and period != 'any':
-            period_value = EventPeriods.get_date(period)['value']
-
-            if period == EventPeriods.TODAY:
-                query = query.filter(func.DATE(Event.start_datetime) == period_value)
-            elif period == EventPeriods.TOMORROW:
-                query = query.filter(func.DATE(Event.start_datetime) == period_value)
-            elif period == EventPeriods.THIS_WEEK:
-                start_date = period_value[0]
-                end_date = period_value[1]
-                query = query.filter(func.DATE(Event.start_datetime).between(start_date, end_date))
-            elif period == EventPeriods.THIS_MONTH:
-                start_date = period_value[0]
-                end_date = period_value[1]
-                query = query.filter(func.DATE(Event.start_datetime).between(start_date, end_date))
-            elif period == EventPeriods.NEXT_MONTH:
-                start_date = period_value[0]
-                query = query.filter(func.DATE(Event.start_datetime) >= start_date)
-            elif period == EventPeriods.THIS_YEAR:
-                start_date = period_value[0]
-                end_date = period_value[1]
-                query = query.filter(func.DATE(Event.start_datetime).between(start_date, end_date))
-            elif period == EventPeriods.NEXT_YEAR:
-                start_date = period_value[0]
-                end_date = period_value[1]
-                query = query.filter(func.DATE(Event.start_datetime).between(start_date, end_date))
+    @staticmethod
+    def search_for_events(searchterm=None, category=None, period=None, country=None, cursor=None, is_published=True):
+        query, rank = Event._search_query(searchterm, category, period, country, is_published)
+        return cursor.paginate_ranked(query, rank, Event.id)
 
+    @staticmethod
+    def search_for_events_total(searchterm=None, category=None, period=None, country=None, is_published=True):
+        query, rank = Event._search_query(searchterm, category, period, country, is_published)
         return query.count()
 
     def has_media_file(self, file_id):
@@ -1278,10 +1138,7 @@ class Event(db.Model):
                                 .exists()).scalar()
 
     def get_media_file(self, file_id):
-        if not self.has_media_file(file_id):
-            raise exceptions.MediaNotFound()
-        return db.session.query(EventMedia).filter(EventMedia.id == file_id).filter(
-            EventMedia.event_id == self.id).first()
+        return load_entity(EventMedia, file_id, exceptions.MediaNotFound, owner=('event_id', self.id))
 
     def set_as_poster(self, file):
         file.poster = True
@@ -1296,8 +1153,12 @@ class Event(db.Model):
         db.session.commit()
 
     def get_poster(self):
-        image = db.session.query(EventMedia).filter(EventMedia.event_id == self.id).filter(
-            EventMedia.poster == True).first()
+        if 'media' in self.__dict__:
+            # already loaded by the listing, no need to ask the database again
+            image = next((media for media in self.media if media.poster), None)
+        else:
+            image = db.session.query(EventMedia).filter(EventMedia.event_id == self.id).filter(
+                EventMedia.poster == True).first()
         return image.source_url if image  else utils.NO_IMAGE
 
 
@@ -1346,6 +1207,16 @@ class EventMedia(db.Model):
         db.session.add(media)
         return media
 
+    @classmethod
+    def create_many(cls, event, stored_media):
+        """Persist one row per uploaded file in a single flush and commit."""
+        media = [cls(source_url=stored.source_url, format=stored.format, event=event, public_id=stored.public_id)
+                 for stored in stored_media]
+        db.session.add_all(media)
+        db.session.commit()
+        invalidate_event_feeds()
+        return media
+
     def add_source_url(self, url):
         self.source_url = url
         db.session.commit()
@@ -1368,6 +1239,7 @@ class EventMedia(db.Model):
     def delete(self):
         db.session.query(EventMedia).filter(EventMedia.id == self.id).delete()
         db.session.commit()
+        invalidate_event_feeds()
 
 
 class EventSpeaker(db.Model):
@@ -1413,7 +1285,7 @@ class EventSpeaker(db.Model):
 
     @staticmethod
     def get_speaker(speaker_id):
-        return db.session.query(EventSpeaker).filter(EventSpeaker.id == speaker_id).first()
+        return load_entity(EventSpeaker, speaker_id)
 
     def update(self, name=None, social_account_id=None, social_account=None, social_account_handle=None,
                profession_id=None, profession=None, event=None, event_id=None, image=utils.NO_IMAGE):
@@ -1468,9 +1340,7 @@ class EventCategory(db.Model):
 
     @classmethod
     def get_category(cls, category_id):
-        if not cls.has_category(category_id):
-            raise exceptions.EventCategoryNotFound()
-        return db.session.query(EventCategory).filter(EventCategory.id == category_id).first()
+        return load_entity(EventCategory, category_id, exceptions.EventCategoryNotFound)
 
     @staticmethod
     def has_category(category_id):
@@ -1497,7 +1367,10 @@ class EventCategory(db.Model):
 
     @classmethod
     def find_category_by_slug(cls, slug):
-        return db.session.query(EventCategory).filter(EventCategory.slug.ilike('%' + slug + '%')).first()
+        baked_query = compiled_queries.bake(lambda session: session.query(EventCategory)
+                                            .filter(EventCategory.slug.ilike(bindparam('slug_pattern'))))
+        return compiled_queries.first('EventCategory.find_category_by_slug', baked_query, db.session,
+                                      slug_pattern='%' + slug + '%')
 
     @classmethod
     def find_category_by_searchterm(cls, search_term):
@@ -1508,6 +1381,9 @@ class EventCategory(db.Model):
 
 class EventBookmark(db.Model):
     __tablename__ = 'event_bookmarks'
+    __table_args__ = (
+        db.Index('ix_event_bookmarks_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+    )
 
     id = db.Column(db.String, primary_key=True)
     user = relationship('User')
@@ -1535,7 +1411,7 @@ class EventBookmark(db.Model):
     def create(cls, event, user):
         bookmark = cls(event, user)
         db.session.add(bookmark)
-        db.session.commit()
+        db.session.flush()
         return bookmark
 
     @staticmethod
@@ -1544,7 +1420,6 @@ class EventBookmark(db.Model):
             .filter(EventBookmark.event_id == event.id) \
             .filter(EventBookmark.user_id == user.id) \
             .delete()
-        db.session.commit()
 
     def get_events_bookmarked_by_user(self, user_id):
         events = db.session.query(Event).filter(Event.bookmarks.any(EventBookmark.user_id == user_id)).all()
@@ -1586,6 +1461,8 @@ class EventTicketType(db.Model):
     price = db.Column(db.Float)
     total_qty = db.Column(db.Float)
     remaining_qty = db.Column(db.Float)
+    sold_qty = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    reserved_qty = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     event = relationship(Event)
     event_id = db.Column(db.String, db.ForeignKey('events.id', ondelete='CASCADE', onupdate='CASCADE'))
     created_at = db.Column(db.DateTime, default=datetime.now())
@@ -1597,6 +1474,8 @@ class EventTicketType(db.Model):
         self.name = name
         self.price = price
         self.total_qty = total_qty
+        self.sold_qty = 0
+        self.reserved_qty = 0
         self.event = event
         self.discounts = discounts
 
@@ -1616,17 +1495,24 @@ class EventTicketType(db.Model):
 
     @classmethod
     def get_ticket_type(cls, ticket_type_id):
-        if not cls.has_ticket_type(ticket_type_id):
-            raise exceptions.TicketTypeNotFound()
-
-        return db.session.query(EventTicketType).filter(EventTicketType.id == ticket_type_id).first()
+        return load_entity(EventTicketType, ticket_type_id, exceptions.TicketTypeNotFound)
 
     def is_same(self, ticket_type):
         return ticket_type.id == self.id
 
+    @classmethod
+    def get_ticket_types(cls, ticket_type_ids):
+        """
+        Fetches several ticket types with one query
+        :param ticket_type_ids:
+        :return: {ticket_type_id: ticket_type, ...}
+        """
+        ticket_types = load_entities(EventTicketType, ticket_type_ids, exceptions.TicketTypeNotFound)
+        return {ticket_type.id: ticket_type for ticket_type in ticket_types}
+
     def get_available_qty(self):
         """
-        Returns total_qty - (purchased_tickets + reserved_tickets)
+        Returns total_qty - (sold_qty + reserved_qty)
         :return:
         """
         return self.total_qty - (self.get_purchased_qty() + self.get_reserved_qty())
@@ -1636,21 +1522,104 @@ class EventTicketType(db.Model):
         Returns the  number of unpurchased tickets excluding reserved tickets
         :return:
         """
-        purchased_qty = self.get_purchased_qty()
-        return self.total_qty - purchased_qty
+        return self.total_qty - self.get_purchased_qty()
 
     def get_reserved_qty(self):
-        result = db.session.query(func.coalesce(func.sum(EventTicketReservation.total_tickets_qty), 0)) \
-            .filter(EventTicketReservation.expires_at > datetime.now()) \
-            .filter(EventTicketReservation.reservation_lines.any(EventTicketReservationLine.ticket_type == self)) \
-            .first()
-        return result[0]
+        return self.reserved_qty or 0
 
     def get_purchased_qty(self):
-        qty = db.session.query(EventTicketSaleLine) \
-            .filter(EventTicketSaleLine.ticket_type_id == self.id) \
-            .count()
-        return qty
+        return self.sold_qty or 0
+
+    def _apply_counters(self, row):
+        # keep the in-session instance in step with what the UPDATE wrote, without reloading it
+        set_committed_value(self, 'sold_qty', row.sold_qty)
+        set_committed_value(self, 'reserved_qty', row.reserved_qty)
+
+    def reserve(self, qty):
+        """
+        Atomically moves qty tickets from available to reserved.
+        Runs UPDATE ... WHERE available >= qty RETURNING, so concurrent buyers can never oversell.
+        When that falls short, expired holds on this ticket type are released and it is tried once more
+        :param qty:
+        :return:
+        """
+        table = EventTicketType.__table__
+        statement = table.update() \
+            .where(table.c.id == self.id) \
+            .where(table.c.total_qty - table.c.sold_qty - table.c.reserved_qty >= qty) \
+            .values(reserved_qty=table.c.reserved_qty + qty) \
+            .returning(table.c.sold_qty, table.c.reserved_qty)
+        row = db.session.execute(statement).first()
+        if row is None and EventTicketReservation.release_expired_holds(self.id):
+            row = db.session.execute(statement).first()
+
+        if row is None:
+            raise exceptions.InsufficientTicketsAvailable(ticket_type=self)
+        self._apply_counters(row)
+
+    def sell(self, qty, reserved_qty=0):
+        """
+        Atomically records qty tickets as sold, converting up to reserved_qty of the buyer's own reservation.
+        Like reserve, releases expired holds on this ticket type and retries once when availability falls short
+        :param qty:
+        :param reserved_qty: tickets of this type the buyer was already holding
+        :return:
+        """
+        table = EventTicketType.__table__
+        statement = table.update() \
+            .where(table.c.id == self.id) \
+            .where(table.c.total_qty - table.c.sold_qty - table.c.reserved_qty + reserved_qty >= qty) \
+            .values(sold_qty=table.c.sold_qty + qty, reserved_qty=table.c.reserved_qty - reserved_qty) \
+            .returning(table.c.sold_qty, table.c.reserved_qty)
+        row = db.session.execute(statement).first()
+        if row is None and EventTicketReservation.release_expired_holds(self.id):
+            row = db.session.execute(statement).first()
+
+        if row is None:
+            raise exceptions.UnvailableTickets()
+        self._apply_counters(row)
+
+    @staticmethod
+    def release_reserved_qty(released_qty):
+        """
+        Returns reserved tickets to the available pool
+        :param released_qty: {ticket_type_id: qty, ...}
+        :return:
+        """
+        table = EventTicketType.__table__
+        for ticket_type_id, qty in released_qty.items():
+            if qty <= 0:
+                continue
+            db.session.execute(
+                table.update()
+                    .where(table.c.id == ticket_type_id)
+                    .values(reserved_qty=func.greatest(table.c.reserved_qty - qty, 0))
+            )
+
+    @staticmethod
+    def reconcile_inventory():
+        """
+        Rebuilds sold_qty and reserved_qty from ticket_sale_lines and the lines of unexpired reservations
+        :return: ids of the ticket types whose counters had drifted
+        """
+        table = EventTicketType.__table__
+        ledger_sold_qty = select([func.coalesce(func.sum(EventTicketSaleLine.ticket_qty), 0)]) \
+            .where(EventTicketSaleLine.ticket_type_id == table.c.id) \
+            .as_scalar()
+        ledger_reserved_qty = select([func.coalesce(func.sum(EventTicketReservationLine.ticket_qty), 0)]) \
+            .where(EventTicketReservationLine.ticket_type_id == table.c.id) \
+            .where(EventTicketReservationLine.reservation_id == EventTicketReservation.id) \
+            .where(EventTicketReservation.expires_at > datetime.now()) \
+            .as_scalar()
+
+        rows = db.session.execute(
+            table.update()
+                .where(or_(table.c.sold_qty != ledger_sold_qty, table.c.reserved_qty != ledger_reserved_qty))
+                .values(sold_qty=ledger_sold_qty, reserved_qty=ledger_reserved_qty)
+                .returning(table.c.id)
+        ).fetchall()
+        db.session.commit()
+        return [row.id for row in rows]
 
     def set_remaining_qty(self, qty):
         self.remaining_qty = qty
@@ -1658,9 +1627,7 @@ class EventTicketType(db.Model):
 
     @classmethod
     def get_ticket_type(cls, ticket_type_id):
-        if not cls.has_ticket_type(ticket_type_id):
-            raise exceptions.TicketTypeNotFound()
-        return db.session.query(EventTicketType).filter(EventTicketType.id == ticket_type_id).first()
+        return load_entity(EventTicketType, ticket_type_id, exceptions.TicketTypeNotFound)
 
     @staticmethod
     def has_ticket_type(ticket_type_id):
@@ -1672,6 +1639,7 @@ class EventTicketType(db.Model):
             raise exceptions.TicketNotFound()
         db.session.query(EventTicketType).filter(EventTicketType.id == ticket_type_id).delete()
         db.session.commit()
+        invalidate_event_feeds()
 
     def add_discount(self, discount):
         self.discounts.append(discount)
@@ -1681,6 +1649,12 @@ class EventTicketType(db.Model):
 
     def get_discounts(self):
         pdate = datetime.now()
+        if 'discounts' in self.__dict__:
+            # already loaded by the listing, no need to ask the database again
+            return [discount for discount in self.discounts
+                    if discount.from_datetime is not None and discount.to_datetime is not None
+                    and discount.from_datetime <= pdate <= discount.to_datetime]
+
         discounts = db.session.query(EventTicketDiscount) \
             .filter(EventTicketDiscount.ticket_type_id == self.id) \
             .filter(EventTicketDiscount.from_datetime <= pdate) \
@@ -1720,43 +1694,167 @@ class EventTicketReservation(db.Model):
             .count()
         return bool(count)
 
-    @staticmethod
-    def _check_insufficient_tickets_and_raise_exception(reservation_lines):
-        """
-        :param reservation_lines: [[ticket_type, ticket_qty], ...]
-        :return:
-        """
-        for line in reservation_lines:
-            ticket_type = line[0]
-            ticket_qty = line[1]
-            if ticket_type.get_available_qty() < ticket_qty:
-                raise exceptions.InsufficientTicketsAvailable()
-
     @classmethod
     def create_reservation(cls, reservation_lines=[], reservation_by=None):
         """
+        Reserves every line against the ticket type counters in one transaction;
+        if any line cannot be covered nothing is reserved.
         :param reservation_lines: [[ticket_type, ticket_qty], [ticket_type, ticket_qty], ...]
         :param reservation_by:
         :return:
         """
-        cls._check_insufficient_tickets_and_raise_exception(reservation_lines)
+        if cls.has_reservation_from(reservation_by):
+            raise exceptions.AlreadyHasTicketReservation(reservation=cls.get_reservation_from(reservation_by))
+
+        try:
+            for ticket_type, ticket_qty in reservation_lines:
+                ticket_type.reserve(ticket_qty)
+        except exceptions.InsufficientTicketsAvailable:
+            db.session.rollback()
+            raise
 
         reservation_lines_obj = list(
             map(lambda line: EventTicketReservationLine(ticket_type=line[0], ticket_qty=line[1]), reservation_lines))
-        if cls.has_reservation_from(reservation_by):
-            raise exceptions.AlreadyHasTicketReservation(reservation=cls.get_reservation_from(reservation_by))
         reservation = cls(reservation_lines_obj, reservation_by)
         db.session.add(reservation)
         db.session.commit()
         return reservation
 
+    @staticmethod
+    def _delete_reservations(reservation_ids):
+        """
+        Deletes reservations and their lines without touching the counters.
+        The lines are removed with DELETE ... RETURNING, so each reserved ticket is handed back exactly once
+        :param reservation_ids:
+        :return: {ticket_type_id: qty, ...} that was held by the deleted lines
+        """
+        lines_table = EventTicketReservationLine.__table__
+        reservations_table = EventTicketReservation.__table__
+
+        if not reservation_ids:
+            return {}
+
+        lines = db.session.execute(
+            lines_table.delete()
+                .where(lines_table.c.reservation_id.in_(reservation_ids))
+                .returning(lines_table.c.ticket_type_id, lines_table.c.ticket_qty)
+        ).fetchall()
+        db.session.execute(reservations_table.delete().where(reservations_table.c.id.in_(reservation_ids)))
+
+        released_qty = {}
+        for line in lines:
+            released_qty[line.ticket_type_id] = released_qty.get(line.ticket_type_id, 0) + int(line.ticket_qty or 0)
+        return released_qty
+
+    @staticmethod
+    def take_reservations_of(reservations_by, event_id=None):
+        """
+        Removes a user's reservations, leaving the caller to release or convert the held tickets
+        :param reservations_by:
+        :param event_id: only take the tickets held for this event's ticket types; holds on other events are
+            kept, and a reservation is only deleted once none of its lines are left
+        :return: {ticket_type_id: qty, ...}
+        """
+        table = EventTicketReservation.__table__
+        reservation_ids = [row.id for row in db.session.execute(
+            select([table.c.id]).where(table.c.reservation_by_id == reservations_by.id)
+        ).fetchall()]
+        if event_id is None:
+            return EventTicketReservation._delete_reservations(reservation_ids)
+        if not reservation_ids:
+            return {}
+
+        lines_table = EventTicketReservationLine.__table__
+        ticket_types_table = EventTicketType.__table__
+        lines = db.session.execute(
+            lines_table.delete()
+                .where(lines_table.c.reservation_id.in_(reservation_ids))
+                .where(lines_table.c.ticket_type_id.in_(
+                    select([ticket_types_table.c.id]).where(ticket_types_table.c.event_id == event_id)))
+                .returning(lines_table.c.reservation_id, lines_table.c.ticket_type_id, lines_table.c.ticket_qty)
+        ).fetchall()
+
+        released_qty, taken_by_reservation = {}, {}
+        for line in lines:
+            qty = int(line.ticket_qty or 0)
+            released_qty[line.ticket_type_id] = released_qty.get(line.ticket_type_id, 0) + qty
+            taken_by_reservation[line.reservation_id] = taken_by_reservation.get(line.reservation_id, 0) + qty
+
+        for reservation_id, qty in taken_by_reservation.items():
+            db.session.execute(table.update()
+                               .where(table.c.id == reservation_id)
+                               .values(total_tickets_qty=table.c.total_tickets_qty - qty))
+        if taken_by_reservation:
+            db.session.execute(table.delete()
+                               .where(table.c.id.in_(list(taken_by_reservation)))
+                               .where(~exists().where(lines_table.c.reservation_id == table.c.id)))
+        return released_qty
+
+    @staticmethod
+    def sweep_expired_reservations(batch_size=500, max_batches=None):
+        """
+        Deletes expired reservations in batches of batch_size and releases their tickets to the counters.
+        Each batch is its own transaction and skips rows locked by another sweeper or checkout
+        :param batch_size:
+        :param max_batches: stop after this many batches, None sweeps until nothing is expired
+        :return: {'reservations': n, 'tickets': n, 'ticket_types': {ticket_type_id: qty, ...}}
+        """
+        table = EventTicketReservation.__table__
+        reclaimed = {'reservations': 0, 'tickets': 0, 'ticket_types': {}}
+        batches = 0
+
+        while max_batches is None or batches < max_batches:
+            reservation_ids = [row.id for row in db.session.execute(
+                select([table.c.id])
+                    .where(table.c.expires_at < datetime.now())
+                    .order_by(table.c.expires_at)
+                    .limit(batch_size)
+                    .with_for_update(skip_locked=True)
+            ).fetchall()]
+            if not reservation_ids:
+                break
+
+            released_qty = EventTicketReservation._delete_reservations(reservation_ids)
+            EventTicketType.release_reserved_qty(released_qty)
+            db.session.commit()
+            batches += 1
+
+            reclaimed['reservations'] += len(reservation_ids)
+            for ticket_type_id, qty in released_qty.items():
+                reclaimed['tickets'] += qty
+                reclaimed['ticket_types'][ticket_type_id] = reclaimed['ticket_types'].get(ticket_type_id, 0) + qty
+
+            if len(reservation_ids) < batch_size:
+                break
+
+        db.session.commit()
+        return reclaimed
+
+    @staticmethod
+    def release_expired_holds(ticket_type_id):
+        """
+        Deletes the expired reservations holding tickets of ticket_type_id and releases all their tickets,
+        within the caller's transaction. Reservations locked by a sweeper or checkout are left to them
+        :param ticket_type_id:
+        :return: {ticket_type_id: qty, ...} released, empty when nothing was held by an expired reservation
+        """
+        table = EventTicketReservation.__table__
+        lines_table = EventTicketReservationLine.__table__
+        reservation_ids = [row.id for row in db.session.execute(
+            select([table.c.id])
+                .where(table.c.expires_at < datetime.now())
+                .where(exists().where(lines_table.c.reservation_id == table.c.id)
+                       .where(lines_table.c.ticket_type_id == ticket_type_id))
+                .with_for_update(skip_locked=True)
+        ).fetchall()]
+
+        released_qty = EventTicketReservation._delete_reservations(reservation_ids)
+        EventTicketType.release_reserved_qty(released_qty)
+        return released_qty
+
     @classmethod
     def get_reservation(cls, reservation_id):
-        if not cls.reservation_exists(reservation_id):
-            raise exceptions.TicketReservationNotFound()
-        return db.session.query(EventTicketReservation) \
-            .filter(EventTicketReservation.id == reservation_id) \
-            .first()
+        return load_entity(EventTicketReservation, reservation_id, exceptions.TicketReservationNotFound)
 
     @staticmethod
     def reservation_exists(reservation_id):
@@ -1784,9 +1882,8 @@ class EventTicketReservation(db.Model):
         :param reservations_by:
         :return:
         """
-        db.session.query(EventTicketReservation) \
-            .filter(EventTicketReservation.reservation_by == reservations_by) \
-            .delete()
+        released_qty = EventTicketReservation.take_reservations_of(reservations_by)
+        EventTicketType.release_reserved_qty(released_qty)
         db.session.commit()
 
 
@@ -1984,24 +2081,42 @@ class EventTicketSaleOrder(db.Model):
         :param tickets: [{ticket_type: None, ticket_qty: 0}, ...}
         :return:
         """
+        # tickets the customer is holding through a reservation are converted instead of being counted twice
+        reserved_qty = EventTicketReservation.take_reservations_of(customer, event_id=event.id)
+
         sale_order = cls(event=event, customer=customer)
-        for ticket in tickets:
-            ticket_type = ticket['ticket_type']
-            ticket_qty = ticket['ticket_qty']
-            if ticket_type.get_unpurchased_qty() < ticket_qty:
-                raise exceptions.UnvailableTickets()
-            sale_order.sale_lines.append(
-                EventTicketSaleLine(sale_order=sale_order, ticket_type=ticket_type, ticket_qty=ticket_qty)
-            )
+        try:
+            for ticket in tickets:
+                ticket_type = ticket['ticket_type']
+                ticket_qty = ticket['ticket_qty']
+                if ticket_qty < 1:
+                    raise exceptions.UnvailableTickets()
+                held_qty = min(reserved_qty.get(ticket_type.id, 0), ticket_qty)
+                ticket_type.sell(ticket_qty, reserved_qty=held_qty)
+                reserved_qty[ticket_type.id] = reserved_qty.get(ticket_type.id, 0) - held_qty
+                sale_order.sale_lines.append(
+                    EventTicketSaleLine(sale_order=sale_order, ticket_type=ticket_type, ticket_qty=ticket_qty)
+                )
+        except exceptions.UnvailableTickets:
+            db.session.rollback()
+            raise
+
+        EventTicketType.release_reserved_qty(reserved_qty)
 
         sale_amount = 0
         for order_line in sale_order.sale_lines:
             order_line.apply_discounts()
-            order_line.create_tickets()
             sale_amount += order_line.net_amount
 
         sale_order.net_amount = sale_amount
         db.session.add(sale_order)
+        # the order, its lines and discounts must have rows before the tickets can point at them
+        db.session.flush()
+
+        for order_line in sale_order.sale_lines:
+            order_line.create_tickets()
+
+        EventAttendee.refresh(event.id, [customer.id])
         db.session.commit()
         return sale_order
 
@@ -2056,9 +2171,30 @@ class EventTicketSaleLine(db.Model):
         return cls(ticket_type, ticket_qty, sale_order)
 
     def create_tickets(self):
-        for i in range(1, self.ticket_qty + 1):
-            ticket = EventTicket(sale_line=self)
-            self.tickets.append(ticket)
+        """
+        Issues ticket_qty tickets for this line with a single multi-row INSERT in the current transaction.
+        The line and its sale order must already be flushed
+        :return: the inserted ticket rows
+        """
+        sale_order = self.sale_order
+        created_at = datetime.now()
+        tickets = []
+        for i in range(self.ticket_qty):
+            ticket_id = str(uuid.uuid4())
+            tickets.append({
+                'id': ticket_id,
+                'ref': utils.gen_ticket_ref(ticket_id),
+                'event_id': sale_order.event_id,
+                'owner_id': sale_order.customer_id,
+                'sale_line_id': self.id,
+                'sale_order_id': sale_order.id,
+                'ticket_type_id': self.ticket_type_id,
+                'created_at': created_at
+            })
+
+        if tickets:
+            db.session.execute(EventTicket.__table__.insert(), tickets)
+        return tickets
 
     def apply_discounts(self):
         discount_amount = 0
@@ -2149,7 +2285,7 @@ class EventTicketDiscount(db.Model):
 
     @classmethod
     def get_discount(cls, discount_id):
-        return db.session.query(EventTicketDiscount).filter(EventTicketDiscount.id == discount_id).delete()
+        return load_entity(EventTicketDiscount, discount_id, exceptions.TicketDiscountNotFound)
 
     def update(self):
         db.session.add(self)
@@ -2283,6 +2419,7 @@ class EventTicket(db.Model):
             .all()
 
     def assign_to(self, user):
+        """Assigns the ticket in the caller's transaction; the caller commits, with any notification intent."""
         if user:
             if self.user_has_tickets_for_event(self.event, user):
                 raise exceptions.AlreadyHasTicketsForEvent()
@@ -2290,17 +2427,20 @@ class EventTicket(db.Model):
                                                                 assigned_by=self.sale_order.customer, assigned_to=user)]
             self.is_assigned = True
             db.session.add(self)
-            db.session.commit()
+            db.session.flush()
+            EventAttendee.refresh(self.event_id, [self.owner_id, user.id])
 
     def unassign_from(self, user):
+        """Revokes the assignment in the caller's transaction; the caller commits."""
         if not self.is_assigned_to(user):
             raise exceptions.TicketNotAssignedToUser()
 
         db.session.query(EventTicketTypeAssignment) \
+            .filter(EventTicketTypeAssignment.ticket_id == self.id) \
             .filter(EventTicketTypeAssignment.assigned_to == user) \
-            .delete()
+            .delete(synchronize_session=False)
         self.is_assigned = False
-        db.session.commit()
+        EventAttendee.refresh(self.event_id, [self.owner_id, user.id])
 
     def is_assigned(self):
         count = db.session.query(EventTicketTypeAssignment) \
@@ -2366,28 +2506,32 @@ class EventTicket(db.Model):
 
     @classmethod
     def get_ticket(cls, ticket_id):
-        if not cls.has_ticket(ticket_id):
-            raise exceptions.TicketNotFound()
-        return db.session.query(EventTicket) \
-            .options(joinedload(EventTicket.owner),
-                     joinedload(EventTicket.assignment)
-                     ) \
-            .filter(EventTicket.id == ticket_id) \
-            .first()
+        return load_entity(EventTicket, ticket_id, exceptions.TicketNotFound,
+                           options=(joinedload(EventTicket.owner), joinedload(EventTicket.assignment)))
 
 
 class EventAttendee(db.Model):
+    """
+    Projection of who attends an event: one row per (event, user) owning an unassigned ticket or
+    assigned one. Kept current by the purchase and assignment code paths through `refresh`, and
+    rebuilt from the tickets with `flask rebuild-event-attendees`.
+    """
     __tablename__ = 'event_attendees'
+    __table_args__ = (
+        db.Index('ix_event_attendees_event_id_attendee_id', 'event_id', 'attendee_id', unique=True),
+        db.Index('ix_event_attendees_event_id_created_at_attendee_id', 'event_id', 'created_at', 'attendee_id'),
+    )
 
     id = db.Column(db.String, primary_key=True)
-    attendee_id = db.Column(db.String, db.ForeignKey('users.id', onupdate=CASCADE))
+    attendee_id = db.Column(db.String, db.ForeignKey('users.id', ondelete=CASCADE, onupdate=CASCADE))
     attendee = relationship('User')
-    sale_order_id = db.Column(db.String, db.ForeignKey('ticket_sales.id', onupdate=CASCADE))
+    sale_order_id = db.Column(db.String, db.ForeignKey('ticket_sales.id', ondelete=CASCADE, onupdate=CASCADE))
     sale_order = relationship('EventTicketSaleOrder')
     ownership_by_purchase = db.Column(db.Boolean, default=False)
     ownership_by_assignment = db.Column(db.Boolean, default=False)
-    event_id = db.Column(db.String, db.ForeignKey('events.id', onupdate=CASCADE))
+    event_id = db.Column(db.String, db.ForeignKey('events.id', ondelete=CASCADE, onupdate=CASCADE))
     event = relationship('Event')
+    created_at = db.Column(db.DateTime)
 
     def __init__(self, attendee=None, attendee_id=None, event_id=None, event=None, sale_order=None, sale_order_id=None,
                  ownership_by_purchase=None, ownership_by_assignment=None):
@@ -2400,20 +2544,80 @@ class EventAttendee(db.Model):
         self.sale_order_id = sale_order_id
         self.ownership_by_assignment = ownership_by_assignment
         self.ownership_by_purchase = ownership_by_purchase
+        self.created_at = datetime.now()
+
+    @staticmethod
+    def _attendance_sources(event_id=None, user_ids=None):
+        purchased = select([EventTicket.event_id.label('event_id'),
+                            EventTicket.owner_id.label('user_id'),
+                            EventTicket.created_at.label('created_at'),
+                            literal(True).label('by_purchase'),
+                            literal(False).label('by_assignment')]) \
+            .where(~exists().where(EventTicketTypeAssignment.ticket_id == EventTicket.id))
+        assigned = select([EventTicketTypeAssignment.event_id.label('event_id'),
+                           EventTicketTypeAssignment.assigned_to_user_id.label('user_id'),
+                           EventTicketTypeAssignment.created_at.label('created_at'),
+                           literal(False).label('by_purchase'),
+                           literal(True).label('by_assignment')])
+
+        if event_id is not None:
+            purchased = purchased.where(EventTicket.event_id == event_id)
+            assigned = assigned.where(EventTicketTypeAssignment.event_id == event_id)
+        if user_ids is not None:
+            purchased = purchased.where(EventTicket.owner_id.in_(user_ids))
+            assigned = assigned.where(EventTicketTypeAssignment.assigned_to_user_id.in_(user_ids))
+        return union_all(purchased, assigned).alias('attendance_sources')
 
     @classmethod
-    def add_attendee(cls, attendee=None, event=None, sale_order=None, ownership_by_purchase=None,
-                     ownership_by_assignment=None):
-        event_attendee = EventAttendee(sale_order=sale_order, event=event, attendee=attendee,
-                                       ownership_by_purchase=ownership_by_purchase,
-                                       ownership_by_assignment=ownership_by_assignment)
-        db.session.add(event_attendee)
-        db.session.commit()
+    def refresh(cls, event_id=None, user_ids=None):
+        """
+        Recomputes the attendee rows of `user_ids` for `event_id` from their tickets and assignments,
+        in the caller's transaction. Leaving out `user_ids` (and `event_id`) rebuilds the whole event
+        (and the whole table).
+        :return: number of attendee rows written
+        """
+        user_ids = [user_id for user_id in user_ids if user_id] if user_ids is not None else None
+        if user_ids is not None and not user_ids:
+            return 0
+
+        table = cls.__table__
+        delete = table.delete()
+        if event_id is not None:
+            delete = delete.where(table.c.event_id == event_id)
+        if user_ids is not None:
+            delete = delete.where(table.c.attendee_id.in_(user_ids))
+        db.session.execute(delete)
+
+        sources = cls._attendance_sources(event_id, user_ids)
+        attendance = select([func.gen_random_uuid().cast(String),
+                             sources.c.event_id,
+                             sources.c.user_id,
+                             func.min(sources.c.created_at),
+                             func.bool_or(sources.c.by_purchase),
+                             func.bool_or(sources.c.by_assignment)]) \
+            .where(sources.c.event_id.isnot(None)) \
+            .where(sources.c.user_id.isnot(None)) \
+            .group_by(sources.c.event_id, sources.c.user_id)
+        # a concurrent purchase or assignment for the same (event, user) may insert the row first;
+        # take over its row instead of failing on the unique index
+        insert = pg_insert(table).from_select(
+            ['id', 'event_id', 'attendee_id', 'created_at', 'ownership_by_purchase', 'ownership_by_assignment'],
+            attendance)
+        insert = insert.on_conflict_do_update(
+            index_elements=[table.c.event_id, table.c.attendee_id],
+            set_={
+                'created_at': insert.excluded.created_at,
+                'ownership_by_purchase': insert.excluded.ownership_by_purchase,
+                'ownership_by_assignment': insert.excluded.ownership_by_assignment
+            })
+        result = db.session.execute(insert)
+        return result.rowcount
 
     @classmethod
-    def remove_attendee(cls, attendee):
-        db.session.query(EventAttendee).filter(EventAttendee.attendee_id == attendee.id).delete()
+    def rebuild(cls):
+        count = cls.refresh()
         db.session.commit()
+        return count
 
 
 class EventTicketTypeAssignment(db.Model):
@@ -2462,7 +2666,7 @@ class EventTicketTypeAssignment(db.Model):
     def create(cls, event, sale_line=None, assigned_by=None, assigned_to=None):
         assignment = cls(sale_line=sale_line, assigned_by=assigned_by, assigned_to=assigned_to, event=event)
         db.session.add(assignment)
-        db.session.commit()
+        db.session.flush()
 
         return assignment
 
@@ -2498,10 +2702,7 @@ class SocialMedia(db.Model):
 
     @classmethod
     def get_social_account(cls, account_id):
-        if not cls.has_social_account(account_id):
-            raise exceptions.SocialAccountNotFound()
-
-        return db.session.query(SocialMedia).filter(SocialMedia.id == account_id).first()
+        return load_entity(SocialMedia, account_id, exceptions.SocialAccountNotFound)
 
     @classmethod
     def get_all(cls):
@@ -2510,6 +2711,9 @@ class SocialMedia(db.Model):
 
 class EventReview(db.Model):
     __tablename__ = 'event_reviews'
+    __table_args__ = (
+        db.Index('ix_event_reviews_event_id_created_at_id', 'event_id', 'created_at', 'id'),
+    )
 
     id = db.Column(db.String, primary_key=True)
     content = db.Column(db.String)
@@ -2522,6 +2726,9 @@ class EventReview(db.Model):
     event_id = db.Column(db.String, db.ForeignKey('events.id', onupdate=CASCADE, ondelete=CASCADE))
     event = relationship(Event)
     comments = relationship('EventReviewComment', backref='event_reviews')
+    upvotes_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    downvotes_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comments_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime)
     updated_at = db.Column(db.DateTime)
 
@@ -2529,6 +2736,9 @@ class EventReview(db.Model):
         self.id = str(uuid.uuid4())
         self.created_at = datetime.now()
         self.published_at = datetime.now()
+        self.upvotes_count = 0
+        self.downvotes_count = 0
+        self.comments_count = 0
 
         if content:
             self.content = content
@@ -2558,35 +2768,24 @@ class EventReview(db.Model):
                                 .filter(EventReviewDownvote.review_id == self.id)
                                 .filter(EventReviewDownvote.author_id == author.id).exists()).scalar()
 
-    def upvotes_count(self):
-        return db.session.query(EventReviewUpvote) \
-            .filter(EventReviewUpvote.review_id == self.id) \
-            .count()
-
-    def downvotes_count(self):
-        return db.session.query(EventReviewDownvote) \
-            .filter(EventReviewDownvote.review_id == self.id) \
-            .count()
-
-    def comments_count(self):
-        return db.session.query(EventReviewComment) \
-            .filter(EventReviewComment.review_id == self.id) \
-            .count()
-
     def upvote(self, upvote):
         if self.is_upvoted_by(upvote.author):
             raise exceptions.AlreadyUpvoted()
 
         if self.is_downvoted_by(upvote.author):
             raise exceptions.AlreadyDownvoted()
-        self.upvotes.append(upvote)
+        upvote.review_id = self.id
+        db.session.add(upvote)
+        db.session.flush()
+        adjust_counters(self, upvotes_count=1)
         db.session.commit()
 
     def remove_upvote_by(self, author):
-        db.session.query(EventReviewUpvote) \
+        removed = db.session.query(EventReviewUpvote) \
             .filter(EventReviewUpvote.review_id == self.id) \
             .filter(EventReviewUpvote.author_id == author.id) \
             .delete()
+        adjust_counters(self, upvotes_count=-removed)
         db.session.commit()
 
     def downvote(self, downvote):
@@ -2595,15 +2794,18 @@ class EventReview(db.Model):
 
         if self.is_upvoted_by(downvote.author):
             raise exceptions.AlreadyUpvoted()
-        self.downvotes += [downvote]
-        db.session.add(self)
+        downvote.review_id = self.id
+        db.session.add(downvote)
+        db.session.flush()
+        adjust_counters(self, downvotes_count=1)
         db.session.commit()
 
     def remove_downvote_by(self, author):
-        db.session.query(EventReviewDownvote) \
+        removed = db.session.query(EventReviewDownvote) \
             .filter(EventReviewDownvote.review_id == self.id) \
             .filter(EventReviewDownvote.author_id == author.id) \
             .delete()
+        adjust_counters(self, downvotes_count=-removed)
         db.session.commit()
 
     def has_review_comment(self, comment_id):
@@ -2612,18 +2814,36 @@ class EventReview(db.Model):
                                 .filter(EventReviewComment.review_id == self.id).exists()).scalar()
 
     def add_review_comment(self, comment):
-        self.comments += [comment]
+        comment.review_id = self.id
+        db.session.add(comment)
+        db.session.flush()
+        adjust_counters(self, comments_count=1)
         db.session.commit()
 
     def remove_review_comment(self, comment_id):
-        if not self.has_review_comment(comment_id):
+        removed = db.session.query(EventReviewComment) \
+            .filter(EventReviewComment.id == comment_id) \
+            .filter(EventReviewComment.review_id == self.id) \
+            .delete()
+        if not removed:
             raise exceptions.ReviewCommentNotFound()
-        db.session.query(EventReviewComment).filter(EventReviewComment.id == comment_id).delete()
+        adjust_counters(self, comments_count=-removed)
+        db.session.commit()
 
     def get_total_event_review_comments(self):
-        return db.session.query(EventReviewComment) \
-            .filter(EventReviewComment.review_id == self.id) \
-            .count()
+        return self.comments_count
+
+    @staticmethod
+    def reconcile_counters():
+        """
+        Recounts upvotes_count, downvotes_count and comments_count of every review
+        :return: ids of the reviews whose counters had drifted
+        """
+        return reconcile_counters(EventReview, {
+            'upvotes_count': EventReviewUpvote.review_id,
+            'downvotes_count': EventReviewDownvote.review_id,
+            'comments_count': EventReviewComment.review_id
+        })
 
     def get_comment_only(self, comment_id):
         return db.session.query(EventReviewComment) \
@@ -2632,52 +2852,17 @@ class EventReview(db.Model):
             .first()
 
     def get_review_comment(self, comment_id):
-        if not self.has_review_comment(comment_id):
-            raise exceptions.ReviewCommentNotFound()
-
-        return db.session.query(EventReviewComment).options(
-            joinedload(EventReviewComment.upvotes),
-            joinedload(EventReviewComment.downvotes),
-            joinedload(EventReviewComment.author),
-            joinedload(EventReviewComment.media)
-        ).filter(EventReviewComment.review_id == self.id) \
-            .filter(EventReviewComment.id == comment_id) \
-            .first()
-
-    def has_more_review_comments(self, cursor=None):
-        _cursor = copy.copy(cursor)
-        more_review_comments = self.get_review_comments(_cursor)
-        return len(more_review_comments) > 0
+        return load_entity(EventReviewComment, comment_id, exceptions.ReviewCommentNotFound,
+                           owner=('review_id', self.id),
+                           options=(joinedload(EventReviewComment.author),
+                                    joinedload(EventReviewComment.media)))
 
     def get_review_comments(self, cursor):
-        query = db.session.query(EventReviewComment).options(
-            joinedload(EventReviewComment.upvotes),
-            joinedload(EventReviewComment.downvotes),
-            joinedload(EventReviewComment.author),
-            joinedload(EventReviewComment.media)
-        ).filter(EventReviewComment.review_id == self.id)
-
-        if cursor and cursor.after:
-            query = query.filter(
-                func.round(cast(func.extract('EPOCH', EventReviewComment.created_at), Numeric), 3) < func.round(
-                    cursor.get_after_as_float(), 3))
-
-        elif cursor and cursor.before:
-            query = query.filter(
-                func.round(cast(func.extract('EPOCH', EventReviewComment.created_at), Numeric), 3) > func.round(
-                    cursor.get_before_as_float()), 3)
-
-        comments = query.order_by(EventReviewComment.created_at.desc()).limit(cursor.limit).all()
-        if comments:
-            cursor.set_before(comments[0].created_at)
-            cursor.set_after(comments[-1].created_at)
-            cursor.set_has_more(self.has_more_review_comments(cursor))
-        else:
-            cursor.set_before(None)
-            cursor.set_after(None)
-            cursor.set_has_more(False)
+        query = db.session.query(EventReviewComment) \
+            .options(*LoadingStrategies.review_comments()) \
+            .filter(EventReviewComment.review_id == self.id)
 
-        return comments
+        return cursor.paginate(query, EventReviewComment.created_at)
 
 
 class EventReviewMedia(db.Model):
@@ -2773,12 +2958,17 @@ class EventReviewDownvote(db.Model):
 
 class EventStream(db.Model):
     __tablename__ = 'event_streams'
+    __table_args__ = (
+        db.Index('ix_event_streams_event_id_published_at_id', 'event_id', 'published_at', 'id'),
+    )
 
     id = db.Column(db.String, primary_key=True)
     content = db.Column(db.String)
     published_at = db.Column(db.DateTime, default=datetime.now())
     upvotes = relationship('EventStreamUpvote')
     downvotes = relationship('EventStreamDownvote')
+    upvotes_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    downvotes_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     author_id = db.Column(db.String, db.ForeignKey('users.id'))
     author = relationship(User)
     media = relationship('EventStreamMedia', backref='event_streams')
@@ -2788,6 +2978,8 @@ class EventStream(db.Model):
     def __init__(self, content=None, author_id=None, author=None, media=None, event_id=None, event=None):
         self.id = str(uuid.uuid4())
         self.published_at = datetime.now()
+        self.upvotes_count = 0
+        self.downvotes_count = 0
 
         if content:
             self.content = content
@@ -2807,6 +2999,17 @@ class EventStream(db.Model):
         if event_id:
             self.event_id = event_id
 
+    @staticmethod
+    def reconcile_counters():
+        """
+        Recounts upvotes_count and downvotes_count of every stream post
+        :return: ids of the posts whose counters had drifted
+        """
+        return reconcile_counters(EventStream, {
+            'upvotes_count': EventStreamUpvote.stream_id,
+            'downvotes_count': EventStreamDownvote.stream_id
+        })
+
 
 class EventStreamMedia(db.Model):
     __tablename__ = 'event_stream_media'
@@ -2881,6 +3084,9 @@ class EventStreamDownvote(db.Model):
 
 class EventReviewComment(db.Model):
     __tablename__ = 'event_review_comments'
+    __table_args__ = (
+        db.Index('ix_event_review_comments_review_id_created_at_id', 'review_id', 'created_at', 'id'),
+    )
 
     id = db.Column(db.String, primary_key=True)
     content = db.Column(db.String)
@@ -2893,6 +3099,9 @@ class EventReviewComment(db.Model):
     review = relationship(EventReview)
     media = relationship('EventReviewCommentMedia')
     responses = relationship('EventReviewCommentResponse')
+    upvotes_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    downvotes_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    responses_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime)
     updated_at = db.Column(db.DateTime)
 
@@ -2900,6 +3109,9 @@ class EventReviewComment(db.Model):
         self.id = str(uuid.uuid4())
         self.published_at = datetime.now()
         self.created_at = datetime.now()
+        self.upvotes_count = 0
+        self.downvotes_count = 0
+        self.responses_count = 0
 
         if content:
             self.content = content
@@ -2927,51 +3139,44 @@ class EventReviewComment(db.Model):
                                 .filter(EventReviewCommentDownvote.author_id == author.id).exists()
                                 ).scalar()
 
-    def upvotes_count(self):
-        return db.session.query(EventReviewCommentUpvote) \
-            .filter(EventReviewCommentUpvote.comment_id == self.id) \
-            .count()
-
-    def downvotes_count(self):
-        return db.session.query(EventReviewCommentDownvote) \
-            .filter(EventReviewCommentDownvote.comment_id == self.id) \
-            .count()
-
-    def responses_count(self):
-        return db.session.query(EventReviewCommentResponse) \
-            .filter(EventReviewCommentResponse.comment_id == self.id) \
-            .count()
-
     def upvote(self, author):
         if self.is_upvoted_by(author):
             raise exceptions.AlreadyUpvoted()
         if self.is_downvoted_by(author):
             raise exceptions.AlreadyDownvoted()
         upvote = EventReviewCommentUpvote(author=author)
-        self.upvotes += [upvote]
+        upvote.comment_id = self.id
+        db.session.add(upvote)
+        db.session.flush()
+        adjust_counters(self, upvotes_count=1)
         db.session.commit()
 
     def downvote(self, author):
-        downvote = EventReviewCommentDownvote(author=author)
         if self.is_upvoted_by(author):
             raise exceptions.AlreadyUpvoted()
         if self.is_downvoted_by(author):
             raise exceptions.AlreadyDownvoted()
-        self.downvotes += [downvote]
+        downvote = EventReviewCommentDownvote(author=author)
+        downvote.comment_id = self.id
+        db.session.add(downvote)
+        db.session.flush()
+        adjust_counters(self, downvotes_count=1)
         db.session.commit()
 
     def remove_upvote(self, author):
-        db.session.query(EventReviewCommentUpvote) \
+        removed = db.session.query(EventReviewCommentUpvote) \
             .filter(EventReviewCommentUpvote.comment_id == self.id) \
             .filter(EventReviewCommentUpvote.author_id == author.id) \
             .delete()
+        adjust_counters(self, upvotes_count=-removed)
         db.session.commit()
 
     def remove_downvote(self, author):
-        db.session.query(EventReviewCommentDownvote) \
+        removed = db.session.query(EventReviewCommentDownvote) \
             .filter(EventReviewCommentDownvote.comment_id == self.id) \
             .filter(EventReviewCommentDownvote.author_id == author.id) \
             .delete()
+        adjust_counters(self, downvotes_count=-removed)
         db.session.commit()
 
     def has_response(self, response_id):
@@ -2979,80 +3184,52 @@ class EventReviewComment(db.Model):
                                 .filter(EventReviewCommentResponse.id == response_id).exists()).scalar()
 
     def add_response(self, response):
-        self.responses += [response]
+        response.comment_id = self.id
+        db.session.add(response)
+        db.session.flush()
+        adjust_counters(self, responses_count=1)
         db.session.commit()
 
     def remove_response(self, response_id):
-        if not self.has_review_comment_response(response_id):
-            raise exceptions.EventReviewCommentResponseNotFound()
-
-        db.session.query(EventReviewCommentResponse) \
+        removed = db.session.query(EventReviewCommentResponse) \
             .filter(EventReviewCommentResponse.comment_id == self.id) \
             .filter(EventReviewCommentResponse.id == response_id) \
             .delete()
-
-    def get_response_only(self, response_id):
-        if not self.has_response(response_id):
+        if not removed:
             raise exceptions.EventReviewCommentResponseNotFound()
+        adjust_counters(self, responses_count=-removed)
+        db.session.commit()
 
-        return db.session.query(EventReviewCommentResponse) \
-            .filter(EventReviewCommentResponse.comment_id == self.id) \
-            .filter(EventReviewCommentResponse.id == response_id) \
-            .first()
+    def get_response_only(self, response_id):
+        return load_entity(EventReviewCommentResponse, response_id, exceptions.EventReviewCommentResponseNotFound,
+                           owner=('comment_id', self.id))
 
     def get_response(self, response_id):
-
-        if not self.has_response(response_id):
-            raise exceptions.EventReviewCommentResponseNotFound()
-
-        return db.session.query(EventReviewCommentResponse).options(
-            joinedload(EventReviewCommentResponse.upvotes),
-            joinedload(EventReviewCommentResponse.downvotes),
-            joinedload(EventReviewCommentResponse.author),
-            joinedload(EventReviewCommentResponse.media)
-        ).filter(EventReviewCommentResponse.id == response_id) \
-            .first()
-
-    def has_more_responses(self, cursor=None):
-        _cursor = copy.copy(cursor)
-        more_responses = self.get_responses(_cursor)
-        return len(more_responses) > 0
+        return load_entity(EventReviewCommentResponse, response_id, exceptions.EventReviewCommentResponseNotFound,
+                           options=(joinedload(EventReviewCommentResponse.author),
+                                    joinedload(EventReviewCommentResponse.media)))
 
     def get_responses(self, cursor):
-        query = db.session.query(EventReviewCommentResponse).options(
-            joinedload(EventReviewCommentResponse.upvotes),
-            joinedload(EventReviewCommentResponse.downvotes),
-            joinedload(EventReviewCommentResponse.author),
-            joinedload(EventReviewCommentResponse.media)
-        ).filter(EventReviewCommentResponse.comment_id == self.id)
-
-        if cursor and cursor.after:
-            query = query.filter(
-                func.round(cast(func.extract('EPOCH', EventReviewCommentResponse.created_at), Numeric), 3) < func.round(
-                    cursor.get_after_as_float(), 3))
+        query = db.session.query(EventReviewCommentResponse) \
+            .options(*LoadingStrategies.comment_responses()) \
+            .filter(EventReviewCommentResponse.comment_id == self.id)
 
-        elif cursor and cursor.before:
-            query = query.filter(
-                func.round(cast(func.extract('EPOCH', EventReviewCommentResponse.created_at), Numeric), 3) > func.round(
-                    cursor.get_before_as_float(), 3))
-
-        responses = query.order_by(EventReviewCommentResponse.created_at.desc()).limit(cursor.limit).all()
-
-        if responses:
-            cursor.set_before(responses[0].created_at)
-            cursor.set_after(responses[-1].created_at)
-            cursor.set_has_more(self.has_more_responses(cursor))
-        else:
-            cursor.set_before(None)
-            cursor.set_after(None)
-            cursor.set_has_more(False)
-
-        return responses
+        return cursor.paginate(query, EventReviewCommentResponse.created_at)
 
     def get_total_responses(self):
-        return db.session.query(EventReviewCommentResponse). \
-            filter(EventReviewCommentResponse.comment_id == self.id) \
-            .count()
+        return self.responses_count
+
+    @staticmethod
+    def reconcile_counters():
+        """
+        Recounts upvotes_count, downvotes_count and responses_count of every review comment
+        :return: ids of the comments whose counters had drifted
+        """
+        return reconcile_counters(EventReviewComment, {
+            'upvotes_count': EventReviewCommentUpvote.comment_id,
+            'downvotes_count': EventReviewCommentDownvote.comment_id,
+            'responses_count': EventReviewCommentResponse.comment_id
+        })
 
 
 class EventReviewCommentMedia(db.Model):
@@ -3158,12 +3335,16 @@ class EventReviewCommentResponse(db.Model):
     comment_id = db.Column(db.String, db.ForeignKey('event_review_comments.id', ondelete=CASCADE, onupdate=CASCADE))
     comment = relationship(EventReviewComment)
     media = relationship('EventReviewCommentResponseMedia')
+    upvotes_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    downvotes_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime)
 
     def __init__(self, content=None, author_id=None, author=None, media=None):
         self.id = str(uuid.uuid4())
         self.published_at = datetime.now();
         self.created_at = datetime.now()
+        self.upvotes_count = 0
+        self.downvotes_count = 0
 
         if content:
             self.content = content
@@ -3188,45 +3369,56 @@ class EventReviewCommentResponse(db.Model):
                                 .filter(EventReviewCommentResponseDownvote.response_id == self.id)
                                 .filter(EventReviewCommentResponseDownvote.author_id == author.id).exists()).scalar()
 
-    def upvotes_count(self):
-        return db.session.query(EventReviewCommentResponseUpvote) \
-            .filter(EventReviewCommentResponseUpvote.response_id == self.id) \
-            .count()
-
-    def downvotes_count(self):
-        return db.session.query(EventReviewCommentResponseDownvote) \
-            .filter(EventReviewCommentResponseDownvote.response_id == self.id) \
-            .count()
-
     def upvote(self, author):
-        upvote = EventReviewCommentResponseUpvote(author=author)
         if self.is_upvoted_by(author):
             raise exceptions.AlreadyUpvoted()
         if self.is_downvoted_by(author):
             raise exceptions.AlreadyDownvoted()
-        self.upvotes.append(upvote)
+        upvote = EventReviewCommentResponseUpvote(author=author)
+        upvote.response_id = self.id
+        db.session.add(upvote)
+        db.session.flush()
+        adjust_counters(self, upvotes_count=1)
         db.session.commit()
 
     def downvote(self, author):
-        downvote = EventReviewCommentResponseDownvote(author=author)
         if self.is_upvoted_by(author):
             raise exceptions.AlreadyUpvoted()
         if self.is_downvoted_by(author):
             raise exceptions.AlreadyDownvoted()
-        self.downvotes.append(downvote)
+        downvote = EventReviewCommentResponseDownvote(author=author)
+        downvote.response_id = self.id
+        db.session.add(downvote)
+        db.session.flush()
+        adjust_counters(self, downvotes_count=1)
         db.session.commit()
 
     def remove_upvote_by(self, upvote_by):
-        db.session.query(EventReviewCommentResponseUpvote) \
+        removed = db.session.query(EventReviewCommentResponseUpvote) \
             .filter(EventReviewCommentResponseUpvote.response_id == self.id) \
             .filter(EventReviewCommentResponseUpvote.author_id == upvote_by.id) \
             .delete()
+        adjust_counters(self, upvotes_count=-removed)
+        db.session.commit()
 
     def remove_downvote_by(self, downvoted_by):
-        db.session.query(EventReviewCommentResponseDownvote) \
+        removed = db.session.query(EventReviewCommentResponseDownvote) \
             .filter(EventReviewCommentResponseDownvote.response_id == self.id) \
             .filter(EventReviewCommentResponseDownvote.author_id == downvoted_by.id) \
             .delete()
+        adjust_counters(self, downvotes_count=-removed)
+        db.session.commit()
+
+    @staticmethod
+    def reconcile_counters():
+        """
+        Recounts upvotes_count and downvotes_count of every comment response
+        :return: ids of the responses whose counters had drifted
+        """
+        return reconcile_counters(EventReviewCommentResponse, {
+            'upvotes_count': EventReviewCommentResponseUpvote.response_id,
+            'downvotes_count': EventReviewCommentResponseDownvote.response_id
+        })
 
 
 class EventReviewCommentResponseMedia(db.Model):
@@ -3503,11 +3695,13 @@ class BrandCategory(db.Model):
     name = db.Column(db.String)
     slug = db.Column(db.String)
     brands = relationship('Brand', backref='brand_categories')
+    brands_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     def __init__(self, name=None):
         self.id = str(uuid.uuid4())
         self.name = name
         self.slug = generate_slug(name)
+        self.brands_count = 0
 
     @staticmethod
     def has_category(category_id):
@@ -3520,7 +3714,7 @@ class BrandCategory(db.Model):
 
     @staticmethod
     def get_category(category_id):
-        return db.session.query(BrandCategory).filter(BrandCategory.id == category_id).first()
+        return load_entity(BrandCategory, category_id)
 
     @classmethod
     def remove_category(cls, category_id):
@@ -3543,9 +3737,22 @@ class BrandCategory(db.Model):
         self.name = name
         db.session.commit()
 
+    @staticmethod
+    def reconcile_counters():
+        """
+        Recounts brands_count of every brand category
+        :return: ids of the categories whose counter had drifted
+        """
+        return reconcile_counters(BrandCategory, {'brands_count': Brand.category_id})
+
 
 class Brand(db.Model):
     __tablename__ = 'brands'
+    __table_args__ = (
+        db.Index('ix_brands_created_at_id', 'created_at', 'id'),
+        db.Index('ix_brands_search_vector', 'search_vector', postgresql_using='gin'),
+        db.Index('ix_brands_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
 
     id = db.Column(db.String, primary_key=True)
     name = db.Column(db.String)
@@ -3559,9 +3766,12 @@ class Brand(db.Model):
     category = relationship('BrandCategory')
     category_id = db.Column(db.String, db.ForeignKey('brand_categories.id', ondelete=CASCADE, onupdate=CASCADE))
     endorsements = relationship('BrandValidation')
+    endorsement_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     founded_date = db.Column(db.String)
     founders = relationship('BrandFounder')
     website_link = db.Column(db.String)
+    # generated column over name and description, see the brands search migration
+    search_vector = deferred(db.Column(TSVECTOR))
 
     def __init__(self, name=None, description=None, country=None, creator=None, category=None, image=utils.NO_IMAGE, founders=None,
                  founded_date=None, website_link=None):
@@ -3576,6 +3786,7 @@ class Brand(db.Model):
         self.founders = founders
         self.founded_date = founded_date
         self.website_link = website_link
+        self.endorsement_count = 0
 
     @classmethod
     def create(cls, name=None, description=None, country=None, creator=None, category=None, image=None, founders=None,
@@ -3583,6 +3794,9 @@ class Brand(db.Model):
         brand = cls(name=name, description=description, country=country, creator=creator, category=category,
                     image=image, founders=founders, founded_date=founded_date, website_link=website_link)
         db.session.add(brand)
+        db.session.flush()
+        if category is not None:
+            adjust_counters(category, brands_count=1)
         db.session.commit()
         return brand
 
@@ -3590,61 +3804,51 @@ class Brand(db.Model):
     def has_brand(cls, brand_id):
         return db.session.query(db.session.query(Brand).filter(Brand.id == brand_id).exists()).scalar()
 
-    @classmethod
-    def has_more_brands(cls, category_id=None, searchterm=None, cursor=None):
-        _cursor = copy.copy(cursor)
-        more_brands = cls.get_brands(category_id, searchterm, _cursor)
-        return len(more_brands) > 0
-
     @classmethod
     def get_brands(cls, category_id=None, searchterm=None, cursor=None):
-        query = db.session.query(Brand)
+        query = db.session.query(Brand).options(*LoadingStrategies.brand_list())
 
         if searchterm:
             query = query.filter(Brand.name.ilike("%" + searchterm + "%"))
         if category_id:
             query = query.filter(Brand.category_id == category_id)
-        query = query.options(joinedload(Brand.endorsements))
-
-        if cursor and cursor.after:
-            query = query.filter(func.round(cast(func.extract('EPOCH', Brand.created_at), Numeric), 3) < func.round(
-                cursor.get_after_as_float(), 3))
 
-        elif cursor and cursor.before:
-            query = query.filter(func.round(cast(func.extract('EPOCH', Brand.created_at), Numeric), 3) > func.round(
-                cursor.get_before_as_float(), 3))
+        return cursor.paginate(query, Brand.created_at)
 
-        brands = query.order_by(Brand.created_at.desc()).limit(cursor.limit).all()
+    @classmethod
+    def _search_query(cls, searchterm, category_id=None):
+        match, rank = text_search(Brand.search_vector, Brand.name, searchterm)
+        query = db.session.query(Brand).filter(match)
+        if category_id:
+            query = query.filter(Brand.category_id == category_id)
+        return query, rank
 
-        if brands:
-            cursor.set_before(brands[0].created_at)
-            cursor.set_after(brands[-1].created_at)
-            cursor.set_has_more(cls.has_more_brands(category_id, searchterm, cursor))
-        else:
-            cursor.set_before(None)
-            cursor.set_after(None)
-            cursor.set_has_more(False)
+    @classmethod
+    def search_brands(cls, searchterm, category_id=None, cursor=None):
+        query, rank = cls._search_query(searchterm, category_id)
+        return cursor.paginate_ranked(query.options(*LoadingStrategies.brand_list()), rank, Brand.id)
 
-        return brands
+    @classmethod
+    def search_brands_total(cls, searchterm, category_id=None):
+        query, rank = cls._search_query(searchterm, category_id)
+        return query.count()
 
     @classmethod
     def get_brands_total(cls, category_id=None, searchterm=None):
+        if category_id and not searchterm:
+            return load_entity(BrandCategory, category_id, exceptions.BrandCategoryNotFound).brands_count
+
         query = db.session.query(Brand)
 
         if searchterm:
             query = query.filter(Brand.name.ilike("%" + searchterm + "%"))
         if category_id:
             query = query.filter(Brand.category_id == category_id)
-        query = query.options(joinedload(Brand.endorsements))
         return query.count()
 
     @classmethod
     def get_brand(cls, brand_id):
-        if not cls.has_brand(brand_id):
-            raise exceptions.BrandNotFound()
-        return db.session.query(Brand).options(
-            joinedload(Brand.endorsements)
-        ).filter(Brand.id == brand_id).first()
+        return load_entity(Brand, brand_id, exceptions.BrandNotFound, options=LoadingStrategies.brand_details())
 
     def is_validated_by_user(self, user):
         return db.session.query(
@@ -3656,25 +3860,62 @@ class Brand(db.Model):
 
     @classmethod
     def delete_brand(cls, brand_id):
-        if not cls.has_brand(brand_id):
+        category_id = db.session.query(Brand.category_id).filter(Brand.id == brand_id).first()
+        if category_id is None:
             raise exceptions.BrandNotFound()
         db.session.query(Brand).filter(Brand.id == brand_id).delete()
+        if category_id[0] is not None:
+            category = load_entity(BrandCategory, category_id[0])
+            if category is not None:
+                adjust_counters(category, brands_count=-1)
         db.session.commit()
 
-    def get_brand_endorsements(self):
-        return db.session.query(BrandValidation).filter(BrandValidation.brand_id == self.id).all()
+    def set_category(self, category):
+        """Move the brand to `category`, keeping both categories' brand counters right; commit with `update`."""
+        category_id = category.id if category is not None else None
+        if self.category_id != category_id:
+            if self.category_id is not None:
+                previous = load_entity(BrandCategory, self.category_id)
+                if previous is not None:
+                    adjust_counters(previous, brands_count=-1)
+            if category is not None:
+                adjust_counters(category, brands_count=1)
+        self.category = category
+
+    def get_brand_endorsements(self, cursor):
+        query = db.session.query(BrandValidation) \
+            .options(*LoadingStrategies.brand_endorsements()) \
+            .filter(BrandValidation.brand_id == self.id)
+
+        endorsements = cursor.paginate(query, BrandValidation.created_at)
+        # every endorsement on the page is of this brand; hand it over instead of loading it per row
+        for endorsement in endorsements:
+            set_committed_value(endorsement, 'brand', self)
+        return endorsements
 
     def add_validation(self, validation):
         if self.is_validated_by_user(validation.validator):
             raise exceptions.BrandAlreadyValidated()
-        self.endorsements.append(validation)
+        validation.brand_id = self.id
+        db.session.add(validation)
+        db.session.flush()
+        adjust_counters(self, endorsement_count=1)
         db.session.commit()
 
     def remove_validation_of_user(self, user):
-        db.session.query(BrandValidation).filter(BrandValidation.validator_id == user.id).filter(
+        removed = db.session.query(BrandValidation).filter(BrandValidation.validator_id == user.id).filter(
             BrandValidation.brand_id == self.id).delete()
+        adjust_counters(self, endorsement_count=-removed)
         db.session.commit()
 
+    @staticmethod
+    def reconcile_counters():
+        """
+        Recounts endorsement_count of every brand
+        :return: ids of the brands whose counter had drifted
+        """
+        return reconcile_counters(Brand, {'endorsement_count': BrandValidation.brand_id})
+
     def update(self):
         self.updated_at = datetime.now()
         db.session.add(self)
@@ -3719,6 +3960,9 @@ class BrandFounder(db.Model):
 
 class BrandValidation(db.Model):
     __tablename__ = 'brand_validations'
+    __table_args__ = (
+        db.Index('ix_brand_validations_brand_id_created_at_id', 'brand_id', 'created_at', 'id'),
+    )
 
     id = db.Column(db.String, primary_key=True)
     validator_id = db.Column(db.ForeignKey('users.id'))
@@ -3924,6 +4168,11 @@ class Notifications(Enum):
 
 class Notification(db.Model):
     __tablename__ = 'app_notifications'
+    __table_args__ = (
+        db.Index('ix_app_notifications_recipient_id_created_at_id', 'recipient_id', 'created_at', 'id'),
+        db.Index('ix_app_notifications_unread_recipient_id_created_at_id', 'recipient_id', 'created_at', 'id',
+                 postgresql_where=text('NOT is_read')),
+    )
 
     id = db.Column(db.String, primary_key=True)
     notification_type = db.Column(db.String, index=True)
@@ -3955,133 +4204,475 @@ class Notification(db.Model):
     def create(cls, notification_type, recipient, actor=None, event=None, brand=None, ticket=None):
         notification = cls(notification_type, recipient, actor=actor, event=event, brand=brand, ticket=ticket)
         db.session.add(notification)
+        db.session.flush()
+        NotificationCounter.increment(notification.recipient_id, total=1, unread=1)
         db.session.commit()
         return notification
 
     @staticmethod
     def get_unread_notifications(user, cursor=None):
+        baked_query = compiled_queries.bake(lambda session: session.query(Notification)
+                                            .filter(Notification.is_read == False)
+                                            .filter(Notification.recipient_id == bindparam('recipient_id')))
 
-        query = db.session.query(Notification) \
-            .filter(Notification.is_read == False) \
-            .filter(Notification.recipient_id == user.id)
+        return cursor.paginate_baked('Notification.get_unread_notifications', baked_query, db.session,
+                                     Notification.created_at, recipient_id=user.id)
 
-        if cursor and cursor.after:
-            query = query.filter(func.round(cast(func.extract('EPOCH', Notification.created_at), Numeric), 3) < func.round(
-                cursor.get_after_as_float(), 3))
+    @staticmethod
+    def get_all_notifications(user, cursor):
+        baked_query = compiled_queries.bake(lambda session: session.query(Notification)
+                                            .filter(Notification.recipient_id == bindparam('recipient_id')))
 
-        if cursor and cursor.before:
-            query = query.filter(func.round(cast(func.extract('EPOCH', Notification.created_at), Numeric), 3) > func.round(
-                cursor.get_before_as_float(), 3))
+        return cursor.paginate_baked('Notification.get_all_notifications', baked_query, db.session,
+                                     Notification.created_at, recipient_id=user.id)
 
-        notifications = query.order_by(Notification.created_at.desc()).limit(cursor.limit).all()
+    @staticmethod
+    def get_read_notifications(user, cursor=None):
+        baked_query = compiled_queries.bake(lambda session: session.query(Notification)
+                                            .filter(Notification.recipient_id == bindparam('recipient_id'))
+                                            .filter(Notification.is_read == True))
 
-        if notifications:
-            cursor.set_before(notifications[0].created_at)
-            cursor.set_after(notifications[-1].created_at)
-            cursor.set_has_more(Notification.has_more_unread_notifications(user, cursor))
-        else:
-            cursor.set_before(None)
-            cursor.set_after(None)
-            cursor.set_has_more(False)
+        return cursor.paginate_baked('Notification.get_read_notifications', baked_query, db.session,
+                                     Notification.created_at, recipient_id=user.id)
 
-        return notifications
+    @staticmethod
+    def get_notification_counts(user):
+        return NotificationCounter.get_counts(user.id)
 
     @staticmethod
-    def has_more_unread_notifications(user, cursor=None):
-        _cursor = copy.copy(cursor)
-        more_notifications = Notification.get_unread_notifications(user, _cursor)
-        return len(more_notifications) > 0
+    def get_total_notifications(user):
+        return NotificationCounter.get_counts(user.id)['all']
 
     @staticmethod
-    def get_all_notifications(user, cursor):
-        query = db.session.query(Notification).filter(Notification.recipient_id == user.id)
+    def get_total_unread_notifications(user):
+        return NotificationCounter.get_counts(user.id)['unread']
 
-        if cursor and cursor.after:
-            query = query.filter(func.round(cast(func.extract('EPOCH', Notification.created_at), Numeric), 3) < func.round(
-                cursor.get_after_as_float(), 3))
+    @staticmethod
+    def get_total_read_notifications(user):
+        return NotificationCounter.get_counts(user.id)['read']
 
-        if cursor and cursor.before:
-            query = query.filter(func.round(cast(func.extract('EPOCH', Notification.created_at), Numeric), 3) > func.round(
-                cursor.get_before_as_float(), 3))
+    def mark_as_read(self):
+        table = Notification.__table__
+        # only the request that actually flips the flag takes the notification off the unread counter
+        marked = db.session.execute(
+            table.update()
+                .where(table.c.id == self.id)
+                .where(table.c.is_read == False)
+                .values(is_read=True)
+                .returning(table.c.recipient_id)
+        ).fetchall()
+        for row in marked:
+            NotificationCounter.increment(row.recipient_id, unread=-1)
+        set_committed_value(self, 'is_read', True)
+        db.session.commit()
 
-        notifications = query.order_by(Notification.created_at.desc()).limit(cursor.limit).all()
-        if notifications:
-            cursor.set_before(notifications[0].created_at)
-            cursor.set_after(notifications[-1].created_at)
-            cursor.set_has_more(Notification.has_more_all_notifications(user, cursor))
-        else:
-            cursor.set_before(None)
-            cursor.set_after(None)
-            cursor.set_has_more(False)
+    @staticmethod
+    def mark_notifications_as_read(user, notification_ids):
+        """
+        Marks the user's notifications among `notification_ids` as read in one UPDATE
+        :return: number of notifications that were unread
+        """
+        if not notification_ids:
+            return 0
+        table = Notification.__table__
+        return Notification._mark_as_read(user, table.c.id.in_(notification_ids))
 
-        return notifications
+    @staticmethod
+    def mark_all_as_read(user, up_to=None):
+        """
+        Marks every unread notification of the user as read in one UPDATE
+        :param up_to: optional cursor token; only notifications at or before its position are marked,
+            so notifications that arrived after the client's page was loaded stay unread
+        :return: number of notifications that were unread
+        """
+        table = Notification.__table__
+        condition = None
+        if up_to:
+            created_at, notification_id = decode_cursor_key(up_to)
+            if not isinstance(created_at, datetime):
+                raise BadCursorQuery()
+            if notification_id is None:
+                condition = table.c.created_at <= created_at
+            else:
+                condition = tuple_(table.c.created_at, table.c.id) <= tuple_(created_at, notification_id)
+        return Notification._mark_as_read(user, condition)
 
     @staticmethod
-    def has_more_all_notifications(user, cursor=None):
-        _cursor = copy.copy(cursor)
-        more_notifications = Notification.get_all_notifications(user, _cursor)
-        return len(more_notifications) > 0
+    def _mark_as_read(user, condition=None):
+        table = Notification.__table__
+        statement = table.update() \
+            .where(table.c.recipient_id == user.id) \
+            .where(table.c.is_read == False) \
+            .values(is_read=True)
+        if condition is not None:
+            statement = statement.where(condition)
+
+        count = db.session.execute(statement).rowcount
+        if count:
+            NotificationCounter.increment(user.id, unread=-count)
+        db.session.commit()
+        return count
 
     @staticmethod
-    def get_read_notifications(user, cursor=None):
-        query = db.session.query(Notification) \
-            .filter(Notification.recipient_id == user.id) \
-            .filter(Notification.is_read == True)
-
-        if cursor and cursor.after:
-            query = query.filter(func.round(cast(func.extract('EPOCH', Notification.created_at), Numeric), 3) < func.round(
-                cursor.get_after_as_float(), 3))
-
-        if cursor and cursor.before:
-            query = query.filter(func.round(cast(func.extract('EPOCH', Notification.created_at), Numeric), 3) > func.round(
-                cursor.get_before_as_float(), 3))
-
-        notifications = query.order_by(Notification.created_at.desc()).limit(cursor.limit).all()
-        if notifications:
-            cursor.set_before(notifications[0].created_at)
-            cursor.set_after(notifications[-1].created_at)
-            cursor.set_has_more(Notification.has_more_read_notifications(user, cursor))
-        else:
-            cursor.set_before(None)
-            cursor.set_after(None)
-            cursor.set_has_more(False)
+    def delete_read_notifications(user, older_than_days):
+        """
+        Deletes the user's read notifications created more than `older_than_days` days ago in one DELETE
+        :return: number of notifications deleted
+        """
+        table = Notification.__table__
+        count = db.session.execute(
+            table.delete()
+                .where(table.c.recipient_id == user.id)
+                .where(table.c.is_read == True)
+                .where(table.c.created_at < datetime.now() - timedelta(days=older_than_days))
+        ).rowcount
+        if count:
+            NotificationCounter.increment(user.id, total=-count)
+        db.session.commit()
+        return count
 
-        return notifications
+    def delete(self):
+        table = Notification.__table__
+        deleted = db.session.execute(
+            table.delete()
+                .where(table.c.id == self.id)
+                .returning(table.c.recipient_id, table.c.is_read)
+        ).fetchall()
+        for row in deleted:
+            NotificationCounter.increment(row.recipient_id, total=-1, unread=0 if row.is_read else -1)
+        db.session.commit()
 
     @staticmethod
-    def has_more_read_notifications(user, cursor=None):
-        _cursor = copy.copy(cursor)
-        more_notifications = Notification.get_read_notifications(user, _cursor)
-        return len(more_notifications) > 0
+    def get_notification(notification_id):
+        return db.session.query(Notification).filter(Notification.id==notification_id).first()
 
     @staticmethod
-    def get_total_notifications(user):
-        return db.session.query(Notification) \
-            .filter(Notification.recipient_id == user.id) \
-            .count()
+    def get_notifications(notification_ids):
+        return db.session.query(Notification).filter(Notification.id.in_(notification_ids)).all()
+
+
+class NotificationCounter(db.Model):
+    """
+    Per-user notification totals, kept current by Notification.create, mark_as_read and delete so the
+    unread badge is a primary key lookup. Notifications removed by a cascading delete of their event
+    or brand are not seen here; `flask reconcile-notification-counters` recounts them.
+    """
+    __tablename__ = 'user_notification_counters'
+
+    user_id = db.Column(db.String, db.ForeignKey('users.id', onupdate=CASCADE, ondelete=CASCADE), primary_key=True)
+    total_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    unread_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     @staticmethod
-    def get_total_unread_notifications(user):
-        return db.session.query(Notification) \
-            .filter(Notification.recipient_id == user.id) \
-            .filter(Notification.is_read == False) \
-            .count()
+    def increment(user_id, total=0, unread=0):
+        table = NotificationCounter.__table__
+        statement = pg_insert(table).values(user_id=user_id, total_count=max(total, 0), unread_count=max(unread, 0))
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.user_id],
+            set_={
+                'total_count': func.greatest(table.c.total_count + total, 0),
+                'unread_count': func.greatest(table.c.unread_count + unread, 0)
+            }))
 
     @staticmethod
-    def get_total_read_notifications(user):
-        return db.session.query(Notification) \
-            .filter(Notification.recipient_id == user.id) \
-            .filter(Notification.is_read == True) \
-            .count()
+    def increment_many(increments):
+        """
+        Applies several users' increments in one multi-row upsert
+        :param increments: {user_id: (total, unread), ...} of non-negative increments
+        """
+        if not increments:
+            return
+        table = NotificationCounter.__table__
+        statement = pg_insert(table).values([
+            {'user_id': user_id, 'total_count': total, 'unread_count': unread}
+            for user_id, (total, unread) in increments.items()
+        ])
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.user_id],
+            set_={
+                'total_count': table.c.total_count + statement.excluded.total_count,
+                'unread_count': table.c.unread_count + statement.excluded.unread_count
+            }))
 
-    def mark_as_read(self):
-        self.is_read = True
+    @staticmethod
+    def get_counts(user_id):
+        counter = db.session.query(NotificationCounter).get(user_id)
+        total, unread = (counter.total_count, counter.unread_count) if counter else (0, 0)
+        return {
+            'all': total,
+            'unread': unread,
+            'read': total - unread
+        }
+
+    @staticmethod
+    def reconcile():
+        """
+        Recounts every user's notifications from app_notifications
+        :return: number of users with notifications
+        """
+        table = NotificationCounter.__table__
+        db.session.execute(table.delete())
+        counts = select([Notification.recipient_id,
+                         func.count(Notification.id),
+                         func.count(Notification.id).filter(Notification.is_read == False)]) \
+            .where(Notification.recipient_id.isnot(None)) \
+            .group_by(Notification.recipient_id)
+        result = db.session.execute(table.insert().from_select(['user_id', 'total_count', 'unread_count'], counts))
+        db.session.commit()
+        return result.rowcount
+
+
+class NotificationOutbox(db.Model):
+    """
+    Notification intents written in the same transaction as the change they announce. The
+    notification dispatcher expands each intent into one app notification per recipient, then hands
+    it to the configured senders (email, push), retrying failed deliveries with backoff.
+    """
+    __tablename__ = 'notification_outbox'
+    __table_args__ = (
+        db.Index('ix_notification_outbox_status_available_at', 'status', 'available_at'),
+    )
+
+    PENDING = 'pending'
+    EXPANDED = 'expanded'
+    DELIVERED = 'delivered'
+    FAILED = 'failed'
+
+    id = db.Column(db.String, primary_key=True)
+    notification_type = db.Column(db.String)
+    recipient_ids = db.Column(ARRAY(db.String))
+    actor_id = db.Column(db.String, db.ForeignKey('users.id', onupdate=CASCADE, ondelete='SET NULL'))
+    event_id = db.Column(db.String, db.ForeignKey('events.id', onupdate=CASCADE, ondelete=CASCADE))
+    brand_id = db.Column(db.String, db.ForeignKey('brands.id', onupdate=CASCADE, ondelete=CASCADE))
+    ticket_id = db.Column(db.String, db.ForeignKey('event_tickets.id', onupdate=CASCADE, ondelete=CASCADE))
+    status = db.Column(db.String, nullable=False, default=PENDING, server_default=PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_error = db.Column(db.String)
+    available_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime)
+    processed_at = db.Column(db.DateTime)
+
+    def __init__(self, notification_type, recipient_ids, actor_id=None, event_id=None, brand_id=None, ticket_id=None):
+        self.id = str(uuid.uuid4())
+        self.notification_type = notification_type
+        self.recipient_ids = recipient_ids
+        self.actor_id = actor_id
+        self.event_id = event_id
+        self.brand_id = brand_id
+        self.ticket_id = ticket_id
+        self.status = NotificationOutbox.PENDING
+        self.attempts = 0
+        self.created_at = datetime.now()
+        self.available_at = self.created_at
+
+    @classmethod
+    def enqueue(cls, notification_type, recipients, actor=None, event=None, brand=None, ticket=None):
+        """
+        Adds a notification intent to the session without committing, so it is stored with the caller's write
+        :param recipients: users to notify; None entries (e.g. recommendations to non-users) are skipped
+        :return: the intent, or None when there is nobody to notify
+        """
+        recipient_ids = list(OrderedDict.fromkeys(recipient.id for recipient in recipients if recipient))
+        if not recipient_ids:
+            return None
+        intent = cls(notification_type, recipient_ids,
+                     actor_id=actor.id if actor else None,
+                     event_id=event.id if event else None,
+                     brand_id=brand.id if brand else None,
+                     ticket_id=ticket.id if ticket else None)
+        db.session.add(intent)
+        return intent
+
+    @staticmethod
+    def claim(status, batch_size=100):
+        """Locks up to batch_size due intents in `status`, skipping those another dispatcher holds."""
+        return db.session.query(NotificationOutbox) \
+            .filter(NotificationOutbox.status == status) \
+            .filter(NotificationOutbox.available_at <= datetime.now()) \
+            .order_by(NotificationOutbox.available_at) \
+            .limit(batch_size) \
+            .with_for_update(skip_locked=True) \
+            .all()
+
+    @staticmethod
+    def expand_pending(batch_size=100):
+        """
+        Inserts the app notifications of a batch of pending intents with one multi-row insert, in one transaction
+        :return: (intents expanded, notifications created)
+        """
+        intents = NotificationOutbox.claim(NotificationOutbox.PENDING, batch_size)
+        if not intents:
+            db.session.commit()
+            return 0, 0
+
+        # recipients are not foreign keys; skip users deleted since the intent was written
+        recipient_ids = set(recipient_id for intent in intents for recipient_id in intent.recipient_ids)
+        existing_ids = set(row.id for row in db.session.query(User.id).filter(User.id.in_(recipient_ids)).all())
+
+        now = datetime.now()
+        rows = []
+        increments = {}
+        for intent in intents:
+            for recipient_id in intent.recipient_ids:
+                if recipient_id not in existing_ids:
+                    continue
+                rows.append({
+                    'id': str(uuid.uuid4()),
+                    'notification_type': intent.notification_type,
+                    'recipient_id': recipient_id,
+                    'actor_id': intent.actor_id,
+                    'event_id': intent.event_id,
+                    'brand_id': intent.brand_id,
+                    'ticket_id': intent.ticket_id,
+                    'is_read': False,
+                    'created_at': now
+                })
+                total, unread = increments.get(recipient_id, (0, 0))
+                increments[recipient_id] = (total + 1, unread + 1)
+            intent.status = NotificationOutbox.EXPANDED
+
+        if rows:
+            db.session.execute(Notification.__table__.insert(), rows)
+        NotificationCounter.increment_many(increments)
         db.session.commit()
+        return len(intents), len(rows)
+
+    def mark_delivered(self):
+        self.status = NotificationOutbox.DELIVERED
+        self.processed_at = datetime.now()
+
+    def mark_failed_attempt(self, error, max_attempts=5, retry_delay=30):
+        """Records a failed delivery and schedules a retry with exponential backoff, or gives up."""
+        self.attempts += 1
+        self.last_error = str(error)[:1000]
+        if self.attempts >= max_attempts:
+            self.status = NotificationOutbox.FAILED
+            self.processed_at = datetime.now()
+        else:
+            self.available_at = datetime.now() + timedelta(seconds=retry_delay * 2 ** (self.attempts - 1))
+
+
+# Models whose rows appear in the anonymous event feeds. ORM writes to any of them drop the cached feeds
+# once the transaction commits; bulk query deletes call invalidate_event_feeds() themselves.
+EVENT_FEED_MODELS = (Event, EventTicketType, EventTicketDiscount, EventMedia, EventOrganizer, EventSpeaker,
+                     EventContactInfo, EventCategory, EventSponsor)
+
+
+@sqlalchemy_event.listens_for(db.session, 'before_flush')
+def _track_event_feed_changes(session, flush_context, instances):
+    # a collection append through a backref (e.g. a new sale order on Event.ticket_sales) is not a feed change
+    changed = list(session.new) + list(session.deleted) + \
+        [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    if any(isinstance(obj, EVENT_FEED_MODELS) for obj in changed):
+        session.info['event_feeds_changed'] = True
+
+
+@sqlalchemy_event.listens_for(db.session, 'after_commit')
+def _invalidate_event_feeds_after_commit(session):
+    if session.info.pop('event_feeds_changed', False):
+        invalidate_event_feeds()
+
+
+@sqlalchemy_event.listens_for(db.session, 'after_rollback')
+def _forget_event_feed_changes(session):
+    session.info.pop('event_feeds_changed', None)
+
+
+class LoadingStrategies(object):
+    """
+    Loader options per listing, matched to what the listing's schema reads.
+
+    Collections use `selectinload`, one extra `IN` query per collection for the whole page, so the page
+    query returns one row per parent and its LIMIT counts parents; `joinedload` is kept for to-one
+    relations, which never multiply rows. `load_only` trims wide rows to the columns the schema dumps.
+    """
+
+    USER_SUMMARY_COLUMNS = ('id', 'name', 'email', 'image', 'is_ghost')
 
     @staticmethod
-    def get_notification(notification_id):
-        return db.session.query(Notification).filter(Notification.id==notification_id).first()
+    def event_details():
+        """`EventSchema` / `EventForAnonUserSchema`, which read nearly every column and relation."""
+        return (
+            joinedload(Event.user),
+            joinedload(Event.category),
+            selectinload(Event.organizers).joinedload(EventOrganizer.user),
+            selectinload(Event.speakers).joinedload(EventSpeaker.profession),
+            selectinload(Event.speakers).joinedload(EventSpeaker.social_account),
+            selectinload(Event.media),
+            selectinload(Event.contact_info),
+            selectinload(Event.ticket_types).selectinload(EventTicketType.discounts),
+            selectinload(Event.sponsors).joinedload(EventSponsor.brand).joinedload(Brand.image),
+        )
 
     @staticmethod
-    def get_notifications(notification_ids):
-        return db.session.query(Notification).filter(Notification.id.in_(notification_ids)).all()
\ No newline at end of file
+    def event_summaries():
+        """`EventSummarySchema` / `EventSummaryForAnonUserSchema`: a few columns and the first ticket price."""
+        return (
+            load_only(Event.id, Event.name, Event.start_datetime, Event.cover_image, Event.created_at,
+                      Event.is_shareable_during_event, Event.is_shareable_after_event),
+            selectinload(Event.ticket_types).load_only(EventTicketType.id, EventTicketType.event_id,
+                                                       EventTicketType.price),
+        )
+
+    @classmethod
+    def reviews(cls):
+        """`EventReviewSchema`; vote and comment counts are columns on the review."""
+        return (
+            load_only(EventReview.id, EventReview.content, EventReview.published_at, EventReview.created_at,
+                      EventReview.author_id, EventReview.event_id, EventReview.upvotes_count,
+                      EventReview.downvotes_count, EventReview.comments_count),
+            joinedload(EventReview.author).load_only(*cls.USER_SUMMARY_COLUMNS),
+            joinedload(EventReview.event).load_only(Event.id, Event.name),
+            selectinload(EventReview.media),
+        )
+
+    @classmethod
+    def review_comments(cls):
+        """`EventReviewCommentSchema`."""
+        return (
+            joinedload(EventReviewComment.author).load_only(*cls.USER_SUMMARY_COLUMNS),
+            selectinload(EventReviewComment.media),
+        )
+
+    @classmethod
+    def comment_responses(cls):
+        """`EventReviewCommentResponseSchema`."""
+        return (
+            joinedload(EventReviewCommentResponse.author).load_only(*cls.USER_SUMMARY_COLUMNS),
+            selectinload(EventReviewCommentResponse.media),
+        )
+
+    @staticmethod
+    def brand_list():
+        """`BrandListSchema`: brand columns, its image and category; endorsements are only counted."""
+        return (
+            load_only(Brand.id, Brand.name, Brand.country, Brand.created_at, Brand.category_id,
+                      Brand.endorsement_count),
+            joinedload(Brand.image),
+            joinedload(Brand.category),
+        )
+
+    @staticmethod
+    def brand_details():
+        """`BrandSchema`; endorsements are listed through `Brand.get_brand_endorsements`."""
+        return (
+            joinedload(Brand.image),
+            joinedload(Brand.category),
+            joinedload(Brand.creator),
+            selectinload(Brand.founders),
+        )
+
+    @classmethod
+    def brand_endorsements(cls):
+        """`BrandValidationSchema`; the endorsed brand is set by `Brand.get_brand_endorsements`."""
+        return (
+            joinedload(BrandValidation.validator).load_only(*cls.USER_SUMMARY_COLUMNS),
+        )
+
+    @classmethod
+    def stream_posts(cls):
+        """`EventStreamSchema`; vote counts are columns on the post."""
+        return (
+            joinedload(EventStream.author).load_only(*cls.USER_SUMMARY_COLUMNS),
+            selectinload(EventStream.media),
+        )
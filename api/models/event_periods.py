@@ -1,6 +1,8 @@
 from datetime import date, datetime, timedelta
 import calendar
 
+from sqlalchemy import and_
+
 
 DAYS_IN_WEEK = 7
 DAYS_IN_MONTHS = [None, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
@@ -90,7 +92,7 @@ class EventPeriods:
             year = today.year
 
         next_month_start_date = today.replace(year=year, month=month, day=1)
-        next_month_end_date = today.replace(year, month, DAYS_IN_MONTHS[month])
+        next_month_end_date = today.replace(year, month, calendar.monthrange(year, month)[1])
         return {
             'period': cls.NEXT_MONTH,
             'value': (next_month_start_date, next_month_end_date)
@@ -108,6 +110,54 @@ class EventPeriods:
     def get_next_year(cls):
         today = date.today()
         return {
-            'period': cls.THIS_YEAR,
+            'period': cls.NEXT_YEAR,
             'value': (today.replace(today.year+1, 1, 1), today.replace(today.year+1, 12, 31))
-        }
\ No newline at end of file
+        }
+
+    @classmethod
+    def get_range(cls, period):
+        """
+        Returns the half-open [start, end) datetime range covered by `period`, or None when there is none
+        :param period: a period name, or the {'period', 'value'} dict returned by get_date
+        """
+        if isinstance(period, dict):
+            period = period.get('period')
+        if not period:
+            return None
+        period = cls.parse(period)
+        today = datetime.combine(date.today(), datetime.min.time())
+        week_start = today - timedelta(days=today.weekday())
+        month_start = today.replace(day=1)
+        next_month_start = cls._add_month(month_start)
+        year_start = today.replace(month=1, day=1)
+
+        ranges = {
+            cls.TODAY: (today, today + timedelta(days=1)),
+            cls.TOMORROW: (today + timedelta(days=1), today + timedelta(days=2)),
+            cls.THIS_WEEK: (week_start, week_start + timedelta(days=DAYS_IN_WEEK)),
+            cls.NEXT_WEEK: (week_start + timedelta(days=DAYS_IN_WEEK), week_start + timedelta(days=2 * DAYS_IN_WEEK)),
+            cls.THIS_MONTH: (month_start, next_month_start),
+            cls.NEXT_MONTH: (next_month_start, cls._add_month(next_month_start)),
+            cls.THIS_YEAR: (year_start, year_start.replace(year=year_start.year + 1)),
+            cls.NEXT_YEAR: (year_start.replace(year=year_start.year + 1), year_start.replace(year=year_start.year + 2)),
+        }
+        return ranges.get(period)
+
+    @classmethod
+    def predicate(cls, column, period):
+        """
+        Builds `start <= column < end` for `period`, a plain comparison an index on `column` can serve
+        :param period: a period name, or the {'period', 'value'} dict returned by get_date
+        :return: the clause, or None when there is no period to filter on ('any', unknown or empty)
+        """
+        period_range = cls.get_range(period)
+        if period_range is None:
+            return None
+        start, end = period_range
+        return and_(column >= start, column < end)
+
+    @staticmethod
+    def _add_month(month_start):
+        if month_start.month == 12:
+            return month_start.replace(year=month_start.year + 1, month=1)
+        return month_start.replace(month=month_start.month + 1)
@@ -1,57 +1,209 @@
 import base64
+import json
 from datetime import datetime
 
+from sqlalchemy import tuple_, bindparam
+
+from api.models.compiled_queries import compiled_queries
+
+
+CURSOR_VERSION = 1
+CURSOR_DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
 
 class BadCursorQuery(Exception):
     pass
 
 
+def encode_cursor_key(sort_value, row_id=None):
+    """Pack a (created_at, id) or (rank, id) keyset position into an opaque, url-safe token."""
+    payload = {'v': CURSOR_VERSION, 'id': row_id}
+    if isinstance(sort_value, datetime):
+        payload['ts'] = sort_value.strftime(CURSOR_DATETIME_FORMAT)
+    else:
+        payload['r'] = float(sort_value)
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+
+def decode_cursor_key(token):
+    """Unpack a token produced by `encode_cursor_key` back into (sort value, id).
+
+    Tokens issued before the cursor was versioned carried a bare base64 epoch
+    timestamp; those are still accepted, without an id tiebreaker.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token.encode() if isinstance(token, str) else token)
+        payload = json.loads(raw.decode())
+        if isinstance(payload, (int, float)):
+            return datetime.fromtimestamp(payload), None
+
+        if not isinstance(payload, dict) or payload.get('v') != CURSOR_VERSION:
+            raise BadCursorQuery()
+        if 'r' in payload:
+            return float(payload['r']), payload.get('id')
+        return datetime.strptime(payload['ts'], CURSOR_DATETIME_FORMAT), payload.get('id')
+    except BadCursorQuery:
+        raise
+    except Exception:
+        raise BadCursorQuery()
+
+
 class PaginationCursor(object):
 
     def __init__(self, cursor_before=None, cursor_limit=30, cursor_after=None):
-        self.before = cursor_before
-        self.after = cursor_after
+        self.before = None
+        self.after = None
+        self.before_key = None
+        self.after_key = None
         self.limit = cursor_limit
         self.has_more = False
+        self.set_before(cursor_before)
+        self.set_after(cursor_after)
 
     def set_limit(self, cursor_limit):
-        self.limit = int(cursor_limit)
-
-    def set_after(self, cursor_after):
         try:
-            if isinstance(cursor_after, datetime):
-                cursor_after = base64.b64encode(str(cursor_after.timestamp()).encode())
-                self.after = cursor_after
-            elif isinstance(cursor_after, str):
-                self.after = cursor_after
-            else:
-                self.after = None
-        except Exception:
+            self.limit = int(cursor_limit)
+        except (TypeError, ValueError):
             raise BadCursorQuery()
-
-    def set_before(self, cursor_before):
-        try:
-            if isinstance(cursor_before, datetime):
-                cursor_before = base64.b64encode(str(cursor_before.timestamp()).encode())
-                self.before = cursor_before
-            elif isinstance(cursor_before, str):
-                self.before = cursor_before  # thi is the encoded value coming from the client
-            else:
-                self.before = None
-        except Exception:
+        if self.limit < 1:
             raise BadCursorQuery()
-        
+
+    def set_after(self, cursor_after, row_id=None):
+        self.after, self.after_key = self._parse(cursor_after, row_id)
+
+    def set_before(self, cursor_before, row_id=None):
+        self.before, self.before_key = self._parse(cursor_before, row_id)
+
+    @staticmethod
+    def _parse(value, row_id=None):
+        # a datetime or rank comes from a fetched row, a string is the opaque token sent back by the client
+        if isinstance(value, (datetime, int, float)) and not isinstance(value, bool):
+            return encode_cursor_key(value, row_id), (value, row_id)
+        elif isinstance(value, str) and value:
+            return value, decode_cursor_key(value)
+        return None, None
+
     def set_has_more(self, has_more):
         self.has_more = has_more
 
     def get_after_as_float(self):
-        if not self.after:
+        if not self.after_key or not isinstance(self.after_key[0], datetime):
             return None
-        timestamp = float(base64.b64decode(self.after))
-        return timestamp
+        return self.after_key[0].timestamp()
 
     def get_before_as_float(self):
-        if not self.before:
+        if not self.before_key or not isinstance(self.before_key[0], datetime):
             return None
-        timestamp = float(base64.b64decode(self.before))
-        return timestamp
\ No newline at end of file
+        return self.before_key[0].timestamp()
+
+    @staticmethod
+    def _keyset_filter(sort_key, tiebreaker, key, older):
+        sort_value, row_id = key
+        if row_id is None:
+            return sort_key < sort_value if older else sort_key > sort_value
+        if older:
+            return tuple_(sort_key, tiebreaker) < tuple_(sort_value, row_id)
+        return tuple_(sort_key, tiebreaker) > tuple_(sort_value, row_id)
+
+    def paginate(self, query, column, tiebreaker=None, ascending=False):
+        """Fetch one page of `query` keyed on (`column`, `tiebreaker`) and move the cursor to it.
+
+        `tiebreaker` defaults to the mapped class's `id`, so rows sharing a
+        timestamp are neither skipped nor repeated. The comparison is a plain
+        row-value predicate, which a btree index on (column, id) serves directly.
+
+        One row beyond the limit is requested so `has_more` comes from the same
+        query instead of a second look-ahead. `after` walks towards older rows,
+        `before` towards newer ones; the page is always returned newest first.
+        With `ascending` it is the other way round: pages run oldest first and
+        `after` walks towards newer rows.
+        """
+        if tiebreaker is None:
+            tiebreaker = column.class_.id
+
+        return self._paginate(query, column, tiebreaker,
+                              lambda row: (getattr(row, column.key), getattr(row, tiebreaker.key)),
+                              ascending=ascending)
+
+    def paginate_ranked(self, query, rank, tiebreaker):
+        """Like `paginate`, but keyed on a computed relevance `rank`, best matches first.
+
+        `query` must select a single entity; the rank is added as an extra
+        column and stripped again from the returned rows.
+        """
+        rows = self._paginate(query.add_columns(rank.label('search_rank')), rank, tiebreaker,
+                              lambda row: (row.search_rank, getattr(row[0], tiebreaker.key)))
+        return [row[0] for row in rows]
+
+    def paginate_baked(self, name, baked_query, session, column, tiebreaker=None, **params):
+        """Like `paginate`, for a baked query from `compiled_queries` whose criteria bind `params`.
+
+        The keyset filter, order and limit are appended as baked steps keyed on
+        the page direction, so a listing compiles at most a handful of statement
+        shapes per process and each page only binds new values.
+        """
+        if tiebreaker is None:
+            tiebreaker = column.class_.id
+
+        if self.after_key:
+            direction, key = 'after', self.after_key
+        elif self.before_key:
+            direction, key = 'before', self.before_key
+        else:
+            direction, key = None, None
+        has_row_id = key is not None and key[1] is not None
+
+        baked_query = baked_query.with_criteria(self._baked_page(column, tiebreaker, direction, has_row_id),
+                                                direction, has_row_id)
+        params['cursor_limit'] = self.limit + 1
+        if key is not None:
+            params['cursor_sort_value'] = key[0]
+            if has_row_id:
+                params['cursor_row_id'] = key[1]
+
+        rows = compiled_queries.all(name, baked_query, session, **params)
+        return self._finish_page(rows, lambda row: (getattr(row, column.key), getattr(row, tiebreaker.key)))
+
+    @classmethod
+    def _baked_page(cls, column, tiebreaker, direction, has_row_id):
+        def page(query):
+            if direction is not None:
+                key = (bindparam('cursor_sort_value'), bindparam('cursor_row_id') if has_row_id else None)
+                query = query.filter(cls._keyset_filter(column, tiebreaker, key, older=direction == 'after'))
+            if direction == 'before':
+                query = query.order_by(column.asc(), tiebreaker.asc())
+            else:
+                query = query.order_by(column.desc(), tiebreaker.desc())
+            return query.limit(bindparam('cursor_limit'))
+        return page
+
+    def _paginate(self, query, sort_key, tiebreaker, row_key, ascending=False):
+        forwards = (sort_key.asc(), tiebreaker.asc()) if ascending else (sort_key.desc(), tiebreaker.desc())
+        backwards = (sort_key.desc(), tiebreaker.desc()) if ascending else (sort_key.asc(), tiebreaker.asc())
+        if self.after_key:
+            query = query.filter(self._keyset_filter(sort_key, tiebreaker, self.after_key, older=not ascending)) \
+                .order_by(*forwards)
+        elif self.before_key:
+            query = query.filter(self._keyset_filter(sort_key, tiebreaker, self.before_key, older=ascending)) \
+                .order_by(*backwards)
+        else:
+            query = query.order_by(*forwards)
+
+        return self._finish_page(query.limit(self.limit + 1).all(), row_key)
+
+    def _finish_page(self, rows, row_key):
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+
+        if self.before_key and not self.after_key:
+            rows.reverse()
+
+        if rows:
+            self.set_before(*row_key(rows[0]))
+            self.set_after(*row_key(rows[-1]))
+        else:
+            self.set_before(None)
+            self.set_after(None)
+        self.set_has_more(has_more)
+
+        return rows
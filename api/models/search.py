@@ -0,0 +1,33 @@
+import re
+
+from sqlalchemy import func, or_, cast, Float
+
+# 'simple' keeps names and places as typed instead of stemming them as English words
+SEARCH_CONFIG = 'simple'
+
+
+def to_prefix_tsquery(searchterm):
+    """Turn free text into a tsquery where every word may be a prefix ("jaz fest" -> "jaz:* & fest:*")."""
+    words = re.findall(r'\w+', searchterm or '', re.UNICODE)
+    if not words:
+        return None
+    return func.to_tsquery(SEARCH_CONFIG, ' & '.join(word + ':*' for word in words))
+
+
+def text_search(search_vector, trigram_column, searchterm):
+    """Build the match predicate and relevance rank for `searchterm`.
+
+    Rows match either on the weighted tsvector (served by its GIN index) or on
+    trigram word similarity against `trigram_column` (served by a gin_trgm_ops
+    index), which covers typos the tsquery cannot.
+
+    :return: (match clause, rank expression)
+    """
+    similarity = func.word_similarity(searchterm, trigram_column)
+    tsquery = to_prefix_tsquery(searchterm)
+    if tsquery is None:
+        return trigram_column.op('%>')(searchterm), cast(similarity, Float)
+
+    match = or_(search_vector.op('@@')(tsquery), trigram_column.op('%>')(searchterm))
+    rank = cast(func.ts_rank_cd(search_vector, tsquery) + similarity, Float)
+    return match, rank
@@ -0,0 +1,123 @@
+from flask import g, has_app_context
+
+from api.models.event import db, EventBookmark, EventTicket, EventTicketTypeAssignment, UserFollower
+
+
+class ViewerContext(object):
+    """Batch-resolved answers to "what has the viewer done with these events" and "whom do they follow".
+
+    Serializers ask for bookmark and ticket flags once per event, and for the
+    follow flag once per user; this loads them for a whole page with one
+    grouped query per flag and answers the per-row questions from memory. One instance lives on `flask.g` per
+    request and viewer.
+    """
+
+    def __init__(self, user=None):
+        self.user = user
+        self.loaded_event_ids = set()
+        self.bookmarked_event_ids = set()
+        self.purchased_event_ids = set()
+        self.gifted_event_ids = set()
+        self.loaded_user_ids = set()
+        self.followed_user_ids = set()
+
+    @classmethod
+    def get_instance(cls, user=None):
+        if not has_app_context():
+            return cls(user)
+
+        context = getattr(g, 'viewer_context', None)
+        user_id = user.id if user else None
+        if context is None or (context.user.id if context.user else None) != user_id:
+            context = cls(user)
+            g.viewer_context = context
+        return context
+
+    def load(self, event_ids):
+        """(Re)load the flags for `event_ids` so later reads are answered without queries."""
+        event_ids = set(event_id for event_id in event_ids if event_id)
+        if not event_ids:
+            return self
+
+        self.loaded_event_ids |= event_ids
+        self.bookmarked_event_ids -= event_ids
+        self.purchased_event_ids -= event_ids
+        self.gifted_event_ids -= event_ids
+
+        if not self.user:
+            return self
+
+        self.bookmarked_event_ids |= self._event_ids_of(
+            db.session.query(EventBookmark.event_id)
+                .filter(EventBookmark.user_id == self.user.id)
+                .filter(EventBookmark.event_id.in_(event_ids))
+                .group_by(EventBookmark.event_id))
+
+        self.purchased_event_ids |= self._event_ids_of(
+            db.session.query(EventTicket.event_id)
+                .filter(EventTicket.owner_id == self.user.id)
+                .filter(EventTicket.event_id.in_(event_ids))
+                .group_by(EventTicket.event_id))
+
+        self.gifted_event_ids |= self._event_ids_of(
+            db.session.query(EventTicketTypeAssignment.event_id)
+                .filter(EventTicketTypeAssignment.assigned_to_user_id == self.user.id)
+                .filter(EventTicketTypeAssignment.event_id.in_(event_ids))
+                .group_by(EventTicketTypeAssignment.event_id))
+        return self
+
+    def load_events(self, events):
+        return self.load([event.id for event in events if event is not None])
+
+    @staticmethod
+    def _event_ids_of(query):
+        return set(row.event_id for row in query.all())
+
+    def _ensure_loaded(self, event):
+        if event.id not in self.loaded_event_ids:
+            self.load([event.id])
+
+    def is_bookmarked(self, event):
+        self._ensure_loaded(event)
+        return event.id in self.bookmarked_event_ids
+
+    def has_purchased_tickets(self, event):
+        self._ensure_loaded(event)
+        return event.id in self.purchased_event_ids
+
+    def has_gifted_tickets(self, event):
+        self._ensure_loaded(event)
+        return event.id in self.gifted_event_ids
+
+    def load_followed(self, user_ids):
+        """(Re)load whether the viewer follows each of `user_ids`."""
+        user_ids = set(user_id for user_id in user_ids if user_id)
+        if not user_ids:
+            return self
+
+        self.loaded_user_ids |= user_ids
+        self.followed_user_ids -= user_ids
+
+        if not self.user:
+            return self
+
+        self.followed_user_ids |= set(
+            row.user_id for row in db.session.query(UserFollower.user_id)
+                .filter(UserFollower.follower_id == self.user.id)
+                .filter(UserFollower.user_id.in_(user_ids))
+                .group_by(UserFollower.user_id)
+                .all())
+        return self
+
+    def load_users(self, users):
+        return self.load_followed([user.id for user in users if user is not None])
+
+    def is_following(self, user):
+        if user is None:
+            return False
+        if user.id not in self.loaded_user_ids:
+            self.load_followed([user.id])
+        return user.id in self.followed_user_ids
+
+    def has_tickets(self, event):
+        return self.has_purchased_tickets(event) or self.has_gifted_tickets(event)
@@ -0,0 +1,92 @@
+from flask import g, has_app_context
+from sqlalchemy import literal, select, union_all
+
+from api.models.event import db, EventReviewUpvote, EventReviewDownvote, EventReviewCommentUpvote, \
+    EventReviewCommentDownvote, EventReviewCommentResponseUpvote, EventReviewCommentResponseDownvote
+
+UPVOTE = 'up'
+DOWNVOTE = 'down'
+
+# kind of votable row -> (vote, vote model, column holding the voted row's id)
+VOTE_TABLES = {
+    'review': ((UPVOTE, EventReviewUpvote, EventReviewUpvote.review_id),
+               (DOWNVOTE, EventReviewDownvote, EventReviewDownvote.review_id)),
+    'comment': ((UPVOTE, EventReviewCommentUpvote, EventReviewCommentUpvote.comment_id),
+                (DOWNVOTE, EventReviewCommentDownvote, EventReviewCommentDownvote.comment_id)),
+    'response': ((UPVOTE, EventReviewCommentResponseUpvote, EventReviewCommentResponseUpvote.response_id),
+                 (DOWNVOTE, EventReviewCommentResponseDownvote, EventReviewCommentResponseDownvote.response_id))
+}
+
+
+class VoteStates(object):
+    """Batch-resolved answers to "has the viewer up- or downvoted this review, comment or response".
+
+    Serializers ask once per row; `load` fetches the viewer's votes on a whole
+    page, across any mix of reviews, comments and responses, with one
+    `UNION ALL` query over the vote tables and answers the per-row questions
+    from memory. One instance lives on `flask.g` per request and viewer.
+    """
+
+    def __init__(self, user=None):
+        self.user = user
+        self.loaded = set()
+        self.votes = {}
+
+    @classmethod
+    def get_instance(cls, user=None):
+        if not has_app_context():
+            return cls(user)
+
+        states = getattr(g, 'vote_states', None)
+        user_id = user.id if user else None
+        if states is None or (states.user.id if states.user else None) != user_id:
+            states = cls(user)
+            g.vote_states = states
+        return states
+
+    def load(self, kind, ids):
+        """(Re)load the viewer's votes on the `kind` rows with `ids`."""
+        return self.load_many({kind: ids})
+
+    def load_many(self, ids_by_kind):
+        """(Re)load the viewer's votes for {kind: ids}, e.g. {'review': [...], 'comment': [...]}."""
+        keys = set((kind, row_id) for kind, ids in ids_by_kind.items() for row_id in ids if row_id)
+        if not keys:
+            return self
+
+        self.loaded |= keys
+        for key in keys:
+            self.votes.pop(key, None)
+
+        if not self.user:
+            return self
+
+        selects = []
+        for kind, ids in ids_by_kind.items():
+            ids = set(row_id for row_id in ids if row_id)
+            if not ids:
+                continue
+            for vote, model, target_id in VOTE_TABLES[kind]:
+                selects.append(select([literal(kind).label('kind'), literal(vote).label('vote'),
+                                       target_id.label('target_id')])
+                               .where(model.author_id == self.user.id)
+                               .where(target_id.in_(ids)))
+
+        for row in db.session.execute(union_all(*selects)):
+            self.votes.setdefault((row.kind, row.target_id), set()).add(row.vote)
+        return self
+
+    def load_rows(self, kind, rows):
+        return self.load(kind, [row.id for row in rows if row is not None])
+
+    def _ensure_loaded(self, kind, row):
+        if (kind, row.id) not in self.loaded:
+            self.load(kind, [row.id])
+
+    def is_upvoted(self, kind, row):
+        self._ensure_loaded(kind, row)
+        return UPVOTE in self.votes.get((kind, row.id), ())
+
+    def is_downvoted(self, kind, row):
+        self._ensure_loaded(kind, row)
+        return DOWNVOTE in self.votes.get((kind, row.id), ())
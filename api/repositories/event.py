@@ -38,29 +38,9 @@ class EventRepository(Repository):
             #     load_only('id', 'name', 'start_datetime'),
         # )
 
-        if period and 'period' in period and 'value' in period:
-            period_type = period['period']
-            period_value = period['value']
-
-            if period_type == EventPeriods.TODAY:
-                query = query.filter(func.DATE(Event.start_datetime) == period_value)
-            elif period_type == EventPeriods.TOMORROW:
-                query = query.filter(func.DATE(Event.start_datetime) == period_value)
-            elif period_type == EventPeriods.THIS_WEEK:
-                start_date = period_value[0]
-                end_date = period_value[1]
-                query = query.filter(func.DATE(Event.start_datetime).between(start_date, end_date))
-            elif period_type == EventPeriods.THIS_MONTH:
-                start_date = period_value[0]
-                end_date = period_value[1]
-                query = query.filter(func.DATE(Event.start_datetime).between(start_date, end_date))
-            elif period_type == EventPeriods.NEXT_MONTH:
-                start_date = period_value[0]
-                query = query.filter(func.DATE(Event.start_datetime) >= start_date)
-            elif period_type == EventPeriods.THIS_YEAR:
-                start_date = period_value[0]
-                end_date = period_value[1]
-                query = query.filter(func.DATE(Event.start_datetime).between(start_date, end_date))
+        period_filter = EventPeriods.predicate(Event.start_datetime, period)
+        if period_filter is not None:
+            query = query.filter(period_filter)
 
         if category_id:
             query = query.filter(Event.category_id==category_id)
@@ -90,29 +70,9 @@ class EventRepository(Repository):
                 joinedload(Event.media),
         )
 
-        if period and 'period' in period and 'value' in period:
-            period_type = period['period']
-            period_value = period['value']
-
-            if period_type == EventPeriods.TODAY:
-                query = query.filter(func.DATE(Event.start_datetime) == period_value)
-            elif period_type == EventPeriods.TOMORROW:
-                query = query.filter(func.DATE(Event.start_datetime) == period_value)
-            elif period_type == EventPeriods.THIS_WEEK:
-                start_date = period_value[0]
-                end_date = period_value[1]
-                query = query.filter(func.DATE(Event.start_datetime).between(start_date, end_date))
-            elif period_type == EventPeriods.THIS_MONTH:
-                start_date = period_value[0]
-                end_date = period_value[1]
-                query = query.filter(func.DATE(Event.start_datetime).between(start_date, end_date))
-            elif period_type == EventPeriods.NEXT_MONTH:
-                start_date = period_value[0]
-                query = query.filter(func.DATE(Event.start_datetime) >= start_date)
-            elif period_type == EventPeriods.THIS_YEAR:
-                start_date = period_value[0]
-                end_date = period_value[1]
-                query = query.filter(func.TIMESTAMP(Event.start_datetime).between(start_date, end_date))
+        period_filter = EventPeriods.predicate(Event.start_datetime, period)
+        if period_filter is not None:
+            query = query.filter(period_filter)
 
         if creator_id:
             query = query.filter(Event.user_id==creator_id)
@@ -184,6 +184,10 @@ class MediaNotFound(Exception):
     pass
 
 
+class MediaUploadFailed(Exception):
+    pass
+
+
 class PasswordMismatch(Exception):
     pass
 
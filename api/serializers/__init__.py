@@ -29,6 +29,8 @@ event_review_comment_schema = event.EventReviewCommentSchema()
 create_event_review_comment_schema = event.CreateEventReviewCommentSchema()
 event_review_comment_response_schema = event.EventStreamCommentResponseSchema()
 create_event_review_comment_response_schema = event.CreateEventReviewCommentResponseSchema()
+event_stream_schema = event.EventStreamSchema()
+create_event_stream_schema = event.CreateEventStreamSchema()
 event_sponsor_schema = event.EventSponsorSchema()
 ticket_reservation_req_schema = event.TicketReservationRequestSchema()
 remove_ticket_reservation_req_schema = event.RemoveTicketReservationRequestSchema()
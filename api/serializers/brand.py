@@ -1,5 +1,7 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, pre_dump
 from api.serializers.user import UserSummarySchema
+from api.auth.authenticator import Authenticator
+from api.models.viewer_context import ViewerContext
 from api.serializers.image import MediaSchema, CreateMediaSchema
 
 
@@ -7,14 +9,24 @@ class BrandCategorySchema(Schema):
     id = fields.String(required=True, dump_only=True)
     name = fields.String(required=True)
     slug = fields.String(required=True)
-    number_of_brands = fields.Function(lambda obj: len(obj.brands))
+    number_of_brands = fields.Integer(attribute='brands_count')
 
 
 class BrandSummarySchema(Schema):
     id = fields.String(required=True, dump_only=True)
     name = fields.String(required=True)
     image = fields.Nested(MediaSchema, required=True)
-    endorsement_count = fields.Function(lambda obj: len(obj.endorsements))
+    endorsement_count = fields.Integer()
+
+
+class BrandListSchema(Schema):
+    id = fields.String(required=True, dump_only=True)
+    name = fields.String(required=True)
+    image = fields.Nested(MediaSchema, required=True)
+    created_at = fields.DateTime(required=True)
+    country = fields.String(required=True)
+    category = fields.Nested(BrandCategorySchema)
+    endorsement_count = fields.Integer()
 
 
 class BrandFounderSchema(Schema):
@@ -29,6 +41,12 @@ class BrandValidationSchema(Schema):
     created_at = fields.DateTime(required=True)
     brand = fields.Nested(BrandSummarySchema, required=True)
 
+    @pre_dump(pass_many=True)
+    def load_viewer_context(self, data, many, **kwargs):
+        ViewerContext.get_instance(Authenticator.get_instance().get_auth_user_without_auth_check()) \
+            .load_users([validation.validator for validation in (data if many else [data])])
+        return data
+
 
 class BrandSchema(Schema):
     id = fields.String(required=True, dump_only=True)
@@ -40,8 +58,7 @@ class BrandSchema(Schema):
     creator = fields.Nested(UserSummarySchema)
     country = fields.String(required=True)
     category = fields.Nested(BrandCategorySchema)
-    endorsement_count = fields.Function(lambda obj: len(obj.endorsements))
-    endorsements = fields.Nested(BrandValidationSchema, many=True)
+    endorsement_count = fields.Integer()
     # founder = fields.Function(lambda obj:  obj.founder.split(",") if obj.founder else None)
     founders = fields.Nested(BrandFounderSchema, many=True)
     founded_date = fields.String(required=True)
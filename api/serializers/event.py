@@ -1,9 +1,47 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, pre_dump, validate
 from datetime import datetime, timedelta
 
-from api.serializers.user import UserSummarySchema
+from api.serializers.user import UserSummarySchema, UserSummaryAnonSchema
 from api.serializers.brand import BrandSummarySchema
 from api.auth.authenticator import Authenticator
+from api.models.viewer_context import ViewerContext
+from api.models.vote_states import VoteStates
+
+
+def viewer_context():
+    return ViewerContext.get_instance(Authenticator.get_instance().get_auth_user_without_auth_check())
+
+
+class ViewerFlagsMixin(object):
+
+    @pre_dump(pass_many=True)
+    def load_viewer_context(self, data, many, **kwargs):
+        viewer_context().load_events(data if many else [data])
+        return data
+
+
+def vote_states():
+    return VoteStates.get_instance(Authenticator.get_instance().get_auth_user_without_auth_check())
+
+
+class ViewerVotesMixin(object):
+    """Adds the viewer's `is_upvoted` / `is_downvoted` flags, resolved for the whole page at once."""
+
+    vote_kind = None
+
+    is_upvoted = fields.Method('get_is_upvoted', required=True)
+    is_downvoted = fields.Method('get_is_downvoted', required=True)
+
+    @pre_dump(pass_many=True)
+    def load_vote_states(self, data, many, **kwargs):
+        vote_states().load_rows(self.vote_kind, data if many else [data])
+        return data
+
+    def get_is_upvoted(self, obj):
+        return vote_states().is_upvoted(self.vote_kind, obj)
+
+    def get_is_downvoted(self, obj):
+        return vote_states().is_downvoted(self.vote_kind, obj)
 
 
 class JobSchema(Schema):
@@ -96,7 +134,7 @@ class EventForAnonUserSchema(Schema):
     ref = fields.String()
 
 
-class EventSchema(Schema):
+class EventSchema(ViewerFlagsMixin, Schema):
     id = fields.String(required=True, dump_only=True)
     name = fields.String(required=True)
     description = fields.String(required=True)
@@ -111,15 +149,12 @@ class EventSchema(Schema):
     contact_info = fields.Nested(EventContactInfoSchema, many=True)
     category = fields.Nested(EventCategorySchema)
     ticket_types = fields.Nested(EventTicketTypeSchema, many=True)
-    is_bookmarked = fields.Function(lambda event: event.is_bookmarked_by(Authenticator.get_instance()
-                                                                         .get_auth_user_without_auth_check()))
-    is_attending = fields.Function(lambda event: Authenticator.get_instance()
-                                   .get_auth_user_without_auth_check().has_tickets_for_event(event))
+    is_bookmarked = fields.Function(lambda event: viewer_context().is_bookmarked(event))
+    is_attending = fields.Function(lambda event: viewer_context().has_tickets(event))
     is_shareable_during_event = fields.Boolean()
     is_shareable_after_event = fields.Boolean()
     sponsors = fields.Nested('EventSponsorSchema', many=True)
-    has_purchased_tickets = fields.Function(lambda event: Authenticator.get_instance()
-                                            .get_auth_user_without_auth_check().has_purchased_tickets_for_event(event))
+    has_purchased_tickets = fields.Function(lambda event: viewer_context().has_purchased_tickets(event))
     creator = fields.Nested('UserSummarySchema', attribute='user')
     created_at = fields.DateTime()
     ticket_types = fields.Nested(EventTicketTypeSchema, many=True)
@@ -152,17 +187,17 @@ class EventResponseSchema(EventSchema):
     pass
 
 
-class EventSummarySchema(Schema):
+class EventSummarySchema(ViewerFlagsMixin, Schema):
     id = fields.String(required=True)
     name = fields.String(required=True)
     start_datetime = fields.DateTime(required=True)
     cover_image = fields.String(required=True)
     ticket_price = fields.Function(lambda event: event.ticket_types[0].price if event.ticket_types else 0)
-    is_bookmarked = fields.Function(lambda event: event.is_bookmarked_by(Authenticator.get_instance().get_auth_user()))
-    is_attending = fields.Function(lambda event: Authenticator.get_instance().get_auth_user().has_tickets_for_event(event))
+    is_bookmarked = fields.Function(lambda event: viewer_context().is_bookmarked(event))
+    is_attending = fields.Function(lambda event: viewer_context().has_tickets(event))
     is_shareable_during_event = fields.Boolean()
     is_shareable_after_event = fields.Boolean()
-    has_purchased_tickets = fields.Function(lambda event: Authenticator.get_instance().get_auth_user().has_purchased_tickets_for_event(event))
+    has_purchased_tickets = fields.Function(lambda event: viewer_context().has_purchased_tickets(event))
     created_at = fields.DateTime()
 
 
@@ -265,21 +300,19 @@ class TicketTypeDiscountSchema(CreateTicketTypeDiscountSchema):
     id = fields.String(required=True)
 
 
-class EventReviewSchema(Schema):
+class EventReviewSchema(ViewerVotesMixin, Schema):
+    vote_kind = 'review'
+
     id = fields.String(required=True)
     content = fields.String(required=True)
     published_at = fields.DateTime(required=True)
-    upvotes = fields.Function(lambda obj: obj.upvotes_count())
-    downvotes = fields.Function(lambda obj: obj.downvotes_count())
+    upvotes = fields.Integer(attribute='upvotes_count')
+    downvotes = fields.Integer(attribute='downvotes_count')
     author = fields.Nested(UserSummarySchema)
     media = fields.Nested('EventReviewMediaSchema', many=True, required=True)
     event_id = fields.String(required=True)
     event_name = fields.Function(lambda obj: obj.event.name, required=True)
-    is_upvoted = fields.Function(lambda obj: obj.is_upvoted_by(Authenticator.get_instance().get_auth_user_without_auth_check())
-                                 if Authenticator.get_instance().get_auth_user_without_auth_check() else False, required=True)
-    is_downvoted = fields.Function(lambda obj: obj.is_downvoted_by(Authenticator.get_instance().get_auth_user_without_auth_check())
-                                   if Authenticator.get_instance().get_auth_user_without_auth_check() else False, required=True)
-    comments_count = fields.Function(lambda obj:  obj.comments_count(), required=True)
+    comments_count = fields.Integer(required=True)
 
 
 class CreateEventReviewSchema(Schema):
@@ -302,34 +335,46 @@ class CreateEventReviewMediaSchema(Schema):
 
 
 class EventStreamSchema(Schema):
+    # broadcast as-is to every viewer of a live stream, so nothing in it may depend on the viewer
     id = fields.String(required=True)
     content = fields.String(required=True)
     published_at = fields.DateTime(required=True)
-    upvotes = fields.Function(lambda obj: len(obj.upvotes))
-    downvotes = fields.Function(lambda obj: len(obj.downvotes))
-    author = fields.Nested(UserSummarySchema)
-    media = fields.Nested('EventReviewMediaSchema', many=True, required=True)
+    upvotes = fields.Integer(attribute='upvotes_count')
+    downvotes = fields.Integer(attribute='downvotes_count')
+    author = fields.Nested(UserSummaryAnonSchema)
+    event_id = fields.String(required=True)
+    media = fields.Nested('EventStreamMediaSchema', many=True, required=True)
+
+
+class CreateEventStreamSchema(Schema):
+    content = fields.String(required=True)
+    media = fields.Nested('CreateEventStreamMediaSchema', many=True)
 
 
 class EventStreamMediaSchema(Schema):
     id = fields.String(required=True)
-    format = fields.String(required=True)
-    source_url = fields.String(required=True)
+    type = fields.String(required=True)
+    url = fields.String(required=True)
     stream_id = fields.String(required=True)
 
 
-class EventReviewCommentSchema(Schema):
+class CreateEventStreamMediaSchema(Schema):
+    type = fields.String(required=True)
+    url = fields.String(required=True)
+
+
+class EventReviewCommentSchema(ViewerVotesMixin, Schema):
+    vote_kind = 'comment'
+
     id = fields.String(required=True)
     content = fields.String(required=True)
     published_at = fields.DateTime(required=True)
-    upvotes = fields.Function(lambda obj: len(obj.upvotes))
-    downvotes = fields.Function(lambda obj: len(obj.downvotes))
-    is_upvoted = fields.Function(lambda obj: obj.is_upvoted_by(obj.author))
-    is_downvoted = fields.Function(lambda obj: obj.is_downvoted_by(obj.author))
+    upvotes = fields.Integer(attribute='upvotes_count')
+    downvotes = fields.Integer(attribute='downvotes_count')
     author = fields.Nested(UserSummarySchema)
     media = fields.Nested('EventReviewMediaSchema', many=True)
     review_id = fields.String(required=True)
-    responses_count = fields.Function(lambda obj: obj.responses_count())
+    responses_count = fields.Integer()
 
 
 class CreateEventReviewCommentSchema(Schema):
@@ -350,12 +395,14 @@ class CreateEventReviewCommentMediaSchema(Schema):
     filename = fields.String()
 
 
-class EventReviewCommentResponseSchema(Schema):
+class EventReviewCommentResponseSchema(ViewerVotesMixin, Schema):
+    vote_kind = 'response'
+
     id = fields.String(required=True)
     content = fields.String(required=True)
     published_at = fields.DateTime(required=True)
-    upvotes = fields.Function(lambda obj: len(obj.upvotes))
-    downvotes = fields.Function(lambda obj:len(obj.downvotes))
+    upvotes = fields.Integer(attribute='upvotes_count')
+    downvotes = fields.Integer(attribute='downvotes_count')
     author = fields.Nested(UserSummarySchema, required=True)
     comment_id = fields.String(required=True)
     media = fields.Nested('EventReviewCommentResponseMediaSchema', many=True)
@@ -398,12 +445,14 @@ class EventStreamCommentMediaSchema(Schema):
     comment_id = fields.String(required=True)
 
 
-class EventStreamCommentResponseSchema(Schema):
+class EventStreamCommentResponseSchema(ViewerVotesMixin, Schema):
+    vote_kind = 'response'
+
     id = fields.String(required=True)
     content = fields.String(required=True)
     published_at = fields.String(required=True)
-    upvotes = fields.Function(lambda obj: len(obj.upvotes))
-    downvotes = fields.Function(lambda obj: len(obj.downvotes))
+    upvotes = fields.Integer(attribute='upvotes_count')
+    downvotes = fields.Integer(attribute='downvotes_count')
     author_id = fields.String(required=True)
     author = fields.Nested(UserSummarySchema, required=True)
     comment_id = fields.String(required=True)
@@ -438,7 +487,7 @@ class BuyTicketInfo(Schema):
 
 class TicketReservationRequestSchema(Schema):
     ticket_type_id = fields.String(required=True)
-    ticket_qty = fields.Integer(required=True)
+    ticket_qty = fields.Integer(required=True, validate=validate.Range(min=1))
 
 
 class RemoveTicketReservationRequestSchema(Schema):
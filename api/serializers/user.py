@@ -1,5 +1,6 @@
 from marshmallow import Schema, fields
 from api.auth.authenticator import Authenticator
+from api.models.viewer_context import ViewerContext
 from api.utils import CardExpirationDateField
 
 
@@ -51,9 +52,8 @@ class UserSummarySchema(Schema):
     email = fields.String(required=True)
     image = fields.String(required=True)
     is_ghost = fields.Boolean()
-    is_follower = fields.Function(lambda user: Authenticator.get_instance().get_auth_user_without_auth_check().
-                                  am_following_user(user) if Authenticator.get_instance().
-                                  get_auth_user_without_auth_check() else False)
+    is_follower = fields.Function(lambda user: ViewerContext.get_instance(
+        Authenticator.get_instance().get_auth_user_without_auth_check()).is_following(user))
 
 
 class UserSummaryAnonSchema(Schema):
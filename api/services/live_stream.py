@@ -0,0 +1,238 @@
+import logging
+import threading
+import time
+from collections import deque
+
+import simplejson as json
+
+from api import db_config
+
+logger = logging.getLogger(__name__)
+
+
+class LiveStreamMessage(object):
+    """One server-sent event: `id` is what the client sends back as `Last-Event-ID` to resume after it."""
+
+    def __init__(self, id=None, event='message', data=None):
+        self.id = id
+        self.event = event
+        self.data = data
+
+    def to_dict(self):
+        return {'id': self.id, 'event': self.event, 'data': self.data}
+
+    @classmethod
+    def from_dict(cls, message):
+        return cls(id=message.get('id'), event=message.get('event', 'message'), data=message.get('data'))
+
+    def encode(self):
+        lines = []
+        if self.id is not None:
+            lines.append('id: {id}'.format(id=self.id))
+        lines.append('event: {event}'.format(event=self.event))
+        lines.extend('data: ' + line for line in json.dumps(self.data).splitlines())
+        return '\n'.join(lines) + '\n\n'
+
+
+class Subscription(object):
+    """Messages waiting for one connected client, at most `buffer_size` of them.
+
+    A client that falls further behind is not allowed to grow the buffer: the
+    subscription is marked `lagged` and the stream ends, so the client
+    reconnects with its `Last-Event-ID` and catches up from the database.
+    """
+
+    def __init__(self, channel, buffer_size=100):
+        self.channel = channel
+        self.buffer_size = buffer_size
+        self.lagged = False
+        self.closed = False
+        self._messages = deque()
+        self._condition = threading.Condition()
+
+    def push(self, message):
+        with self._condition:
+            if self.closed or self.lagged:
+                return
+            if len(self._messages) >= self.buffer_size:
+                self._messages.clear()
+                self.lagged = True
+            else:
+                self._messages.append(message)
+            self._condition.notify()
+
+    def mark_lagged(self):
+        """End the stream so the client reconnects and replays what it may have missed."""
+        with self._condition:
+            self._messages.clear()
+            self.lagged = True
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """Wait up to `timeout` seconds for messages; return all buffered ones, or [] when none came."""
+        with self._condition:
+            if not self._messages and not self.lagged and not self.closed:
+                self._condition.wait(timeout)
+            messages = list(self._messages)
+            self._messages.clear()
+            return messages
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify()
+
+
+class InMemoryBroker(object):
+    """Delivers messages to the hub of this process only; the stand-in when a single worker serves streams."""
+
+    def __init__(self):
+        self.handler = None
+
+    def start(self, handler, on_reconnect=None):
+        self.handler = handler
+
+    def publish(self, channel, message):
+        if self.handler is not None:
+            self.handler(channel, message)
+
+
+class RedisBroker(object):
+    """Relays messages between workers through redis pub/sub, so a post reaches subscribers on every worker.
+
+    One listener thread per process receives every channel under `prefix` and
+    hands messages to the local hub. It reconnects with exponential backoff
+    when redis goes away, then calls `on_reconnect` so the hub can send its
+    clients back to the database for what was published meanwhile. A message
+    that fails to decode or deliver is logged and skipped.
+    """
+
+    def __init__(self, client, prefix='live_stream:', min_backoff=0.5, max_backoff=30):
+        self.client = client
+        self.prefix = prefix
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.handler = None
+        self.on_reconnect = None
+        self._listener = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url):
+        import redis  # optional dependency, only needed when a redis url is configured
+        return cls(redis.StrictRedis.from_url(url))
+
+    def start(self, handler, on_reconnect=None):
+        with self._lock:
+            self.handler = handler
+            self.on_reconnect = on_reconnect
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='live-stream-broker', daemon=True)
+                self._listener.start()
+
+    def publish(self, channel, message):
+        self.client.publish(self.prefix + channel, json.dumps(message))
+
+    def _listen(self):
+        backoff = self.min_backoff
+        disconnected = False
+        while True:
+            pubsub = None
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(self.prefix + '*')
+                backoff = self.min_backoff
+                if disconnected and self.on_reconnect is not None:
+                    self.on_reconnect()
+                disconnected = False
+                for item in pubsub.listen():
+                    if item.get('type') == 'pmessage':
+                        self._dispatch(item)
+            except Exception:
+                logger.exception("Live stream broker lost redis, reconnecting in %.1fs", backoff)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+            disconnected = True
+            time.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _dispatch(self, item):
+        try:
+            channel = item['channel'].decode() if isinstance(item['channel'], bytes) else item['channel']
+            data = item['data'].decode() if isinstance(item['data'], bytes) else item['data']
+            self.handler(channel[len(self.prefix):], json.loads(data))
+        except Exception:
+            logger.exception("Live stream broker dropped an undeliverable message")
+
+
+class LiveStreamHub(object):
+    """In-process pub/sub between publishers and the clients connected to this worker.
+
+    Publishing goes through the broker, which hands every message back to the
+    hub of each worker; the hub fans it out to that worker's subscriptions of
+    the channel. Nothing is stored here: clients resume from the database.
+    """
+
+    def __init__(self, broker, buffer_size=100):
+        self.broker = broker
+        self.buffer_size = buffer_size
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+        self.broker.start(self._deliver, on_reconnect=self._resync)
+
+    def publish(self, channel, message):
+        """Best effort: the message is already stored, so a broker failure only delays it until clients resync."""
+        try:
+            self.broker.publish(channel, message.to_dict())
+        except Exception:
+            logger.exception("Publishing live stream message %s on %s failed", message.id, channel)
+
+    def subscribe(self, channel):
+        subscription = Subscription(channel, buffer_size=self.buffer_size)
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.close()
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def _deliver(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        message = LiveStreamMessage.from_dict(message)
+        for subscription in subscriptions:
+            subscription.push(message)
+
+    def _resync(self):
+        # messages published while the broker was away never reached us; clients replay them on reconnect
+        with self._lock:
+            subscriptions = [subscription for channel in self._subscriptions.values() for subscription in channel]
+        for subscription in subscriptions:
+            subscription.mark_lagged()
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'channels': len(self._subscriptions),
+                'subscribers': sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+            }
+
+
+def create_broker():
+    redis_url = getattr(db_config, 'LIVE_STREAM_REDIS_URL', None)
+    if redis_url:
+        return RedisBroker.from_url(redis_url)
+    return InMemoryBroker()
+
+
+live_stream_hub = LiveStreamHub(create_broker(), buffer_size=getattr(db_config, 'LIVE_STREAM_BUFFER_SIZE', 100))
@@ -0,0 +1,114 @@
+import io
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from api import db_config
+from api import utils
+from api.repositories.exceptions import MediaUploadFailed
+
+
+class StoredMedia(object):
+    def __init__(self, public_id=None, source_url=None, format=None):
+        self.public_id = public_id
+        self.source_url = source_url
+        self.format = format
+
+
+class StorageBackend(object):
+    """Where uploaded media ends up. Implementations must be safe to call from several threads."""
+
+    def save(self, content, filename=None, public_id=None):
+        raise NotImplementedError()
+
+    def delete(self, public_ids):
+        raise NotImplementedError()
+
+
+class CloudinaryStorage(StorageBackend):
+
+    def save(self, content, filename=None, public_id=None):
+        from api.libs.cloudinary import upload as cloudinary_upload
+        resp = cloudinary_upload(io.BytesIO(content), public_id=public_id)
+        return StoredMedia(public_id=resp['public_id'], source_url=resp['url'], format=resp['format'])
+
+    def delete(self, public_ids):
+        from api.libs.cloudinary import api as cloudinary_api
+        cloudinary_api.delete_resources(public_ids)
+
+
+class LocalFileStorage(StorageBackend):
+    """Keeps media on disk under `media_dir`, for running offline and benchmarking without network."""
+
+    def __init__(self, media_dir=utils.MEDIA_DIR, base_url='/media/'):
+        self.media_dir = media_dir
+        self.base_url = base_url
+
+    def save(self, content, filename=None, public_id=None):
+        public_id = public_id or str(uuid.uuid4())
+        format = os.path.splitext(filename or '')[1].lstrip('.').lower() or None
+        name = public_id + '.' + format if format else public_id
+
+        os.makedirs(self.media_dir, exist_ok=True)
+        with open(os.path.join(self.media_dir, name), 'wb') as f:
+            f.write(content)
+        return StoredMedia(public_id=public_id, source_url=self.base_url + name, format=format)
+
+    def delete(self, public_ids):
+        for name in os.listdir(self.media_dir) if os.path.isdir(self.media_dir) else []:
+            if os.path.splitext(name)[0] in public_ids:
+                os.remove(os.path.join(self.media_dir, name))
+
+
+class MediaUploadPipeline(object):
+    """Uploads the files of one request concurrently through a bounded, process-wide thread pool.
+
+    Files are read in the calling thread, so workers never touch the request
+    or the database session; callers persist the returned `StoredMedia` in one go.
+    If any upload fails, the ones that succeeded are deleted again and
+    `MediaUploadFailed` is raised.
+    """
+
+    def __init__(self, storage, max_workers=4):
+        self.storage = storage
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def upload(self, files, public_ids=None):
+        """
+        :param files: uploaded file objects (werkzeug `FileStorage`)
+        :param public_ids: optional ids to store each file under, in the same order
+        :return: list of `StoredMedia`, in the order of `files`
+        """
+        public_ids = public_ids or [None] * len(files)
+        futures = [self.executor.submit(self.storage.save, self._read(file), file.filename, public_id)
+                   for file, public_id in zip(files, public_ids)]
+
+        stored, error = [], None
+        for future in futures:
+            try:
+                stored.append(future.result())
+            except Exception as e:
+                error = error or e
+
+        if error is not None:
+            if stored:
+                self.storage.delete([media.public_id for media in stored])
+            raise MediaUploadFailed(error)
+        return stored
+
+    def delete(self, public_ids):
+        self.storage.delete(public_ids)
+
+    @staticmethod
+    def _read(file):
+        return file.read()
+
+
+def create_storage_backend():
+    if getattr(db_config, 'MEDIA_STORAGE_BACKEND', 'cloudinary') == 'local':
+        return LocalFileStorage(base_url=getattr(db_config, 'MEDIA_BASE_URL', '/media/'))
+    return CloudinaryStorage()
+
+
+media_upload_pipeline = MediaUploadPipeline(create_storage_backend(),
+                                            max_workers=getattr(db_config, 'MEDIA_UPLOAD_MAX_WORKERS', 4))
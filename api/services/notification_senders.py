@@ -0,0 +1,42 @@
+import threading
+
+from api import db_config
+
+
+class NotificationSender(object):
+    """Delivers an expanded notification intent outside the app (email, push). Raise to have it retried."""
+
+    name = None
+
+    def send(self, intent):
+        raise NotImplementedError()
+
+
+class InMemorySender(NotificationSender):
+    """Stand-in that records what would have been sent, for running the dispatcher without providers."""
+
+    name = 'memory'
+
+    def __init__(self):
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, intent):
+        with self._lock:
+            for recipient_id in intent.recipient_ids:
+                self.sent.append({
+                    'notification_type': intent.notification_type,
+                    'recipient_id': recipient_id,
+                    'actor_id': intent.actor_id,
+                    'event_id': intent.event_id
+                })
+
+
+SENDERS = {
+    InMemorySender.name: InMemorySender
+}
+
+
+def create_senders():
+    """Builds the senders named in NOTIFICATION_SENDERS; none means intents are only expanded into app notifications."""
+    return [SENDERS[name]() for name in getattr(db_config, 'NOTIFICATION_SENDERS', ())]
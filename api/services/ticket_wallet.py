@@ -0,0 +1,72 @@
+from collections import OrderedDict
+
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload
+
+from api.models.event import db, EventTicket, EventTicketTypeAssignment
+
+
+class TicketWallet(object):
+    """
+    Every ticket a user owns or was gifted, loaded in one query with the ticket types, owners,
+    assignments and assignees the serializers read, then grouped in memory.
+
+    A ticket the user owns is either assigned (given to someone) or unassigned; a ticket someone
+    else assigned to the user is gifted.
+    """
+
+    def __init__(self, user_id, tickets=None):
+        self.user_id = user_id
+        self.tickets = tickets or []
+
+    @classmethod
+    def load(cls, user_id, event_id=None):
+        query = db.session.query(EventTicket) \
+            .options(joinedload(EventTicket.ticket_type),
+                     joinedload(EventTicket.owner),
+                     joinedload(EventTicket.assignment).joinedload(EventTicketTypeAssignment.assigned_to)) \
+            .filter(or_(EventTicket.owner_id == user_id,
+                        EventTicket.assignment.any(EventTicketTypeAssignment.assigned_to_user_id == user_id)))
+
+        if event_id:
+            query = query.filter(EventTicket.event_id == event_id)
+
+        return cls(user_id, query.order_by(EventTicket.created_at, EventTicket.id).all())
+
+    def is_gifted(self, ticket):
+        return any(assignment.assigned_to_user_id == self.user_id for assignment in ticket.assignment)
+
+    def group_by_type(self, ticket_types=None):
+        """
+        :param ticket_types: types to report, in order, including those the user holds no tickets of;
+            defaults to the types of the tickets in the wallet
+        :return: list of dicts shaped for `AttendeeTicketGroupedByTypeSchema`
+        """
+        groups = OrderedDict()
+        for ticket_type in ticket_types or []:
+            groups[ticket_type.id] = self._empty_group(ticket_type)
+
+        for ticket in self.tickets:
+            if ticket.ticket_type_id not in groups:
+                if ticket_types is not None:
+                    continue
+                groups[ticket.ticket_type_id] = self._empty_group(ticket.ticket_type)
+            group = groups[ticket.ticket_type_id]
+
+            if ticket.owner_id == self.user_id:
+                if ticket.assignment:
+                    group['assigned_tickets'].append(ticket)
+                else:
+                    group['unassigned_tickets'].append(ticket)
+            if self.is_gifted(ticket):
+                group['gifted_tickets'].append(ticket)
+        return list(groups.values())
+
+    @staticmethod
+    def _empty_group(ticket_type):
+        return {
+            'ticket_type': ticket_type,
+            'assigned_tickets': [],
+            'unassigned_tickets': [],
+            'gifted_tickets': []
+        }
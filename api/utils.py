@@ -3,6 +3,7 @@ import bcrypt
 from datetime import date, datetime
 from marshmallow.fields import Field
 import base64
+import uuid
 from slugify import slugify
 
 from api.repositories.exceptions import InvalidCardExpirationDateFmt
@@ -82,6 +83,16 @@ def gen_po_ref(po_id):
     return 'PO' + base64.b32encode(po_id.encode())[:4].decode()
 
 
+def gen_ticket_ref(ticket_id):
+    """
+    Takes a ticket ID (a uuid string) and base32 encode its bytes.
+    Takes the first 10 characters as the ticket ref
+    :param ticket_id:
+    :return:
+    """
+    return 'TK' + base64.b32encode(uuid.UUID(ticket_id).bytes)[:10].decode()
+
+
 def gen_image_filename(uid):
     return base64.b32encode(uid.encode())[:7].decode()
 
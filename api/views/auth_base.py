@@ -9,7 +9,8 @@ user_summary_schema = user_schemas.UserSummarySchema()
 
 USERS_UNGUARDED_ENDPOINTS = ['login_user', 'index', 'get']
 BRANDS_UNGUARDED_ENDPOINTS = ['index', 'search_brand', 'get_brand_validations', 'get_created_events']
-EVENT_UNGUARDED_ENDPOINTS = ['get_event_reviews', 'get_event_review', 'get_review_comments', 'get_event_review_comment_responses', 'get_event_attendees']
+EVENT_UNGUARDED_ENDPOINTS = ['get_feed', 'get_event_reviews', 'get_event_review', 'get_review_comments', 'get_event_review_comment_responses', 'get_event_attendees',
+                             'get_event_stream', 'get_live_event_stream']
 UNGUARDED_ENDPOINTS = USERS_UNGUARDED_ENDPOINTS + BRANDS_UNGUARDED_ENDPOINTS + EVENT_UNGUARDED_ENDPOINTS
 
 
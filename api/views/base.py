@@ -1,4 +1,5 @@
 from . import *
+from flask import abort
 from api.models.pagination_cursor import PaginationCursor, BadCursorQuery
 from api.auth.authenticator import Authenticator
 from api.exceptions import UserNotFound
@@ -35,8 +36,9 @@ class BaseView(FlaskView):
 
             return cursor
         except BadCursorQuery:
-            return response({
+            # callers use the result as a cursor, so a bad query has to end the request here
+            abort(response({
                 "ok": False,
                 "code": "INVALID_CURSOR_QUERY_VALUE"
-            }, 400)
+            }, 400))
 
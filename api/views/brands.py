@@ -2,12 +2,13 @@ from api.views import *
 from api.views.auth_base import AuthBaseView
 from api.auth.authenticator import Authenticator
 from marshmallow.exceptions import ValidationError
-from api.serializers.brand import BrandSchema, CreateBrandSchema, BrandValidationSchema
+from api.serializers.brand import BrandSchema, BrandListSchema, CreateBrandSchema, BrandValidationSchema
 from api.models.event import Brand, BrandCategory, BrandValidation, BrandMedia, BrandFounder
 from api.repositories import exceptions
 from api import utils
 
 brand_schema = BrandSchema()
+brand_list_schema = BrandListSchema()
 create_brand_schema = CreateBrandSchema()
 brand_validation_schema = BrandValidationSchema()
 
@@ -24,7 +25,7 @@ class BrandView(AuthBaseView):
             brands = Brand.get_brands(category_id=category_id, cursor=cursor)
             return response({
                 'ok': True,
-                'brands': brand_schema.dump(brands, many=True),
+                'brands': brand_list_schema.dump(brands, many=True),
                 'brands_count': Brand.get_brands_total(category_id=category_id),
                 'metadata': {
                     'cursor': {
@@ -114,7 +115,7 @@ class BrandView(AuthBaseView):
 
             if 'category_id' in data:
                 category_id = data['category_id']
-                brand.category = BrandCategory.get_category(category_id)
+                brand.set_category(BrandCategory.get_category(category_id))
 
             if 'founder' in data:
                 founders = data['founder']
@@ -164,17 +165,17 @@ class BrandView(AuthBaseView):
         cursor = self.get_cursor(request)
         if 'q' in request.args:
             searchterm = request.args['q']
-            brands = Brand.get_brands(searchterm=searchterm, cursor=cursor)
-            brands_total = Brand.get_brands_total(searchterm=searchterm)
+            brands = Brand.search_brands(searchterm, cursor=cursor)
+            brands_total = Brand.search_brands_total(searchterm)
             return response({
                 "ok": True,
-                "brands": brand_schema.dump(brands, many=True),
+                "brands": brand_list_schema.dump(brands, many=True),
                 "brands_count": brands_total,
                 "metadata": {
                     "cursor": {
                         "before": cursor.before,
                         "after": cursor.after,
-                        "cursor": cursor.has_more,
+                        "has_more": cursor.has_more,
                         "limit": cursor.limit
                     }
                 }
@@ -188,11 +189,21 @@ class BrandView(AuthBaseView):
     @route('<string:brand_id>/validations', methods=['GET'])
     def get_brand_endorsements(self, brand_id):
         try:
+            cursor = self.get_cursor(request)
             brand = Brand.get_brand(brand_id)
-            brand_endorsements = brand.get_brand_endorsements(brand_id)
+            brand_endorsements = brand.get_brand_endorsements(cursor)
             return response({
                 'ok': True,
-                'brand_endorsements': brand_validation_schema.dump(brand_endorsements, many=True)
+                'brand_endorsements': brand_validation_schema.dump(brand_endorsements, many=True),
+                'endorsement_count': brand.endorsement_count,
+                'metadata': {
+                    'cursor': {
+                        'before': cursor.before,
+                        'after': cursor.after,
+                        'has_more': cursor.has_more,
+                        'limit': cursor.limit
+                    }
+                }
             })
         except exceptions.BrandNotFound:
             return response({
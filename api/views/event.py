@@ -1,3 +1,6 @@
+import uuid
+
+from flask import Response
 from marshmallow import ValidationError
 from api.views.auth_base import AuthBaseView
 from api.auth.authenticator import Authenticator
@@ -11,28 +14,51 @@ from api.models.event import (
     EventReviewCommentMedia,
     EventReviewComment, EventReviewCommentResponseMedia,
     EventSponsor, EventReviewCommentResponse,
+    EventStream, EventStreamMedia,
 )
 from api.models import event as models
-from api.libs.cloudinary import upload as cloudinary_upload
-from api.libs.cloudinary import api as cloudinary_api
+from api.services.media_storage import media_upload_pipeline
+from api.services.ticket_wallet import TicketWallet
+from api.services.live_stream import live_stream_hub, LiveStreamMessage
 
 from api.repositories import exceptions
 import api.serializers as serializers
+from api import utils
 from api.utils import TicketDiscountOperator, TicketDiscountType
 from api.models.domain.user_payment_info import DiscountTypes
 from . import *
-from ..models.pagination_cursor import PaginationCursor
+from ..models.pagination_cursor import PaginationCursor, BadCursorQuery, encode_cursor_key, decode_cursor_key
+from api.cache import event_feed_cache
+from api import db_config
 from .. import decorators
 
+HOME_FEED_PERIODS = [event_periods.EventPeriods.TODAY, event_periods.EventPeriods.TOMORROW,
+                     event_periods.EventPeriods.THIS_WEEK, event_periods.EventPeriods.THIS_MONTH]
+
 
 class EventView(AuthBaseView):
 
     def index(self):
+        auth_user = Authenticator.get_instance().get_auth_user_without_auth_check()
+        if auth_user:
+            return response(self._get_events_payload(auth_user))
+
+        # anonymous feeds are the same for every visitor asking for the same page
+        cache_key = event_feed_cache.make_key(
+            output='detail' if request.args.get('output') == 'detail' else 'summary',
+            period=','.join(p.strip().lower() for p in request.args.get('period', '').split(',') if p.strip()),
+            category_slug=request.args.get('category_slug') or None,
+            cursor_after=request.args.get('cursor_after'),
+            cursor_before=request.args.get('cursor_before'),
+            limit=request.args.get('limit')
+        )
+        return response(event_feed_cache.fetch(cache_key, lambda: self._get_events_payload(auth_user)))
+
+    def _get_events_payload(self, auth_user):
         output_query = False
         period_query = False
         category = None
         payload = {}
-        auth_user = Authenticator.get_instance().get_auth_user_without_auth_check()
         cursor = self.get_cursor(request)
         if request.args:
             if 'output' in request.args:
@@ -47,27 +73,21 @@ class EventView(AuthBaseView):
                     category = models.EventCategory.find_category_by_slug(category_slug)
 
         if output_query and output_query == 'detail':
+            category_id = category.id if category else None
+            event_schema = serializers.event_schema if auth_user else serializers.event_anon_schema
             if period_query:
                 if ',' in period_query:  # we have multiple period_query.eg. today,tomorrow,this_week
-                    date = [p.strip() for p in period_query.split(',')]
                     events = {}
-                    for period in period_query:
-                        date = event_periods.EventPeriods.get_date(date)
-                        period_events = models.Event.get_events(period=date, category_id=category.id, cursor=cursor)
-                        events[period] = serializers.event_schema.dump(period_events, many=True)
+                    for period in [p.strip() for p in period_query.split(',') if p.strip()]:
+                        period_events = models.Event.get_events(period=period, category_id=category_id,
+                                                                cursor=PaginationCursor(cursor_limit=cursor.limit))
+                        events[period] = event_schema.dump(period_events, many=True)
                 else:
-                    date = event_periods.EventPeriods.get_date(period_query)
-                    events = models.Event.get_events(period=date, category_id=category.id, cursor=cursor)
-                    if auth_user:
-                        events = serializers.event_schema.dump(events, many=True)
-                    else:
-                        events = serializers.event_anon_schema.dump(events, many=True)
+                    events = models.Event.get_events(period=period_query, category_id=category_id, cursor=cursor)
+                    events = event_schema.dump(events, many=True)
             else:
-                events = models.Event.get_events(category_id=category.id, cursor=cursor)
-                if auth_user:
-                    events = serializers.event_schema.dump(events, many=True)
-                else:
-                    events = serializers.event_anon_schema.dump(events, many=True)
+                events = models.Event.get_events(category_id=category_id, cursor=cursor)
+                events = event_schema.dump(events, many=True)
             payload.update({
                 'events': events,
                 'metadata': {
@@ -79,47 +99,23 @@ class EventView(AuthBaseView):
                     }
                 }
             })
-            return response(payload)
+            return payload
         else:
             # summary of events
             if period_query:
                 if ',' in period_query:  # we have multiple period_query.eg. today,tomorrow,this_week
-                    period_querys = [p.strip() for p in period_query.split(',')]
-                    events = {}
-                    for period_query in period_querys:
-                        cursor = PaginationCursor()
-                        date = event_periods.EventPeriods.get_date(period_query)
-                        fetched_events = models.Event.get_events_summary(period=date, cursor=cursor)
-                        if auth_user:
-                            fetched_events = serializers.event_summary_schema.dump(fetched_events, many=True)
-                        else:
-                            fetched_events = serializers.event_summary_anon_schema.dump(fetched_events, many=True)
-                        events[period_query] = {
-                            'data': fetched_events,
-                            'metadata': {
-                                'cursor': {
-                                    'before': cursor.before,
-                                    'after': cursor.after,
-                                    'has_more': cursor.has_more,
-                                    'limit': cursor.limit
-                                },
-                            }
-                        }
-                    events_count = None
-                    payload.update({
-                        'ok': True,
-                        'events': events,
-                        'events_count': events_count,
-                    })
-                    return response(payload)
+                    periods = [event_periods.EventPeriods.parse(p) for p in period_query.split(',') if p.strip()]
+                    cursors = dict((period, PaginationCursor()) for period in periods)
+                    payload.update(self._get_feed_payload(auth_user, periods, cursors))
+                    payload['events_count'] = None
+                    return payload
                 else:
-                    date = event_periods.EventPeriods.get_date(period_query)
-                    events = models.Event.get_events_summary(category=category, period=date, cursor=cursor)
+                    events = models.Event.get_events_summary(category=category, period=period_query, cursor=cursor)
                     if auth_user:
                         events = serializers.event_summary_schema.dump(events, many=True)
                     else:
                         events = serializers.event_summary_anon_schema.dump(events, many=True)
-                    events_count = models.Event.get_events_total(category=category, period=date)
+                    events_count = models.Event.get_events_total(category=category, period=period_query)
                     payload.update({
                         'ok': True,
                         'events': events,
@@ -133,7 +129,7 @@ class EventView(AuthBaseView):
                             },
                         }
                     })
-                    return response(payload)
+                    return payload
 
             else:
                 events = models.Event.get_events_summary(category=category, cursor=cursor)
@@ -156,17 +152,86 @@ class EventView(AuthBaseView):
                         },
                     }
                 })
-                return response(payload)
+                return payload
+
+    @route('/feed', methods=['GET'])
+    def get_feed(self):
+        """
+        Home feed: the newest events of several periods in one query
+
+        Parameters:
+            periods: comma separated periods, e.g. today,tomorrow,this_week (default HOME_FEED_PERIODS)
+            limit: events per period (default 10)
+            cursor_after_<period>: continue one period's list, e.g. cursor_after_this_week
+        """
+        auth_user = Authenticator.get_instance().get_auth_user_without_auth_check()
+        try:
+            periods = []
+            for period in request.args.get('periods', ','.join(HOME_FEED_PERIODS)).split(','):
+                period = event_periods.EventPeriods.parse(period)
+                if period in event_periods.EventPeriods.PERIODS and period not in periods:
+                    periods.append(period)
+
+            cursors = {}
+            for period in periods:
+                cursor = PaginationCursor(cursor_after=request.args.get('cursor_after_' + period))
+                cursor.set_limit(request.args.get('limit', 10))
+                cursors[period] = cursor
+        except BadCursorQuery:
+            return response({
+                "ok": False,
+                "code": "INVALID_CURSOR_QUERY_VALUE"
+            }, 400)
+
+        category_slug = request.args.get('category_slug') or None
+        if auth_user:
+            return response(self._get_feed_payload(auth_user, periods, cursors, category_slug))
+
+        cache_key = event_feed_cache.make_key(
+            output='feed',
+            periods=','.join(periods),
+            category_slug=category_slug,
+            limit=request.args.get('limit'),
+            **dict(('cursor_after_' + period, cursor.after) for period, cursor in cursors.items())
+        )
+        return response(event_feed_cache.fetch(
+            cache_key, lambda: self._get_feed_payload(auth_user, periods, cursors, category_slug)))
+
+    def _get_feed_payload(self, auth_user, periods, cursors, category_slug=None):
+        category = models.EventCategory.find_category_by_slug(category_slug) if category_slug else None
+        feed = models.Event.get_home_feed(periods, cursors=cursors, category_id=category.id if category else None)
+
+        # one dump for the whole feed, so the viewer's flags are loaded once for all periods
+        schema = serializers.event_summary_schema if auth_user else serializers.event_summary_anon_schema
+        dumped = iter(schema.dump([event for events in feed.values() for event in events], many=True))
+
+        events = {}
+        for period, period_events in feed.items():
+            cursor = cursors[period]
+            events[period] = {
+                'data': [next(dumped) for _ in period_events],
+                'metadata': {
+                    'cursor': {
+                        'before': cursor.before,
+                        'after': cursor.after,
+                        'has_more': cursor.has_more,
+                        'limit': cursor.limit
+                    },
+                }
+            }
+        return {
+            'ok': True,
+            'events': events
+        }
 
     def get(self, event_id):
         auth_user = Authenticator.get_instance().get_auth_user_without_auth_check()
-        if not models.Event.has_event(event_id):
+        event = models.Event.get_event(event_id)
+        if not event:
             return response({
                 "ok": True,
                 "code": "CONTENT_NOT_FOUND",
             }, 204)
-        event = models.Event.get_event(event_id)
-        print("myeventdetails##", event.venue_type)
         if auth_user:
             event = serializers.event_schema.dump(event)
         else:
@@ -420,29 +485,21 @@ class EventView(AuthBaseView):
             event = models.Event.get_event_only(event_id)
             auth_user = Authenticator.get_instance().get_auth_user()
 
-            reservation_lines = []
-            ticket_types = []
-            for d in data:
-                ticket_type = models.EventTicketType.get_ticket_type(d['ticket_type_id'])
-                ticket_qty = d['ticket_qty']
-                reservation_lines.append([ticket_type, ticket_qty])
-                ticket_types.append(ticket_type)
+            ticket_types = models.EventTicketType.get_ticket_types([d['ticket_type_id'] for d in data])
+            reservation_lines = [[ticket_types[d['ticket_type_id']], d['ticket_qty']] for d in data]
 
             try:
                 created_reservation = models.EventTicketReservation.create_reservation(reservation_lines=reservation_lines,
                                                                                        reservation_by=auth_user)
             except exceptions.AlreadyHasTicketReservation as e:
                 created_reservation = e.reservation
-            except exceptions.InsufficientTicketsAvailable:
-                messages = []
-                for ticket_type in ticket_types:
-                    message = "Only {available_qty} {ticket_type_name} are remaining".format(
-                        available_qty=ticket_type.get_available_qty(), ticket_type_name=ticket_type.name)
-                    messages.append(message)
+            except exceptions.InsufficientTicketsAvailable as e:
+                message = "Only {available_qty} {ticket_type_name} are remaining".format(
+                    available_qty=e.ticket_type.get_available_qty(), ticket_type_name=e.ticket_type.name)
                 return response({
                     "ok": False,
                     "code": "INSUFFICENT_TICKETS",
-                    "message": "\n".join(messages)
+                    "message": message
                 }, 400)
 
             return response({
@@ -459,6 +516,11 @@ class EventView(AuthBaseView):
                 'ok': False,
                 'code': 'EVENT_NOT_FOUND'
             }, 400)
+        except exceptions.TicketTypeNotFound:
+            return response({
+                'ok': False,
+                'code': 'TICKET_TYPE_NOT_FOUND'
+            }, 400)
         except exceptions.NotAuthUser:
             return self.not_auth_response()
 
@@ -507,6 +569,7 @@ class EventView(AuthBaseView):
             data = request.get_json()
             event = models.Event.get_event_only(event_id)
             recommended_by = Authenticator.get_instance().get_auth_user()
+            recommended_to_users = []
             for recommendation in data:
                 email = recommendation['email'] if 'email' in recommendation else None
                 phone_number = recommendation['phone_number'] if 'phone_number' in recommendation else None
@@ -527,13 +590,15 @@ class EventView(AuthBaseView):
                                                   recommended_to_id=event_recommendation.recommended_to.id):
                     continue
                 event.recommendations.append(event_recommendation)
-                event.update()
-
-                models.Notification.create(notification_type=models.Notifications.EVENT_RECOMMENDED.value,
-                                           recipient=event_recommendation.recommended_to,
-                                           actor=recommended_by,
-                                           event=event)
-            # @todo send an email if user has opted for email notification
+                recommended_to_users.append(event_recommendation.recommended_to)
+
+            # the recommendations and their notification intent are stored in one transaction;
+            # the notification dispatcher creates the notifications and sends emails
+            models.NotificationOutbox.enqueue(notification_type=models.Notifications.EVENT_RECOMMENDED.value,
+                                              recipients=recommended_to_users,
+                                              actor=recommended_by,
+                                              event=event)
+            event.update()
 
             return response(serializers.event_recommendation_schema.dump(event.get_event_recommendations(), many=True))
         except ValidationError as e:
@@ -578,12 +643,11 @@ class EventView(AuthBaseView):
             event = models.Event.get_event_only(event_id)
             speaker = serializers.create_speaker_schema.load(speaker)
             name = speaker['name']
-            social_account_handle = speaker['social_account_handle']
+            social_account_handle = speaker.get('social_account_handle')
 
-            if models.Job.has_job(speaker['profession_id']):
-                profession = models.Job.get_job(speaker['profession_id'])
-
-            if models.SocialMedia.has_social_account(speaker['social_account_id']):
+            profession = models.Job.get_job(speaker['profession_id'])
+            social_account = None
+            if speaker.get('social_account_id'):
                 social_account = models.SocialMedia.get_social_account(speaker['social_account_id'])
 
             speaker_obj = EventSpeaker(name=name, social_account=social_account,
@@ -597,7 +661,7 @@ class EventView(AuthBaseView):
 
         except ValidationError as e:
             return response({
-                "ok": True,
+                "ok": False,
                 "errors": e.messages
             }, 400)
         except exceptions.EventNotFound:
@@ -605,6 +669,16 @@ class EventView(AuthBaseView):
                 "ok": False,
                 "code": "EVENT_NOT_FOUND"
             }, 400)
+        except exceptions.JobNotFound:
+            return response({
+                "ok": False,
+                "code": "JOB_NOT_FOUND"
+            }, 400)
+        except exceptions.SocialAccountNotFound:
+            return response({
+                "ok": False,
+                "code": "SOCIAL_ACCOUNT_NOT_FOUND"
+            }, 400)
 
     @route('<string:event_id>/speakers/<string:speaker_id>', methods=['PUT'])
     def update_speaker(self, event_id, speaker_id):
@@ -716,10 +790,11 @@ class EventView(AuthBaseView):
             auth_user = Authenticator.get_instance().get_auth_user()
             event = models.Event.get_event_only(event_id)
             event.bookmark(auth_user)
-            models.Notification.create(notification_type=models.Notifications.EVENT_BOOKMARKED.value,
-                                       recipient=event.user,
-                                       actor=auth_user,
-                                       event=event)
+            models.NotificationOutbox.enqueue(notification_type=models.Notifications.EVENT_BOOKMARKED.value,
+                                              recipients=[event.user],
+                                              actor=auth_user,
+                                              event=event)
+            db.session.commit()
             return response({
                 "ok": True,
                 "event_id": event_id,
@@ -732,10 +807,11 @@ class EventView(AuthBaseView):
             }, 400)
         except exceptions.BookmarkAlreadyExist:
             event.unbookmark(auth_user)
-            models.Notification.create(notification_type=models.Notifications.EVENT_UNBOOKMARKED.value,
-                                       recipient=event.user,
-                                       actor=auth_user,
-                                       event=event)
+            models.NotificationOutbox.enqueue(notification_type=models.Notifications.EVENT_UNBOOKMARKED.value,
+                                              recipients=[event.user],
+                                              actor=auth_user,
+                                              event=event)
+            db.session.commit()
             return response({
                 "ok": True,
                 "event_id": event_id,
@@ -749,11 +825,12 @@ class EventView(AuthBaseView):
         try:
             auth_user = Authenticator.get_instance().get_auth_user()
             event = models.Event.get_event_only(event_id)
-            event.bookmark(auth_user)
-            models.Notification.create(notification_type=models.Notifications.EVENT_UNBOOKMARKED.value,
-                                       recipient=event.user,
-                                       actor=auth_user,
-                                       event=event)
+            event.unbookmark(auth_user)
+            models.NotificationOutbox.enqueue(notification_type=models.Notifications.EVENT_UNBOOKMARKED.value,
+                                              recipients=[event.user],
+                                              actor=auth_user,
+                                              event=event)
+            db.session.commit()
             return response({
                 "ok": True
             })
@@ -1075,6 +1152,121 @@ class EventView(AuthBaseView):
                 "code": "EVENT_NOT_FOUND"
             }, 400)
 
+    @route('<string:event_id>/stream', methods=['POST'])
+    def add_stream_post(self, event_id):
+        try:
+            author = Authenticator.get_instance().get_auth_user()
+            data = serializers.create_event_stream_schema.load(request.get_json())
+            event = models.Event.get_event_only(event_id)
+
+            if author.id != event.user_id and not event.has_organizer(author):
+                return response({
+                    "ok": False,
+                    "code": "UNAUTHORIZED_USER_ACTION"
+                }, 400)
+
+            media = [EventStreamMedia(type=m['type'], url=m['url']) for m in data.get('media', [])]
+            post = event.add_stream_post(EventStream(content=data['content'], author=author, media=media))
+            message = self._stream_message(post, serializers.event_stream_schema.dump(post))
+            live_stream_hub.publish(event.id, message)
+            return response(message.data, 201)
+        except ValidationError as e:
+            return response({
+                "ok": False,
+                "code": "BAD_REQUEST",
+                "errors": e.messages
+            }, 400)
+        except exceptions.NotAuthUser:
+            return self.not_auth_response()
+        except exceptions.EventNotFound:
+            return response({
+                "ok": False,
+                "code": "EVENT_NOT_FOUND"
+            }, 400)
+
+    @route('<string:event_id>/stream', methods=['GET'])
+    def get_event_stream(self, event_id):
+        try:
+            cursor = self.get_cursor(request)
+            event = models.Event.get_event_only(event_id)
+            posts = event.get_stream_posts(cursor)
+            return response({
+                'posts': serializers.event_stream_schema.dump(posts, many=True),
+                "metadata": {
+                    "cursor": {
+                        "before": cursor.before,
+                        "after": cursor.after,
+                        "has_more": cursor.has_more,
+                        "limit": cursor.limit
+                    }
+                }
+            })
+        except exceptions.EventNotFound:
+            return response({
+                "ok": False,
+                "code": "EVENT_NOT_FOUND"
+            }, 400)
+
+    @route('<string:event_id>/stream/live', methods=['GET'])
+    def get_live_event_stream(self, event_id):
+        """
+        Server-sent events: one `post` event per stream post published from now on.
+
+        A client that reconnects with `Last-Event-ID` (or `?last_event_id=` on its first
+        connection) first gets the posts it missed, at most LIVE_STREAM_REPLAY_LIMIT per
+        connection; the stream then ends so the client reconnects for the next batch.
+        """
+        try:
+            event = models.Event.get_event_only(event_id)
+        except exceptions.EventNotFound:
+            return response({
+                "ok": False,
+                "code": "EVENT_NOT_FOUND"
+            }, 400)
+
+        # subscribe before replaying, so a post published in between is buffered instead of lost
+        subscription = live_stream_hub.subscribe(event.id)
+        replay_limit = getattr(db_config, 'LIVE_STREAM_REPLAY_LIMIT', 100)
+        replay = []
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        if last_event_id:
+            try:
+                posts = event.get_stream_posts_after(decode_cursor_key(last_event_id), replay_limit)
+                replay = [self._stream_message(post, payload)
+                          for post, payload in zip(posts, serializers.event_stream_schema.dump(posts, many=True))]
+            except BadCursorQuery:
+                pass
+
+        stream = Response(self._live_stream(subscription, replay, caught_up=len(replay) < replay_limit,
+                                            keepalive=getattr(db_config, 'LIVE_STREAM_KEEPALIVE', 15)),
+                          mimetype='text/event-stream',
+                          headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        stream.call_on_close(lambda: live_stream_hub.unsubscribe(subscription))
+        return stream
+
+    @staticmethod
+    def _stream_message(post, payload):
+        return LiveStreamMessage(id=encode_cursor_key(post.published_at, post.id), event='post', data=payload)
+
+    @staticmethod
+    def _live_stream(subscription, replay, caught_up, keepalive):
+        yield 'retry: 3000\n\n'
+        replayed_ids = set()
+        for message in replay:
+            replayed_ids.add(message.id)
+            yield message.encode()
+        if not caught_up:
+            return
+
+        # a lagged subscription ends the stream; the client resumes from its Last-Event-ID
+        while not subscription.lagged and not subscription.closed:
+            messages = subscription.get(timeout=keepalive)
+            if not messages:
+                yield ': keepalive\n\n'
+            for message in messages:
+                if message.id not in replayed_ids:
+                    yield message.encode()
+
     @route('<string:event_id>/reviews/<string:review_id>', methods=['GET'])
     def get_event_review(self, event_id, review_id):
 
@@ -1103,14 +1295,14 @@ class EventView(AuthBaseView):
             review.upvote(upvote)
             return response({
                 'review_id': review.id,
-                'upvotes_count': review.upvotes_count(),
+                'upvotes_count': review.upvotes_count,
                 'is_upvoted': review.is_upvoted_by(auth_user)
             })
         except exceptions.AlreadyUpvoted:
             review.remove_upvote_by(auth_user)
             return response({
                 'review_id': review.id,
-                'upvotes_count': review.upvotes_count(),
+                'upvotes_count': review.upvotes_count,
                 'is_upvoted': review.is_upvoted_by(auth_user)
             })
         except exceptions.AlreadyDownvoted:
@@ -1140,7 +1332,7 @@ class EventView(AuthBaseView):
             review.remove_upvote_by(auth_user)
             return response({
                 'review_id': review.id,
-                'upvotes_count': review.upvotes_count(),
+                'upvotes_count': review.upvotes_count,
                 'is_upvoted': review.is_upvoted_by(auth_user)
             })
         except exceptions.EventNotFound:
@@ -1166,14 +1358,14 @@ class EventView(AuthBaseView):
             review.downvote(downvote)
             return response({
                 'review_id': review.id,
-                'downvotes_count': review.downvotes_count(),
+                'downvotes_count': review.downvotes_count,
                 'is_downvoted': True
             })
         except exceptions.AlreadyDownvoted:
             review.remove_downvote_by(auth_user)
             return response({
                 'review_id': review.id,
-                'downvotes_count': review.downvotes_count(),
+                'downvotes_count': review.downvotes_count,
                 'is_downvoted': False
             })
         except exceptions.AlreadyUpvoted:
@@ -1203,7 +1395,7 @@ class EventView(AuthBaseView):
             review.remove_downvote_by(auth_user)
             return response({
                 'review_id': review.id,
-                'downvotes_count': review.downvotes_count(),
+                'downvotes_count': review.downvotes_count,
                 'is_downvoted': review.is_downvoted(),
                 'is_downvoted': review.is_downvoted_by(auth_user)
             })
@@ -1329,7 +1521,7 @@ class EventView(AuthBaseView):
             return response({
                 'ok': True,
                 'comment_id': comment.id,
-                'upvotes_count': comment.upvotes_count(),
+                'upvotes_count': comment.upvotes_count,
                 'is_upvoted': comment.is_upvoted_by(auth_user)
             })
         except exceptions.AlreadyUpvoted:
@@ -1337,7 +1529,7 @@ class EventView(AuthBaseView):
             return response({
                 'ok': True,
                 'comment_id': comment.id,
-                'upvote_count': comment.upvotes_count(),
+                'upvote_count': comment.upvotes_count,
                 'is_upvoted': comment.is_upvoted_by(auth_user)
             })
         except exceptions.AlreadyDownvoted:
@@ -1373,7 +1565,7 @@ class EventView(AuthBaseView):
             comment.remove_upvote(auth_user)
             return response({
                 'comment_id': comment.id,
-                'upvote_counts': comment.upvotes_count(),
+                'upvote_counts': comment.upvotes_count,
                 'is_upvoted': comment.is_upvoted_by(auth_user)
             })
         except exceptions.EventNotFound:
@@ -1405,7 +1597,7 @@ class EventView(AuthBaseView):
             return response({
                 'ok': True,
                 'comment_id': comment.id,
-                'downvotes_count': comment.downvotes_count(),
+                'downvotes_count': comment.downvotes_count,
                 'is_downvoted': comment.is_downvoted_by(auth_user)
             })
         except exceptions.AlreadyDownvoted:
@@ -1413,7 +1605,7 @@ class EventView(AuthBaseView):
             return response({
                 'ok': False,
                 'comment_id': comment.id,
-                'downvotes_count': comment.downvotes_count(),
+                'downvotes_count': comment.downvotes_count,
                 'is_downvoted': comment.is_downvoted_by(auth_user)
             })
         except exceptions.AlreadyUpvoted:
@@ -1449,7 +1641,7 @@ class EventView(AuthBaseView):
             comment.remove_downvote(auth_user)
             return response({
                 'comment_id': comment.id,
-                'downvotes_count': comment.downvotes_count(),
+                'downvotes_count': comment.downvotes_count,
                 'is_downvoted': comment.is_downvoted_by(auth_user)
             })
         except exceptions.EventNotFound:
@@ -1610,7 +1802,7 @@ class EventView(AuthBaseView):
             return response({
                 'ok': True,
                 'response_id': comment_response.id,
-                'upvotes_count': comment_response.upvotes_count(),
+                'upvotes_count': comment_response.upvotes_count,
                 'is_upvoted': comment_response.is_upvoted_by(auth_user)
             })
         except exceptions.AlreadyUpvoted:
@@ -1618,7 +1810,7 @@ class EventView(AuthBaseView):
             return response({
                 "ok": True,
                 'response_id': comment_response.id,
-                'upvotes_count': comment_response.upvotes_count(),
+                'upvotes_count': comment_response.upvotes_count,
                 'is_upvoted': comment_response.is_upvoted_by(auth_user)
             })
         except exceptions.AlreadyDownvoted:
@@ -1668,7 +1860,7 @@ class EventView(AuthBaseView):
             comment_response.remove_upvote_by(auth_user)
             return response({
                 'response_id': comment_response.id,
-                'upvotes_count': comment_response.upvotes_count(),
+                'upvotes_count': comment_response.upvotes_count,
                 'is_upvoted': comment_response.is_upvoted_by(auth_user)
             })
         except exceptions.EventNotFound:
@@ -1713,7 +1905,7 @@ class EventView(AuthBaseView):
             return response({
                 'ok': True,
                 'response_id': comment_response.id,
-                'downvotes_count': comment_response.downvotes_count(),
+                'downvotes_count': comment_response.downvotes_count,
                 'is_downvoted': comment_response.is_downvoted_by(auth_user)
             })
         except exceptions.AlreadyDownvoted:
@@ -1721,7 +1913,7 @@ class EventView(AuthBaseView):
             return response({
                 'ok': True,
                 'response_id': comment_response.id,
-                'downvotes_count': comment_response.downvotes_count(),
+                'downvotes_count': comment_response.downvotes_count,
                 'is_downvoted': comment_response.is_downvoted_by(auth_user)
             })
         except exceptions.AlreadyUpvoted:
@@ -1767,10 +1959,10 @@ class EventView(AuthBaseView):
             review = event.get_review_only(review_id)
             comment = review.get_comment_only(comment_id)
             comment_response = comment.get_response(response_id)
-            comment_response.remove_downvote(auth_user)
+            comment_response.remove_downvote_by(auth_user)
             return response({
                 'response_id': comment_response.id,
-                'downvotes_count': comment_response.downvotes_count(),
+                'downvotes_count': comment_response.downvotes_count,
                 'is_downvoted': comment_response.is_downvoted_by(auth_user)
             })
         except exceptions.EventNotFound:
@@ -1810,13 +2002,13 @@ class EventView(AuthBaseView):
             payment_info = data['payment_info']
             ticket_types = data['ticket_types']
             customer = Authenticator.get_instance().get_auth_user()
+            ticket_types_by_id = models.EventTicketType.get_ticket_types(
+                [ticket_type['ticket_type_id'] for ticket_type in ticket_types])
             tickets = []
             for ticket_type in ticket_types:
-                ticket_type_id = ticket_type['ticket_type_id']
-                ticket_qty = ticket_type['qty']
                 tickets.append({
-                    'ticket_type': models.EventTicketType.get_ticket_type(ticket_type_id),
-                    'ticket_qty': int(ticket_qty)
+                    'ticket_type': ticket_types_by_id[ticket_type['ticket_type_id']],
+                    'ticket_qty': int(ticket_type['qty'])
                 })
             models.EventTicketSaleOrder.create_order(customer, event, tickets)
 
@@ -1831,6 +2023,11 @@ class EventView(AuthBaseView):
                 "ok": False,
                 'code': 'TICKETS_UNAVAILABLE',
             }, 400)
+        except exceptions.TicketTypeNotFound:
+            return response({
+                'ok': False,
+                'code': 'TICKET_TYPE_NOT_FOUND'
+            }, 400)
         except ValidationError as e:
             return response({
                 "ok": False,
@@ -1845,14 +2042,7 @@ class EventView(AuthBaseView):
         try:
             auth_user = Authenticator.get_instance().get_auth_user()
             event = models.Event.get_event_only(event_id)
-            tickets = []
-            for ticket_type in event.ticket_types:
-                tickets.append({
-                    'ticket_type': ticket_type,
-                    'assigned_tickets': models.EventTicket.get_assigned_tickets_of_type(ticket_type, auth_user),
-                    'unassigned_tickets': models.EventTicket.get_unassigned_tickets_of_type(ticket_type, auth_user),
-                    'gifted_tickets': models.EventTicket.get_gifted_tickets(ticket_type, auth_user)
-                })
+            tickets = TicketWallet.load(auth_user.id, event_id=event.id).group_by_type(event.ticket_types)
             grouped_tickets = serializers.attendee_ticket_grouped_by_type_schema.dump(tickets, many=True)
             return response({
                 "ok": True,
@@ -1938,17 +2128,10 @@ class EventView(AuthBaseView):
         try:
             event = models.Event.get_event_only(event_id)
             if request.method == 'POST':
-                uploaded_media = []
-                for key in request.files:
-                    file_to_upload = request.files[key]
-                    media_file = models.EventMedia.create()
-                    resp = cloudinary_upload(file_to_upload, public_id=media_file.filename)
-                    media_file.add_format(resp['format'])
-                    media_file.add_source_url(resp['url'])
-                    media_file.add_public_id(resp['public_id'])
-                    event.media.append(media_file)
-                    uploaded_media.append(media_file)
-                db.session.commit()
+                files = [request.files[key] for key in request.files]
+                public_ids = [utils.gen_image_filename(str(uuid.uuid4())) for _ in files]
+                stored_media = media_upload_pipeline.upload(files, public_ids=public_ids)
+                uploaded_media = models.EventMedia.create_many(event, stored_media)
                 return response(serializers.event.EventMediaSchema().dump(uploaded_media, many=True))
         except exceptions.EventNotFound:
             return response({
@@ -1960,6 +2143,11 @@ class EventView(AuthBaseView):
                 'ok': False,
                 'code': "IMAGE field 'image' NOT FOUND"
             }, 400)
+        except exceptions.MediaUploadFailed:
+            return response({
+                'ok': False,
+                'code': 'MEDIA_UPLOAD_FAILED'
+            }, 400)
 
     @route('/<string:event_id>/media/<string:media_id>', methods=['DELETE'])
     def delete_media(self, event_id, media_id):
@@ -1968,7 +2156,7 @@ class EventView(AuthBaseView):
             event = Event.get_event_only(event_id)
             file = event.get_media_file(media_id)
             file.delete()
-            cloudinary_api.delete_resources([file.public_id])
+            media_upload_pipeline.delete([file.public_id])
             return response(None)
         except exceptions.EventNotFound:
             return response({
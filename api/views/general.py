@@ -2,6 +2,9 @@ from . import *
 from api.serializers.user import CountrySerializer
 from api.services.geolocation_service import GeolocationService
 from api.models.event import Country
+from api.cache import event_feed_cache
+from api.models.compiled_queries import compiled_queries
+from api.decorators import check_admin_user
 
 country_serializer = CountrySerializer()
 
@@ -22,4 +25,20 @@ class GeneralView(FlaskView):
         geolocation_service = GeolocationService()
         address = geolocation_service.reverse_search(latitude=data['latitude'], longitude=data['longitude'])
         country = Country.get_country_by_code(address.country_code)
-        return response(country_serializer.dump(country))
\ No newline at end of file
+        return response(country_serializer.dump(country))
+
+    @route('/cache-stats', methods=['GET'])
+    @check_admin_user
+    def cache_stats(self):
+        return response({
+            "ok": True,
+            "caches": [event_feed_cache.get_stats()]
+        })
+
+    @route('/query-stats', methods=['GET'])
+    @check_admin_user
+    def query_stats(self):
+        return response({
+            "ok": True,
+            "queries": compiled_queries.get_stats()
+        })
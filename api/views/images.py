@@ -6,8 +6,7 @@ from api.repositories import exceptions
 
 country_serializer = CountrySerializer()
 from api.serializers import image_schema
-from api.libs.cloudinary import upload as cloudinary_upload
-from api.libs.cloudinary import api as cloudinary_api
+from api.services.media_storage import media_upload_pipeline
 
 
 class MediaFile(object):
@@ -37,15 +36,9 @@ class ImagesView(FlaskView):
         try:
             print("Upload Images")
             if request.method == 'POST':
-                uploaded_media = []
-                for key in request.files:
-                    file_to_upload = request.files[key]
-                    media_file = MediaFile()
-                    resp = cloudinary_upload(file_to_upload, public_id=media_file.filename if  media_file.filename else None)
-                    media_file.add_format(resp['format'])
-                    media_file.add_source_url(resp['url'])
-                    media_file.add_public_id(resp['public_id'])
-                    uploaded_media.append(media_file)
+                files = [request.files[key] for key in request.files]
+                uploaded_media = [MediaFile(format=stored.format, source_url=stored.source_url, public_id=stored.public_id)
+                                  for stored in media_upload_pipeline.upload(files)]
                 return response(image_schema.dump(uploaded_media, many=True))
         except Exception as e:
             return response({
@@ -57,7 +50,7 @@ class ImagesView(FlaskView):
     @route('/<string:mediaId>')
     def delete_media(self, media_id):
         try:
-            cloudinary_api.delete_resources(media_id)
+            media_upload_pipeline.delete([media_id])
             return response(None)
         except exceptions.EventNotFound:
             return response({
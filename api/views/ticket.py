@@ -1,7 +1,7 @@
 from . import *
 from api.views.auth_base import AuthBaseView
 from api.serializers.event import AttendeeTicketGroupedByTypeSchema, CreateTicketTypeDiscountSchema
-from api.repositories.ticket import TicketRepository
+from api.services.ticket_wallet import TicketWallet
 from api.models import event as models
 from api.serializers.event import EventTicketDiscountTypeSchema, AttendeeTicketSchema
 from api.auth.authenticator import Authenticator
@@ -20,49 +20,25 @@ class TicketsView(AuthBaseView):
 
     def index(self):
         """
-        Get tickets using all or either of ticket_owner_id and event_id parameters
+        Get a ticket owner's tickets grouped by ticket type, optionally for a single event
 
         Parameters:
             ticket_owner_id
-            event_id
+            event_id (optional)
         """
-        ticket_owner_id = None
-        event_id = None
-
-        response_payload = {
-            'tickets': []
-        }
-
-        if request.args:
-            if 'ticket_owner_id' in request.args:
-                ticket_owner_id = request.args.get('ticket_owner_id')
-
-            if 'event_id' in request.args:
-                event_id = request.args.get('event_id')
-
-            if ticket_owner_id and event_id:
-                tickets = TicketRepository(session=session).for_attendee(ticket_owner_id).for_event(event_id).get_tickets()
-            elif ticket_owner_id:
-                tickets = TicketRepository(session=session).for_attendee(ticket_owner_id).get_tickets()
-
-            grouped_tickets = []
-            if tickets:
-                ticket_types = tickets[0].event.tickets
-                for ticket_type in ticket_types:
-                    grouped_ticket = models.AttendeeTicketGroupedByType(type=ticket_type.name)
-                    grouped_ticket.add_assigned_tickets(
-                        filter(lambda ticket: ticket.is_assigned and ticket.type.id == ticket_type.id, tickets))
-                    grouped_ticket.add_unassigned_tickets(
-                        filter(lambda ticket: not ticket.is_assigned and ticket.type.id == ticket_type.id, tickets))
-                    grouped_tickets.append(grouped_ticket)
-            response_payload['tickets'] = AttendeeTicketGroupedByTypeSchema().dump(grouped_tickets, many=True)
-            return response(response_payload)
-        else:
-            response_payload = {
+        ticket_owner_id = request.args.get('ticket_owner_id')
+        event_id = request.args.get('event_id')
+
+        if not ticket_owner_id:
+            return response({
                 'message': 'Bad request',
-                'errors': 'Required parameter missing. Either ticket_owner_id or event_id parameter',
-            }
-            return response(response_payload)
+                'errors': 'Required parameter missing: ticket_owner_id',
+            })
+
+        grouped_tickets = TicketWallet.load(ticket_owner_id, event_id=event_id).group_by_type()
+        return response({
+            'tickets': AttendeeTicketGroupedByTypeSchema().dump(grouped_tickets, many=True)
+        })
 
     @route('/assign', methods=['POST'])
     def assign_ticket(self):
@@ -103,10 +79,11 @@ class TicketsView(AuthBaseView):
                 if unassigned_tickets:
                     ticket = unassigned_tickets[0]
                     ticket.assign_to(assign_to)
-                    models.Notification.create(notification_type=models.Notifications.TICKET_ASSIGNED.value,
-                                                              recipient=assign_to,
-                                                              actor=auth_user,
-                                                              event=ticket.event)
+                    models.NotificationOutbox.enqueue(notification_type=models.Notifications.TICKET_ASSIGNED.value,
+                                                      recipients=[assign_to],
+                                                      actor=auth_user,
+                                                      event=ticket.event)
+                    db.session.commit()
                     if assign_to.is_ghost:
                         # @todo send an email to ghost to signup and redeem is assigned ticket for event
                         pass
@@ -151,10 +128,11 @@ class TicketsView(AuthBaseView):
             try:
                 ticket.unassign_from(assigned_to)
                 models.Notifications.ticket_unassigned_message(ticket, auth_user)
-                models.Notification.create(notification_type=models.Notifications.TICKET_ASSIGNMENT_REVOKED.value,
-                                           recipient=assigned_to,
-                                           actor=auth_user,
-                                           event=ticket.event)
+                models.NotificationOutbox.enqueue(notification_type=models.Notifications.TICKET_ASSIGNMENT_REVOKED.value,
+                                                  recipients=[assigned_to],
+                                                  actor=auth_user,
+                                                  event=ticket.event)
+                db.session.commit()
             except exceptions.TicketNotAssignedToUser:
                 return response({
                     "ok": False,
@@ -4,10 +4,12 @@ from api.views.auth_base import AuthBaseView, BaseView
 from api.repositories import exceptions
 from api.auth.authenticator import Authenticator, data_encryptor
 from api.models.event import User, UserLoginSession, Country, Notification
+from api.models.pagination_cursor import BadCursorQuery
 from api.models.domain.user_payment_info import CardPaymentInfo, MobilePaymentInfo, PaymentTypes
 from api import serializers
 
 from api import utils
+from api.cache import invalidate_login_sessions
 
 
 class UserView(AuthBaseView):
@@ -25,11 +27,10 @@ class UserView(AuthBaseView):
             auth_user = Authenticator.get_instance().get_auth_user()
 
             data = request.get_json()
-            profile = User.get_user(auth_user.id)
-            print("updating user", profile)
+            profile = auth_user
 
             if 'name' in data and data['name'] != profile.name:
-                auth_user.name = data['name']
+                profile.name = data['name']
 
             if 'email' in data and data['email'] != profile.email:
                 profile.email = data['email']
@@ -38,14 +39,14 @@ class UserView(AuthBaseView):
                 profile.phone_number = data['phone_number']
 
             if 'country_id' in data and data['country_id'] != profile.country_id:
-                country_id = data['country_id']
-                if not Country.has_country(country_id):
+                try:
+                    profile.country = Country.get_country(data['country_id'])
+                except exceptions.CountryNotFound:
                     return response({
                         "errors": {
                             "message": "Country not found"
                         }
                     }, 400)
-                profile.country = Country.get_country(country_id)
 
             if 'country_code' in data:
                 pass
@@ -73,14 +74,15 @@ class UserView(AuthBaseView):
             phone_number = data['phone_number']
             country_id = data['country_id']
 
-            if not Country.has_country(country_id):
+            try:
+                country = Country.get_country(country_id)
+            except exceptions.CountryNotFound:
                 return response({
                     "ok": False,
                     "errors": {
                         "message": "Country not found"
                     }
                 }, 401)
-            country = Country.get_country(country_id)
             user = User.create(name=name, email=email, password=password, country=country, gender=gender,
                                phone_number=phone_number)
             return response(serializers.user_schema.dump(user))
@@ -136,6 +138,7 @@ class UserView(AuthBaseView):
                 session_token = data_encryptor.encrypt(session_user, utils.ENCRYPTION_KEY)
                 user.login_session = [UserLoginSession(session_token=session_token, user=user)]
                 user.update()
+                invalidate_login_sessions(user.id)
             else:
                 session_token = user.login_session[0].session_token
 
@@ -449,14 +452,15 @@ class UserView(AuthBaseView):
                     elif type == 'all':
                         notifications = Notification.get_all_notifications(auth_user, cursor)
             else:
-                notifications = Notification.get_all_notifications(auth_user)
+                notifications = Notification.get_all_notifications(auth_user, cursor)
 
+            notification_counts = Notification.get_notification_counts(auth_user)
             return response({
                 "ok": True,
                 "notifications": serializers.notification_schema.dump(notifications, many=True),
-                "all_notifications_count": Notification.get_total_notifications(auth_user),
-                "unread_notifications_count": Notification.get_total_unread_notifications(auth_user),
-                "read_notifications_count": Notification.get_total_read_notifications(auth_user),
+                "all_notifications_count": notification_counts['all'],
+                "unread_notifications_count": notification_counts['unread'],
+                "read_notifications_count": notification_counts['read'],
                 "metadata": {
                     "cursor": {
                         "before": cursor.before,
@@ -481,12 +485,55 @@ class UserView(AuthBaseView):
     @route('/notifications/mark_as_read', methods=['PUT'])
     def mark_notifications_as_read(self):
         try:
+            auth_user = Authenticator.get_instance().get_auth_user()
             notification_ids = request.get_json()['notification_ids']
-            for notification in Notification.get_notifications(notification_ids):
-                notification.mark_as_read()
             return response({
-                "ok": True
+                "ok": True,
+                "updated_count": Notification.mark_notifications_as_read(auth_user, notification_ids)
+            })
+        except exceptions.NotAuthUser:
+            return self.not_auth_response()
+
+    @route('/notifications/mark_all_as_read', methods=['PUT'])
+    def mark_all_notifications_as_read(self):
+        """
+        Marks all unread notifications as read, or only those up to the `up_to` cursor when given
+        """
+        try:
+            auth_user = Authenticator.get_instance().get_auth_user()
+            data = request.get_json(silent=True) or {}
+            up_to = data.get('up_to') or request.args.get('up_to')
+            return response({
+                "ok": True,
+                "updated_count": Notification.mark_all_as_read(auth_user, up_to=up_to)
+            })
+        except BadCursorQuery:
+            return response({
+                "ok": False,
+                "code": "INVALID_CURSOR_QUERY_VALUE"
+            }, 400)
+        except exceptions.NotAuthUser:
+            return self.not_auth_response()
+
+    @route('/notifications/read', methods=['DELETE'])
+    def delete_read_notifications(self):
+        """
+        Deletes read notifications older than `older_than_days` days (30 by default)
+        """
+        try:
+            auth_user = Authenticator.get_instance().get_auth_user()
+            older_than_days = int(request.args.get('older_than_days', 30))
+            if older_than_days < 0:
+                raise ValueError()
+            return response({
+                "ok": True,
+                "deleted_count": Notification.delete_read_notifications(auth_user, older_than_days)
             })
+        except ValueError:
+            return response({
+                "ok": False,
+                "code": "INVALID_OLDER_THAN_DAYS"
+            }, 400)
         except exceptions.NotAuthUser:
             return self.not_auth_response()
 
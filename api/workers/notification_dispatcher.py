@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+
+from api.models.event import db, NotificationOutbox
+from api.services.notification_senders import create_senders
+
+logger = logging.getLogger(__name__)
+
+
+class DispatcherStats(object):
+    """Running totals and throughput of one dispatcher."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.batches = 0
+        self.intents_expanded = 0
+        self.notifications_created = 0
+        self.deliveries = 0
+        self.delivery_failures = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, intents_expanded=0, notifications_created=0, deliveries=0, delivery_failures=0, seconds=0.0):
+        with self._lock:
+            self.batches += 1
+            self.intents_expanded += intents_expanded
+            self.notifications_created += notifications_created
+            self.deliveries += deliveries
+            self.delivery_failures += delivery_failures
+            self.busy_seconds += seconds
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'intents_expanded': self.intents_expanded,
+                'notifications_created': self.notifications_created,
+                'deliveries': self.deliveries,
+                'delivery_failures': self.delivery_failures,
+                'notifications_per_second': self.notifications_created / self.busy_seconds if self.busy_seconds else 0.0,
+                'uptime_seconds': time.time() - self.started_at
+            }
+
+
+class NotificationDispatcher(object):
+    """Drains the notification outbox: expands pending intents, then delivers them through the senders.
+
+    Several dispatchers may run at once; each claims its batches with FOR UPDATE SKIP LOCKED.
+    """
+
+    def __init__(self, senders=None, batch_size=100, max_attempts=5, retry_delay=30):
+        self.senders = create_senders() if senders is None else senders
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.stats = DispatcherStats()
+
+    def run_once(self):
+        """Processes one batch of each kind; returns what it did."""
+        started_at = time.time()
+        intents_expanded, notifications_created = NotificationOutbox.expand_pending(self.batch_size)
+        deliveries, delivery_failures = self.deliver()
+        seconds = time.time() - started_at
+
+        self.stats.record(intents_expanded, notifications_created, deliveries, delivery_failures, seconds)
+        if intents_expanded or deliveries or delivery_failures:
+            logger.info("Expanded %s intent(s) into %s notification(s), delivered %s, %s failed in %.3fs",
+                        intents_expanded, notifications_created, deliveries, delivery_failures, seconds)
+        return {
+            'intents_expanded': intents_expanded,
+            'notifications_created': notifications_created,
+            'deliveries': deliveries,
+            'delivery_failures': delivery_failures
+        }
+
+    def deliver(self):
+        intents = NotificationOutbox.claim(NotificationOutbox.EXPANDED, self.batch_size)
+        deliveries, failures = 0, 0
+        for intent in intents:
+            try:
+                for sender in self.senders:
+                    sender.send(intent)
+                intent.mark_delivered()
+                deliveries += 1
+            except Exception as e:
+                logger.warning("Delivering notification intent %s failed: %s", intent.id, e)
+                intent.mark_failed_attempt(e, max_attempts=self.max_attempts, retry_delay=self.retry_delay)
+                failures += 1
+        db.session.commit()
+        return deliveries, failures
+
+    def run_until_idle(self):
+        """Keeps processing batches while there is work; returns the totals."""
+        totals = {'intents_expanded': 0, 'notifications_created': 0, 'deliveries': 0, 'delivery_failures': 0}
+        while True:
+            done = self.run_once()
+            for key, value in done.items():
+                totals[key] += value
+            if done['intents_expanded'] < self.batch_size and done['deliveries'] + done['delivery_failures'] < self.batch_size:
+                return totals
+
+
+class NotificationDispatcherThread(threading.Thread):
+    """In-process scheduler that drains the outbox every `interval` seconds."""
+
+    def __init__(self, app, dispatcher, interval=5):
+        super(NotificationDispatcherThread, self).__init__(name='notification-dispatcher')
+        self.daemon = True
+        self.app = app
+        self.dispatcher = dispatcher
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    self.dispatcher.run_until_idle()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Dispatching notifications failed")
+                finally:
+                    db.session.remove()
+
+    def stop(self):
+        self._stopped.set()
+
+
+def create_dispatcher(config):
+    return NotificationDispatcher(batch_size=config.get('NOTIFICATION_DISPATCHER_BATCH_SIZE', 100),
+                                  max_attempts=config.get('NOTIFICATION_DISPATCHER_MAX_ATTEMPTS', 5),
+                                  retry_delay=config.get('NOTIFICATION_DISPATCHER_RETRY_DELAY', 30))
+
+
+def start_notification_dispatcher(app):
+    """Starts the dispatcher thread when NOTIFICATION_DISPATCHER_INTERVAL is configured."""
+    interval = app.config.get('NOTIFICATION_DISPATCHER_INTERVAL')
+    if not interval:
+        return None
+
+    thread = NotificationDispatcherThread(app, create_dispatcher(app.config), interval=interval)
+    thread.start()
+    return thread
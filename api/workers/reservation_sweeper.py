@@ -0,0 +1,55 @@
+import logging
+import threading
+
+from api.models.event import db, EventTicketReservation
+
+logger = logging.getLogger(__name__)
+
+
+def sweep_expired_reservations(batch_size=500, max_batches=None):
+    reclaimed = EventTicketReservation.sweep_expired_reservations(batch_size=batch_size, max_batches=max_batches)
+    if reclaimed['reservations']:
+        logger.info("Reclaimed %s ticket(s) from %s expired reservation(s)",
+                    reclaimed['tickets'], reclaimed['reservations'])
+    return reclaimed
+
+
+class ReservationSweeper(threading.Thread):
+    """In-process scheduler that sweeps expired ticket reservations every `interval` seconds.
+
+    Several processes may run one; batches skip rows another sweeper has locked.
+    """
+
+    def __init__(self, app, interval=60, batch_size=500):
+        super(ReservationSweeper, self).__init__(name='reservation-sweeper')
+        self.daemon = True
+        self.app = app
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    sweep_expired_reservations(batch_size=self.batch_size)
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Sweeping expired reservations failed")
+                finally:
+                    db.session.remove()
+
+    def stop(self):
+        self._stopped.set()
+
+
+def start_reservation_sweeper(app):
+    """Starts the sweeper thread when RESERVATION_SWEEPER_INTERVAL is configured."""
+    interval = app.config.get('RESERVATION_SWEEPER_INTERVAL')
+    if not interval:
+        return None
+
+    sweeper = ReservationSweeper(app, interval=interval,
+                                 batch_size=app.config.get('RESERVATION_SWEEPER_BATCH_SIZE', 500))
+    sweeper.start()
+    return sweeper
@@ -1,3 +1,7 @@
 #!/usr/bin/env bash
 
-gunicorn --reload --log-file=/usr/src/api/api/wsgi.log wsgi:app
\ No newline at end of file
+# expands and delivers queued notifications; restarted if it ever exits
+(while true; do FLASK_APP=wsgi:app flask dispatch-notifications; sleep 5; done) &
+# hands the tickets of expired reservations back to sale every minute
+(while true; do FLASK_APP=wsgi:app flask sweep-expired-reservations; sleep 60; done) &
+gunicorn -c gunicorn_config.py -k gevent --reload --log-file=/usr/src/api/api/wsgi.log wsgi:app
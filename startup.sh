@@ -1,2 +1,6 @@
 service nginx restart &
-gunicorn --reload wsgi:app
+# expands and delivers queued notifications; restarted if it ever exits
+(while true; do FLASK_APP=wsgi:app flask dispatch-notifications; sleep 5; done) &
+# hands the tickets of expired reservations back to sale every minute
+(while true; do FLASK_APP=wsgi:app flask sweep-expired-reservations; sleep 60; done) &
+gunicorn -c gunicorn_config.py -k gevent --reload wsgi:app